@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+bench_backup_async.py - How long delete_file/rename_file wait for the backup of a large directory
+Creates a directory tree in a temp dir on the same filesystem as the backup
+store, then times backup_file() (what the tool waits for) and the time until
+the backup is stored, with MOIBASH_BACKUP_ASYNC off and on. The deleted tree is
+rolled back and compared to the original.
+
+Usage: python3 benchmarks/bench_backup_async.py [--files 2000] [--file-kb 64]
+"""
+
+import os
+import sys
+import time
+import shutil
+import filecmp
+import argparse
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "tools" / "filesystem"))
+
+import backup_manager
+
+
+def make_tree(root: Path, files: int, size: int):
+    for i in range(files):
+        path = root / f"pkg_{i % 20}" / f"sub_{i % 7}" / f"file_{i}.bin"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(os.urandom(size))
+
+
+def trees_equal(a: Path, b: Path) -> bool:
+    cmp = filecmp.dircmp(a, b)
+    if cmp.left_only or cmp.right_only or cmp.diff_files or cmp.funny_files:
+        return False
+    return all(trees_equal(a / d, b / d) for d in cmp.common_dirs)
+
+
+def run(files: int, size: int, async_mode: bool) -> tuple:
+    backup_manager.ASYNC_ENABLED = async_mode
+    manager = backup_manager.BackupManager(f"bench_async_{os.getpid()}_{int(async_mode)}")
+    manager.clear_backups()
+    work_dir = Path(tempfile.mkdtemp(prefix="moibash_bench_", dir="/tmp"))
+    target = work_dir / "project"
+    make_tree(target, files, size)
+    reference = work_dir / "reference"
+    shutil.copytree(target, reference)
+
+    try:
+        start = time.perf_counter()
+        manager.backup_file(str(target), "delete")
+        blocked = time.perf_counter() - start
+        shutil.rmtree(target)
+        manager.wait()
+        stored = time.perf_counter() - start
+
+        result = manager.rollback_all()
+        ok = result["failed"] == 0 and trees_equal(target, reference)
+        return blocked, stored, ok
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        shutil.rmtree(manager.backup_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--file-kb", type=int, default=64)
+    args = parser.parse_args()
+
+    print(f"delete of a {args.files} file tree ({args.files * args.file_kb / 1024:.0f} MB)")
+    for async_mode in (False, True):
+        blocked, stored, ok = run(args.files, args.file_kb * 1024, async_mode)
+        print(f"async {'on ' if async_mode else 'off'}: tool waits {blocked * 1000:7.1f} ms, "
+              f"backup stored after {stored * 1000:7.1f} ms, rollback {'ok' if ok else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
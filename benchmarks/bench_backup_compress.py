@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+bench_backup_compress.py - Backup store size and time per compression codec, and quota eviction
+Backs up (delete) a generated project tree mixing source code, JSON, logs,
+random binaries and already-compressed files with each MOIBASH_BACKUP_COMPRESS
+codec available here, rolls it back and compares. Then backs up a series of
+file versions under a small MOIBASH_BACKUP_MAX_BYTES to show the oldest
+backups being evicted.
+
+Usage: python3 benchmarks/bench_backup_compress.py [--files 600] [--quota-kb 2048]
+"""
+
+import os
+import sys
+import time
+import gzip
+import json
+import random
+import shutil
+import filecmp
+import argparse
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "tools" / "filesystem"))
+
+import backup_manager
+
+
+def make_project(root: Path, files: int):
+    rng = random.Random(7)
+    sources = sorted((ROOT_DIR / "tools").rglob("*.py"))
+    for i in range(files):
+        kind = i % 5
+        folder = root / f"pkg_{i % 12}"
+        folder.mkdir(parents=True, exist_ok=True)
+        if kind == 0:
+            (folder / f"mod_{i}.py").write_bytes(sources[i % len(sources)].read_bytes())
+        elif kind == 1:
+            rows = [{"id": j, "name": f"item {j}", "tags": ["a", "b"], "score": rng.random()} for j in range(200)]
+            (folder / f"data_{i}.json").write_text(json.dumps(rows, indent=2))
+        elif kind == 2:
+            lines = [f"2026-01-01 12:{j % 60:02d} INFO request {j} took {rng.randrange(900)} ms\n" for j in range(800)]
+            (folder / f"app_{i}.log").write_text("".join(lines))
+        elif kind == 3:
+            (folder / f"blob_{i}.bin").write_bytes(os.urandom(48 * 1024))
+        else:
+            (folder / f"archive_{i}.gz").write_bytes(gzip.compress(os.urandom(16 * 1024)))
+
+
+def dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def trees_equal(a: Path, b: Path) -> bool:
+    cmp = filecmp.dircmp(a, b)
+    if cmp.left_only or cmp.right_only or cmp.diff_files or cmp.funny_files:
+        return False
+    return all(trees_equal(a / d, b / d) for d in cmp.common_dirs)
+
+
+def run_codec(codec: str, files: int) -> tuple:
+    backup_manager.COMPRESS = codec
+    manager = backup_manager.BackupManager(f"bench_compress_{os.getpid()}_{codec}")
+    manager.clear_backups()
+    work_dir = Path(tempfile.mkdtemp(prefix="moibash_bench_"))
+    target = work_dir / "project"
+    make_project(target, files)
+    reference = work_dir / "reference"
+    shutil.copytree(target, reference)
+
+    try:
+        start = time.perf_counter()
+        manager.backup_file(str(target), "delete")
+        backup_time = time.perf_counter() - start
+        shutil.rmtree(target)
+        stats = manager.stats()
+
+        start = time.perf_counter()
+        result = manager.rollback_all()
+        rollback_time = time.perf_counter() - start
+        ok = result["failed"] == 0 and trees_equal(target, reference)
+        return stats, backup_time, rollback_time, ok
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        shutil.rmtree(manager.backup_dir, ignore_errors=True)
+
+
+def run_quota(quota: int):
+    backup_manager.COMPRESS = "auto"
+    backup_manager.MAX_BYTES = quota
+    manager = backup_manager.BackupManager(f"bench_quota_{os.getpid()}")
+    manager.clear_backups()
+    work_dir = Path(tempfile.mkdtemp(prefix="moibash_bench_"))
+    try:
+        for i in range(30):
+            path = work_dir / f"build_{i}.bin"
+            path.write_bytes(os.urandom(256 * 1024))
+            manager.backup_file(str(path), "update")
+            if i % 5 == 4:
+                stats = manager.stats()
+                ids = [op["id"] for op in manager.get_operations()]
+                print(f"after {i + 1:>2} backups: keep #{ids[0]}..#{ids[-1]} ({stats['operations']} ops), "
+                      f"store {stats['stored'] / 1024:,.0f} KB / quota {quota / 1024:,.0f} KB")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        shutil.rmtree(manager.backup_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=600)
+    parser.add_argument("--quota-kb", type=int, default=2048)
+    args = parser.parse_args()
+
+    codecs = ["none", "zlib"] + [name for name, suffix in (("zstd", "zst"), ("lz4", "lz4"))
+                                 if suffix in backup_manager.CODECS]
+    print(f"delete of a {args.files} file project (source, json, logs, random binaries, .gz)")
+    for codec in codecs:
+        stats, backup_t, rollback_t, ok = run_codec(codec, args.files)
+        print(f"{codec:>5}: store {stats['stored'] / 1024:>8,.0f} KB of {stats['original'] / 1024:,.0f} KB "
+              f"({stats['stored'] / stats['original']:4.0%}), backup {backup_t * 1000:7.1f} ms, "
+              f"rollback {rollback_t * 1000:7.1f} ms, {'ok' if ok else 'MISMATCH'}")
+
+    print()
+    run_quota(args.quota_kb * 1024)
+
+
+if __name__ == "__main__":
+    main()
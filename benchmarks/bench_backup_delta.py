@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+bench_backup_delta.py - Backup store size for repeated small edits of a large text file
+Backs up a generated source file before each of N edits (a few lines changed
+per edit, as update_file does), then rolls everything back. Reports store size,
+backup time (what update_file waits for; deltas are computed in the background),
+the time until pending deltas are done, and rollback time with reverse deltas
+off and on, and checks the rolled-back file matches the original.
+
+Usage: python3 benchmarks/bench_backup_delta.py [--size-kb 2048] [--edits 20]
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "tools" / "filesystem"))
+
+import backup_manager
+
+
+def make_source(size: int) -> list:
+    lines = []
+    total = 0
+    i = 0
+    while total < size:
+        line = f"def function_{i}(value):\n    return value * {i} + {i % 7}  # step {i}\n\n"
+        lines.append(line)
+        total += len(line)
+        i += 1
+    return lines
+
+
+def dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def run(size: int, edits: int, delta: bool) -> tuple:
+    backup_manager.DELTA_ENABLED = delta
+    manager = backup_manager.BackupManager(f"bench_delta_{os.getpid()}_{int(delta)}")
+    manager.clear_backups()
+    rng = random.Random(42)
+    work_dir = Path(tempfile.mkdtemp(prefix="moibash_bench_"))
+    target = work_dir / "module.py"
+    lines = make_source(size)
+    original = "".join(lines)
+    target.write_text(original)
+
+    try:
+        backup_time = 0.0
+        for i in range(edits):
+            start = time.perf_counter()
+            manager.backup_file(str(target), "update")
+            backup_time += time.perf_counter() - start
+            for _ in range(3):
+                lines[rng.randrange(len(lines))] = f"# edit {i}\n"
+            target.write_text("".join(lines))
+
+        start = time.perf_counter()
+        manager.wait()
+        delta_time = time.perf_counter() - start
+        stored = dir_size(manager.objects.root)
+        start = time.perf_counter()
+        result = manager.rollback_all()
+        rollback_time = time.perf_counter() - start
+        ok = result["failed"] == 0 and target.read_text() == original
+        return stored, backup_time / edits, delta_time, rollback_time, ok
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        shutil.rmtree(manager.backup_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-kb", type=int, default=2048)
+    parser.add_argument("--edits", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{args.size_kb} KB file, {args.edits} edits of 3 lines, chain {backup_manager.DELTA_CHAIN}")
+    for delta in (False, True):
+        stored, backup_t, delta_t, rollback_t, ok = run(args.size_kb * 1024, args.edits, delta)
+        print(f"delta {'on ' if delta else 'off'}: store {stored / 1024:>8,.0f} KB, "
+              f"backup {backup_t * 1000:6.1f} ms/edit, pending deltas {delta_t * 1000:6.1f} ms, "
+              f"rollback {rollback_t * 1000:7.1f} ms, "
+              f"restored {'ok' if ok else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+bench_backup_journal.py - Cost of recording one backup operation as the session grows
+Compares the old manifest.json rewrite (json.dump of every operation after each
+backup) with the append-only journal of tools/filesystem/backup_manager.py.
+For each checkpoint N it reports the mean time and bytes written to record
+operations N-49..N.
+
+Usage: python3 benchmarks/bench_backup_journal.py [--operations 2000]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "tools" / "filesystem"))
+
+from backup_manager import BackupManager
+
+WINDOW = 50
+
+
+def make_record(i: int) -> dict:
+    return {
+        "timestamp": f"20260101_120000_{i:06d}",
+        "operation": "update",
+        "original_path": f"/home/user/project/src/module_{i % 40}.py",
+        "backup_path": f"/tmp/moibash_backup_bench/objects/ab/{i:038x}",
+        "object": f"ab{i:038x}",
+        "is_directory": False,
+        "mode": 0o644,
+        "mtime": 1767268800.0 + i,
+    }
+
+
+def legacy_write(manifest_file: Path, manifest: dict) -> int:
+    """What _save_manifest() did after every backup"""
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest_file.stat().st_size
+
+
+def run(total: int, checkpoints: list, record_op) -> dict:
+    """Mean (seconds, bytes written) per operation over the WINDOW ending at each checkpoint"""
+    rows = {}
+    elapsed = 0.0
+    written = 0
+    for i in range(1, total + 1):
+        start = time.perf_counter()
+        written += record_op(make_record(i))
+        elapsed += time.perf_counter() - start
+        if i % WINDOW == 0:
+            if i in checkpoints:
+                rows[i] = (elapsed / WINDOW, written / WINDOW)
+            elapsed = 0.0
+            written = 0
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--operations", type=int, default=2000)
+    args = parser.parse_args()
+
+    checkpoints = [n for n in (100, 500, 1000, 2000, 3000, 5000, 10000) if n <= args.operations]
+    manager = BackupManager(f"bench_journal_{os.getpid()}")
+    manager.clear_backups()
+    legacy_file = manager.backup_dir / "legacy_manifest.json"
+    legacy = {"operations": [], "session_pid": manager.session_pid}
+
+    def record_legacy(record: dict) -> int:
+        legacy["operations"].append(record)
+        return legacy_write(legacy_file, legacy)
+
+    def record_journal(record: dict) -> int:
+        size_before = manager.journal_file.stat().st_size if manager.journal_file.exists() else 0
+        manager.manifest["operations"].append(record)
+        manager._append_journal({"type": "op", "op": record})
+        return manager.journal_file.stat().st_size - size_before
+
+    # Hai lượt chạy riêng: fsync của journal không phải flush dữ liệu manifest đang dirty
+    try:
+        journal_rows = run(args.operations, checkpoints, record_journal)
+        legacy_rows = run(args.operations, checkpoints, record_legacy)
+    finally:
+        shutil.rmtree(manager.backup_dir, ignore_errors=True)
+
+    print(f"{'ops':>6} {'manifest ms':>12} {'manifest B':>12} {'journal ms':>11} {'journal B':>10}")
+    for n in checkpoints:
+        legacy_t, legacy_b = legacy_rows[n]
+        journal_t, journal_b = journal_rows[n]
+        print(f"{n:>6} {legacy_t * 1000:>12.3f} {legacy_b:>12,.0f} {journal_t * 1000:>11.3f} {journal_b:>10,.0f}")
+    print("(per recorded operation; the journal fsyncs every record, the old manifest never did)")
+
+
+if __name__ == "__main__":
+    main()
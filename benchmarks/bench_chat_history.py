@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+bench_chat_history.py - Cost of loading the last 20 chat messages as the session grows
+Compares the old load_chat_history() (read and split the whole
+chat_history_<PID>.txt every turn) with ChatHistory of tools/chat_history.py
+(side index + mmap). For each history size it reports the first indexed read
+(builds the index) and the per-turn cost when one message is appended between
+reads, as in a chat session.
+
+Usage: python3 benchmarks/bench_chat_history.py [--turns 20]
+"""
+
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "tools"))
+
+from chat_history import ChatHistory
+
+SIZES = (1000, 10000, 100000)
+LAST = 20
+
+
+def legacy_load(path: Path) -> list:
+    """What load_chat_history() did before the index"""
+    history = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f.read().strip().splitlines():
+            line = line.strip()
+            if ' USER: ' in line:
+                history.append({"role": "user", "parts": [{"text": line.split(' USER: ', 1)[1]}]})
+            elif ' moiBash: ' in line:
+                history.append({"role": "model", "parts": [{"text": line.split(' moiBash: ', 1)[1]}]})
+    return history[-LAST:]
+
+
+def write_history(path: Path, messages: int):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(messages):
+            if i % 2 == 0:
+                f.write(f"[12:{i % 60:02d}:00] USER: đọc file src/module_{i % 40}.py và giải thích hàm chính\n")
+            else:
+                f.write(f"[12:{i % 60:02d}:05] moiBash: File module_{i % 40}.py định nghĩa hàm **process()**, "
+                        f"nhận danh sách và trả về tổng sau khi lọc.\nChi tiết:\n- bước {i}\n")
+
+
+def per_turn(path: Path, history: ChatHistory, turns: int, load) -> float:
+    elapsed = 0.0
+    for i in range(turns):
+        history.append("user", f"câu hỏi thêm số {i}")
+        start = time.perf_counter()
+        load()
+        elapsed += time.perf_counter() - start
+    return elapsed / turns
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="moibash_bench_"))
+    try:
+        print(f"{'messages':>9} {'file KB':>8} {'legacy ms':>10} {'index build ms':>15} {'index ms':>9}")
+        for size in SIZES:
+            path = work_dir / f"chat_history_{size}.txt"
+            write_history(path, size)
+            history = ChatHistory(path)
+
+            start = time.perf_counter()
+            indexed = history.last(LAST)
+            build = time.perf_counter() - start
+            assert [m["parts"][0]["text"].split("\n")[0] for m in indexed] == \
+                [m["parts"][0]["text"] for m in legacy_load(path)]
+
+            legacy = per_turn(path, history, args.turns, lambda: legacy_load(path))
+            incremental = per_turn(path, history, args.turns, lambda: history.last(LAST))
+            print(f"{size:>9,} {path.stat().st_size / 1024:>8,.0f} {legacy * 1000:>10.2f} "
+                  f"{build * 1000:>15.2f} {incremental * 1000:>9.3f}")
+        print("(ms per turn; one message appended before each read)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
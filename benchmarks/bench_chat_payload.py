@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+bench_chat_payload.py - Per-turn cost of the chat tool: bash/sed pipeline vs Python agent
+The old tools/chat.sh built the request from `tail -20` of the history with two
+`echo | sed` forks per line plus one more over the whole blob, and parsed the
+reply with another python3. LEGACY_BUILD below is that pipeline (without the
+curl call). It is compared with tools/chat/function_call.py run as a new process
+(router.sh fallback) and in-process (agent server), both against a local stub
+Gemini server, so the numbers are local overhead only.
+
+Usage: python3 benchmarks/bench_chat_payload.py [--turns 20] [--history-lines 200]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_daemon import AgentStubHandler, write_history
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+CHAT_AGENT = ROOT_DIR / "tools" / "chat" / "function_call.py"
+MESSAGE = "giải thích giúp tôi sự khác nhau giữa process và thread"
+
+# Phần build request + parse response của tools/chat.sh cũ
+LEGACY_BUILD = r'''
+USER_MESSAGE="$1"; CHAT_HISTORY_FILE="$2"; REPLY_FILE="$3"
+escaped_message=$(echo "$USER_MESSAGE" | sed 's/\\/\\\\/g' | sed 's/"/\\"/g')
+HISTORY_LINES=""
+while IFS= read -r line; do
+    if [[ "$line" =~ ^\[.*\][[:space:]]USER:[[:space:]](.+)$ ]]; then
+        msg="${BASH_REMATCH[1]}"
+        escaped_msg=$(echo "$msg" | sed 's/\\/\\\\/g; s/"/\\"/g')
+        HISTORY_LINES="$HISTORY_LINES | USER: $escaped_msg"
+    elif [[ "$line" =~ ^\[.*\][[:space:]]moiBash:[[:space:]](.+)$ ]]; then
+        msg="${BASH_REMATCH[1]}"
+        escaped_msg=$(echo "$msg" | sed 's/\\/\\\\/g; s/"/\\"/g')
+        HISTORY_LINES="$HISTORY_LINES | ASSISTANT: $escaped_msg"
+    fi
+done < <(tail -20 "$CHAT_HISTORY_FILE")
+escaped_history=$(echo "$HISTORY_LINES" | sed 's/\\/\\\\/g; s/"/\\"/g')
+CONTEXT_MESSAGE="[CHAT HISTORY]\\n$escaped_history\\n\\n[CURRENT MESSAGE]\\n$escaped_message"
+payload="{\"contents\": [{\"parts\": [{\"text\": \"$CONTEXT_MESSAGE\"}]}]}"
+response=$(cat "$REPLY_FILE")
+echo "$response" | python3 -c "
+import sys, json
+data = json.load(sys.stdin)
+print(data['candidates'][0]['content']['parts'][0]['text'], end='')
+"
+'''
+
+
+def timed(turns: int, run) -> float:
+    start = time.perf_counter()
+    for _ in range(turns):
+        run()
+    return (time.perf_counter() - start) * 1000 / turns
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--history-lines", type=int, default=200)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AgentStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_base = f"http://127.0.0.1:{server.server_address[1]}/v1beta/models"
+
+    with tempfile.TemporaryDirectory(prefix="moibash_bench_") as tmpdir:
+        history = os.path.join(tmpdir, "chat_history_bench.txt")
+        write_history(history, args.history_lines)
+        reply_file = os.path.join(tmpdir, "reply.json")
+        Path(reply_file).write_text(json.dumps({"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}))
+        env = dict(os.environ, MOIBASH_GEMINI_API_BASE=api_base, MOIBASH_CHAT_HISTORY=history,
+                   GEMINI_API_KEY="bench", MOIBASH_STREAM="0")
+
+        legacy = timed(args.turns, lambda: subprocess.run(
+            ["bash", "-c", LEGACY_BUILD, "chat", MESSAGE, history, reply_file],
+            check=True, capture_output=True))
+        cold = timed(args.turns, lambda: subprocess.run(
+            [sys.executable, str(CHAT_AGENT), MESSAGE], env=env, check=True, capture_output=True))
+
+        # Agent server: module đã load, connection đã mở
+        os.environ.update(env)
+        sys.path.insert(0, str(CHAT_AGENT.parent))
+        import function_call as chat
+        chat.HISTORY_FILE = history
+        # gemini_client đã được import (bench_daemon) trước khi đặt MOIBASH_GEMINI_API_BASE
+        chat.GEMINI_API_URL = f"{api_base}/gemini-2.5-flash-lite:generateContent"
+
+        def warm_turn():
+            contents = chat.build_contents(chat.load_chat_history(), MESSAGE)
+            assert chat.response_text(chat.call_gemini_api(contents, "bench")) == "ok"
+
+        warm_turn()
+        warm = timed(args.turns, warm_turn)
+        contents = chat.build_contents(chat.load_chat_history(), MESSAGE)
+
+    server.shutdown()
+    print(f"history: {args.history_lines} lines, request: {len(contents)} turns")
+    print(f"chat.sh build + parse (no network):  {legacy:7.1f} ms/turn")
+    print(f"function_call.py, new process:       {cold:7.1f} ms/turn (incl. stub round trip)")
+    print(f"function_call.py, in agent server:   {warm:7.1f} ms/turn (incl. stub round trip)")
+
+
+if __name__ == "__main__":
+    main()
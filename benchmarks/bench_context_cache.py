@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+bench_context_cache.py - Request bytes of the filesystem agent loop with and without context caching
+Runs call_gemini_api() of tools/filesystem/function_call.py for N loop
+iterations against a local stub that implements cachedContents, and reports
+the bytes uploaded per iteration with MOIBASH_GEMINI_CACHE off and on.
+--reject makes the stub refuse cached requests to exercise the fallback.
+
+Usage: python3 benchmarks/bench_context_cache.py [--iterations 10] [--reject]
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_http_pool import StubHandler
+import gemini_client
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+class CacheStubHandler(StubHandler):
+    """generateContent + cachedContents stub that records request sizes"""
+    requests_log = []
+    reject_cached = False
+
+    def reply(self, status: int, data: dict):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        body = self.read_body()
+        path = self.path.split("?")[0]
+        self.requests_log.append((path.rsplit("/", 1)[-1], len(body)))
+        if path.endswith("/cachedContents"):
+            self.reply(200, {"name": "cachedContents/stub-1", "expireTime": "2099-01-01T00:00:00Z"})
+        elif b'"cachedContent"' in body and self.reject_cached:
+            self.reply(404, {"error": {"code": 404, "message": "CachedContent not found"}})
+        else:
+            self.reply(200, {"candidates": [{"content": {"role": "model", "parts": [{"text": "ok"}]}, "finishReason": "STOP"}]})
+
+    def do_PATCH(self):
+        self.requests_log.append(("patch", len(self.read_body())))
+        self.reply(200, {"name": "cachedContents/stub-1"})
+
+
+def run_loop(function_call, iterations: int) -> list:
+    """Call the API like the agent loop does; return the request log"""
+    CacheStubHandler.requests_log = []
+    conversation = [{"role": "user", "parts": [{"text": "đọc file main.py và giải thích"}]}]
+    for i in range(iterations):
+        response = function_call.call_gemini_api(conversation, "stub")
+        assert response is not None, "API call failed"
+        conversation += [
+            {"role": "model", "parts": [{"functionCall": {"name": "read_file", "args": {"file_path": f"f{i}.py"}}}]},
+            {"role": "user", "parts": [{"functionResponse": {"name": "read_file", "response": {"content": "x" * 200}}}]},
+        ]
+    return list(CacheStubHandler.requests_log)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--reject", action="store_true", help="stub refuses requests that reference a cache")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CacheStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    CacheStubHandler.reject_cached = args.reject
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # gemini_client đã được import (qua bench_http_pool): đổi base URL trước khi load agent
+        gemini_client.GEMINI_API_BASE = f"http://127.0.0.1:{server.server_address[1]}/v1beta/models"
+        os.environ["MOIBASH_CACHE_DIR"] = tmpdir
+        sys.path.insert(0, str(ROOT_DIR / "tools" / "filesystem"))
+        import function_call
+
+        function_call.CONTEXT_CACHE_ENABLED = False
+        plain = run_loop(function_call, args.iterations)
+        function_call.CONTEXT_CACHE_ENABLED = True
+        cached = run_loop(function_call, args.iterations)
+    server.shutdown()
+
+    plain_bytes = sum(size for _, size in plain)
+    cached_bytes = sum(size for _, size in cached)
+    generate = [size for name, size in cached if name.endswith(":generateContent")]
+    print(f"Iterations:                 {args.iterations}{' (stub rejects cached requests)' if args.reject else ''}")
+    print(f"Without cache:              {plain_bytes} bytes ({plain[0][1]} first request)")
+    print(f"With cache:                 {cached_bytes} bytes, incl. {cached_bytes - sum(generate)} bytes for cachedContents")
+    print(f"  generateContent requests: {len(generate)} ({generate[0]} bytes first request)")
+    print(f"Saved:                      {plain_bytes - cached_bytes} bytes ({1 - cached_bytes / plain_bytes:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+bench_conversation_budget.py - Request bytes of a long filesystem task with and without compaction
+Replays an agent loop offline: each iteration the model "reads" one file of this
+repo (some files are read again later) and build_payload() of
+tools/filesystem/function_call.py builds the request. Reports the bytes of each
+request and the total, with ConversationBudget disabled (huge limits) and with
+the default settings.
+
+Usage: python3 benchmarks/bench_conversation_budget.py [--iterations 30]
+"""
+
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "tools" / "filesystem"))
+sys.path.insert(0, str(ROOT_DIR / "tools"))
+
+import function_call
+from conversation_budget import ConversationBudget
+
+
+def replay(iterations: int, budget: ConversationBudget) -> list:
+    """Bytes of each request of a synthetic read_file loop"""
+    files = sorted(p for p in (ROOT_DIR / "tools").rglob("*") if p.suffix in (".py", ".sh"))
+    function_call.BUDGET = budget
+    budget.reset()
+    conversation = [{"role": "user", "parts": [{"text": "Đọc code và tóm tắt các tool"}]}]
+    sizes = []
+    for i in range(iterations):
+        sizes.append(len(json.dumps(function_call.build_payload(conversation, "cachedContents/bench"))))
+        # Cứ 3 lượt thì đọc lại một file đã đọc
+        path = files[(i // 3 if i % 3 == 2 else i) % len(files)]
+        call = {"name": "read_file", "args": {"file_path": str(path)}}
+        conversation.append({"role": "model", "parts": [{"functionCall": call}]})
+        conversation.append({"role": "function", "parts": [{"functionResponse": {
+            "name": "read_file",
+            "response": {"content": function_call.call_filesystem_tool("readfile", str(path))}
+        }}]})
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+
+    off = replay(args.iterations, ConversationBudget("bench", max_request_bytes=10 ** 12,
+                                                     keep_tool_turns=10 ** 6, old_result_chars=10 ** 12))
+    on = replay(args.iterations, ConversationBudget("bench"))
+
+    print(f"{'iter':>4} {'off':>10} {'on':>10}")
+    for i, (a, b) in enumerate(zip(off, on), 1):
+        print(f"{i:>4} {a:>10,} {b:>10,}")
+    print(f"total: {sum(off):,} bytes without compaction, {sum(on):,} with it "
+          f"({(sum(on) - sum(off)) / sum(off):+.0%}); last request {off[-1]:,} → {on[-1]:,}")
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("GEMINI_API_KEY", "bench")
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+bench_daemon.py - Per-turn latency: one-shot router.sh vs resident agent server
+Runs `bash router.sh <message>` N times against a local stub Gemini server,
+first with every turn spawning intent.sh + function_call.py (cold), then with
+agent_server.py running and router.sh talking to it through agent_client.py
+(warm). Network time is near zero with the stub, so the difference is the
+interpreter start-up, imports and connection setup the daemon avoids
+(see bench_http_pool.py --tls for the TLS handshake part).
+
+--prewarm also runs the agent server with MOIBASH_PREWARM=0 and =1 on a
+message the local fast path cannot classify, so the Gemini classification
+call (delayed by --classify-delay-ms) overlaps with the speculative warm-up
+of chat history (--history-lines) and of a new connection (--drop-connections
+makes the stub close every connection, like an idle socket dropped by a NAT).
+
+Usage: python3 benchmarks/bench_daemon.py [--turns 20] [--prewarm]
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import statistics
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_http_pool import StubHandler
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+ROUTER = ROOT_DIR / "router.sh"
+AGENT_SERVER = ROOT_DIR / "tools" / "agent_server.py"
+MESSAGE = "đọc file README.md"
+AMBIGUOUS_MESSAGE = "tóm tắt giúp tôi cái này"
+
+
+def stub_reply(text: str) -> bytes:
+    return json.dumps({
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}]
+    }).encode()
+
+
+class AgentStubHandler(StubHandler):
+    """Answer the intent classifier with 'filesystem' and the agent with plain text"""
+    classify_delay = 0.0
+    drop_connections = False
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        is_classify = b"intent classifier" in body
+        if is_classify and self.classify_delay:
+            time.sleep(self.classify_delay)
+        reply = stub_reply("filesystem" if is_classify else "ok")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        if self.drop_connections:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(reply)
+
+
+def start_server() -> tuple:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AgentStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1beta/models"
+
+
+def run(env: dict, turns: int, cwd: str, message: str = MESSAGE) -> float:
+    """Return mean milliseconds per router.sh turn"""
+    start = time.perf_counter()
+    for _ in range(turns):
+        result = subprocess.run(["bash", str(ROUTER), message], env=env, cwd=cwd,
+                                stdin=subprocess.DEVNULL, capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"router.sh failed: {result.stderr.decode(errors='replace')}")
+    return (time.perf_counter() - start) * 1000 / turns
+
+
+def wait_for_socket(path: str, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if os.path.exists(path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+                return
+            except OSError:
+                pass
+            finally:
+                probe.close()
+        time.sleep(0.05)
+    raise RuntimeError("agent_server.py did not start")
+
+
+def start_daemon(env: dict, socket_path: str) -> subprocess.Popen:
+    daemon = subprocess.Popen([sys.executable, str(AGENT_SERVER), socket_path], env=env,
+                              stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+    wait_for_socket(socket_path)
+    return daemon
+
+
+def stop_daemon(daemon: subprocess.Popen):
+    daemon.terminate()
+    daemon.wait()
+
+
+def write_history(path: str, lines: int):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(lines // 2):
+            f.write(f"[10:00:{i % 60:02d}] USER: câu hỏi số {i} về file main.py và thư mục src\n")
+            f.write(f"[10:00:{i % 60:02d}] moiBash: câu trả lời số {i} " + "nội dung " * 20 + "\n")
+
+
+def bench_prewarm(env: dict, args, tmpdir: str) -> tuple:
+    """Median ms/turn through the agent server with pre-warm off and on (turns interleaved)"""
+    env = dict(env, MOIBASH_INTENT_FAST_PATH="0", MOIBASH_INTENT_CACHE="0")
+    # router.sh dùng chat_history_$MOIBASH_PID.txt ở thư mục gốc
+    history = str(ROOT_DIR / f"chat_history_{env['MOIBASH_PID']}.txt")
+    write_history(history, args.history_lines)
+    AgentStubHandler.classify_delay = args.classify_delay_ms / 1000
+    AgentStubHandler.drop_connections = args.drop_connections
+
+    daemons, turn_envs, samples = [], [], ([], [])
+    try:
+        for prewarm in ("0", "1"):
+            socket_path = os.path.join(tmpdir, f"prewarm{prewarm}.sock")
+            daemons.append(start_daemon(dict(env, MOIBASH_PREWARM=prewarm), socket_path))
+            turn_envs.append(dict(env, MOIBASH_AGENT_SOCKET=socket_path))
+            run(turn_envs[-1], 1, str(ROOT_DIR), AMBIGUOUS_MESSAGE)
+        for turn in range(args.turns):
+            for i, turn_env in enumerate(turn_envs):
+                # moibash.sh ghi câu hỏi vào history trước khi gọi router.sh
+                with open(history, "a", encoding="utf-8") as f:
+                    f.write(f"[10:01:{turn % 60:02d}] USER: {AMBIGUOUS_MESSAGE}\n")
+                samples[i].append(run(turn_env, 1, str(ROOT_DIR), AMBIGUOUS_MESSAGE))
+    finally:
+        for daemon in daemons:
+            stop_daemon(daemon)
+        AgentStubHandler.classify_delay = 0.0
+        AgentStubHandler.drop_connections = False
+    return statistics.median(samples[0]), statistics.median(samples[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--prewarm", action="store_true", help="compare MOIBASH_PREWARM=0 and =1")
+    parser.add_argument("--classify-delay-ms", type=float, default=100)
+    parser.add_argument("--history-lines", type=int, default=2000)
+    parser.add_argument("--drop-connections", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        server, api_base = start_server()
+        env = dict(os.environ)
+        env.pop("MOIBASH_AGENT_SOCKET", None)
+        env.update({
+            "GEMINI_API_KEY": "stub",
+            "MOIBASH_GEMINI_API_BASE": api_base,
+            "MOIBASH_PID": "bench",
+        })
+
+        socket_path = os.path.join(tmpdir, "agent.sock")
+        daemon = None
+        try:
+            cold = run(env, args.turns, str(ROOT_DIR))
+
+            daemon = start_daemon(env, socket_path)
+            warm_env = dict(env, MOIBASH_AGENT_SOCKET=socket_path)
+            run(warm_env, 1, str(ROOT_DIR))  # lượt đầu mở connection tới stub
+            warm = run(warm_env, args.turns, str(ROOT_DIR))
+            stop_daemon(daemon)
+            daemon = None
+            if args.prewarm:
+                no_prewarm, with_prewarm = bench_prewarm(env, args, tmpdir)
+        finally:
+            if daemon is not None:
+                stop_daemon(daemon)
+            server.shutdown()
+            Path(ROOT_DIR / "chat_history_bench.txt").unlink(missing_ok=True)
+
+    print(f"Turns:                   {args.turns} (local stub)")
+    print(f"One-shot router / turn:  {cold:.1f} ms")
+    print(f"Agent server / turn:     {warm:.1f} ms")
+    print(f"Saved:                   {cold - warm:.1f} ms/turn ({cold / warm:.1f}x)")
+    if args.prewarm:
+        print()
+        print(f"Gemini classify ({args.classify_delay_ms:.0f} ms stub delay), {args.history_lines} history lines"
+              f"{', connection dropped every request' if args.drop_connections else ''}:")
+        print(f"  MOIBASH_PREWARM=0:     {no_prewarm:.1f} ms (median)")
+        print(f"  MOIBASH_PREWARM=1:     {with_prewarm:.1f} ms (median)")
+        print(f"  Saved:                 {no_prewarm - with_prewarm:.1f} ms/turn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+bench_file_index.py - list_files/search_files latency with and without the file index
+Builds a tree of --files files (100 top-level dirs × 10 subdirs, 100k by default)
+and calls the native list_files (recursive) and search_files ("*.py") of
+tools/filesystem/fs_tools.py:
+- walk: MOIBASH_FILE_INDEX=0, os.walk/scandir + stat per file on every call
+- first: first call of a fresh index (builds it)
+- repeat: later calls, nothing changed
+- after edit: one file appended to and one file created before the call
+for the inotify and mtime revalidation modes. Results are checked against walk.
+
+Usage: python3 benchmarks/bench_file_index.py [--files 100000] [--repeat 5]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "tools" / "filesystem"))
+
+import fs_tools
+import file_index
+
+
+def build_tree(root: Path, files: int):
+    per_dir = max(1, files // 1000)
+    count = 0
+    for top in range(100):
+        for sub in range(10):
+            directory = root / f"pkg_{top:02d}" / f"mod_{sub}"
+            directory.mkdir(parents=True)
+            for i in range(per_dir):
+                ext = (".py", ".sh", ".md", ".json")[i % 4]
+                (directory / f"file_{i:03d}{ext}").write_text("x" * (i % 50))
+                count += 1
+    return count
+
+
+def same_files(a: dict, b: dict) -> bool:
+    key = lambda item: item["path"]
+    return all(sorted(a.get(k, []), key=key) == sorted(b.get(k, []), key=key) for k in ("files", "folders"))
+
+
+def timed(call, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = call()
+    return (time.perf_counter() - start) * 1000 / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="moibash_bench_"))
+    try:
+        count = build_tree(work_dir, args.files)
+        os.environ["MOIBASH_USER_PWD"] = str(work_dir)
+        root = os.path.realpath(work_dir)
+        calls = {
+            "list_files": lambda: fs_tools.list_files(root, "*", "true"),
+            "search_files": lambda: fs_tools.search_files(root, "*.py", "true"),
+        }
+        print(f"tree: {count:,} files, 1,100 dirs")
+        print(f"{'':<14} {'mode':<8} {'walk ms':>9} {'first ms':>9} {'repeat ms':>10} {'after edit ms':>14}")
+
+        edits = 0
+        for mode in ("auto", "mtime"):
+            for name, call in calls.items():
+                file_index.MODE = "0"
+                walk, expected = timed(call, args.repeat)
+
+                file_index.MODE = mode
+                file_index._INDEXES.clear()
+                first, result = timed(call)
+                assert result == expected
+                repeat, result = timed(call, args.repeat)
+                assert result == expected
+
+                # Sửa một file và tạo một file mới ở thư mục đã index
+                edits += 1
+                directory = work_dir / "pkg_42" / "mod_3"
+                with open(directory / "file_000.py", "a") as f:
+                    f.write("y" * edits)
+                (directory / f"new_{mode}_{edits}.py").write_text("print()\n")
+                file_index.file_changed(str(directory / "file_000.py"))
+                after, result = timed(call)
+                file_index.MODE = "0"
+                # Entry mới nằm cuối danh sách của thư mục; thứ tự listdir có thể khác
+                assert same_files(result, call())
+                index = file_index._INDEXES.get(root)
+                label = "inotify" if mode == "auto" and index.inotify is not None else "mtime"
+                print(f"{name:<14} {label:<8} {walk:>9.1f} {first:>9.1f} {repeat:>10.1f} {after:>14.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
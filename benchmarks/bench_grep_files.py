@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+bench_grep_files.py - Finding code: grep_files vs a read_file loop
+Before grep_files the agent found code by listing files and calling read_file
+on them one by one (one model round trip and the whole file in the request
+per call). The read_file loop below is that without the model: the native
+search_files + read_file of tools/filesystem/fs_tools.py and a substring test.
+It is compared with grep_files scanned in-process and with the process pool,
+on a large tree (the Python standard library by default).
+
+Usage: python3 benchmarks/bench_grep_files.py [--root DIR] [--pattern TEXT] [--workers N]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "tools" / "filesystem"))
+
+import fs_tools
+import content_search
+import trigram_index
+
+
+def read_file_loop(root: str, pattern: str) -> tuple:
+    """(files containing pattern, read_file calls, bytes of read_file results)"""
+    found, calls, sent = set(), 0, 0
+    for entry in fs_tools.search_files(root, "*", "true")["files"]:
+        result = fs_tools.read_file(entry["path"])
+        while True:
+            calls += 1
+            sent += len(json.dumps(result, ensure_ascii=False).encode())
+            if pattern in result.get("content", ""):
+                found.add(entry["path"])
+            # File lớn được trả về từng trang
+            if "next_offset" not in result:
+                break
+            result = fs_tools.read_file(entry["path"], offset=str(result["next_offset"]))
+    return found, calls, sent
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", default=os.path.dirname(os.__file__))
+    parser.add_argument("--pattern", default="def __init_subclass__")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    root = os.path.realpath(args.root)
+    os.environ["MOIBASH_USER_PWD"] = root
+    print(f"root: {root}, pattern: {args.pattern!r}, cpus: {os.cpu_count()}")
+
+    start = time.perf_counter()
+    found, calls, sent = read_file_loop(root, args.pattern)
+    loop_ms = (time.perf_counter() - start) * 1000
+    print(f"{'read_file loop':<26} {loop_ms:>9.0f} ms  {len(found):>4} files  "
+          f"{calls:,} read_file calls, {sent / 1024 / 1024:,.0f} MB of results")
+
+    # Chỉ so sánh các file read_file loop cũng thấy (loop không áp dụng .gitignore)
+    content_search.MAX_RESULTS = 100000
+    # Đo quét thuần; trigram index: benchmarks/bench_trigram_index.py
+    trigram_index.ENABLED = False
+    for label, workers in (("grep_files in-process", 1), (f"grep_files {args.workers} workers", args.workers)):
+        content_search.WORKERS = workers
+        content_search.PARALLEL_MIN_BYTES = 0 if workers > 1 else content_search.PARALLEL_MIN_BYTES
+        for run in ("cold", "warm"):
+            start = time.perf_counter()
+            result = fs_tools.grep_files(root, args.pattern, max_results="100000")
+            elapsed = (time.perf_counter() - start) * 1000
+            files = {m["path"] for m in result["matches"]}
+            assert files <= found, files - found
+            size = len(json.dumps(result, ensure_ascii=False).encode())
+            print(f"{label + ' (' + run + ')':<26} {elapsed:>9.0f} ms  {len(files):>4} files  "
+                  f"{result['count']} lines, {result['files_scanned']:,} files scanned, {size / 1024:,.0f} KB result")
+
+
+if __name__ == "__main__":
+    main()
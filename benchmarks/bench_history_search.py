@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+bench_history_search.py - History retrieval latency and recall as the session grows
+Generates a chat history where each turn is about one of many topics (a file
+and a function name), plus one turn early in the session about a backup script
+that is asked about again at the end. Reports, per history size:
+- cold: first select() in a new process (builds the BM25 index)
+- turn: select() after appending one user/answer pair (agent server case)
+- whether the answer about the topic is in what gets sent, and its token count,
+  for the old last-20-messages window and for retrieval
+
+Usage: python3 benchmarks/bench_history_search.py [--turns 20]
+"""
+
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "tools"))
+
+from chat_history import ChatHistory
+from history_search import HistorySearch
+from conversation_budget import estimate_tokens
+
+SIZES = (1000, 5000, 20000)
+TOPICS = 300
+FILLER = ("cảm ơn nhé", "ok", "tiếp tục đi", "giải thích thêm giúp mình", "hay quá")
+
+
+def write_history(path: Path, messages: int, rng: random.Random):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(messages // 2):
+            if i == messages // 40:
+                # Lượt duy nhất về chủ đề sẽ được hỏi lại ở cuối
+                f.write("[09:00:00] USER: script backup_invoices.sh chạy lúc mấy giờ?\n")
+                f.write("[09:00:01] moiBash: backup_invoices.sh được cron chạy lúc 02:30 mỗi đêm, "
+                        "nén thư mục invoices/ và đẩy lên bucket s3://acme-archive.\n")
+                continue
+            topic = rng.randrange(TOPICS)
+            if rng.random() < 0.3:
+                f.write(f"[10:00:00] USER: {rng.choice(FILLER)}\n")
+                f.write("[10:00:01] moiBash: Rất vui được giúp bạn! Bạn cần gì thêm không?\n")
+                continue
+            f.write(f"[10:00:00] USER: đọc file service_{topic}.py và cho biết hàm handle_{topic} làm gì\n")
+            f.write(f"[10:00:01] moiBash: Hàm **handle_{topic}()** trong service_{topic}.py kiểm tra "
+                    f"request, ghi log rồi gọi process_{topic}() để lưu kết quả vào bảng orders_{topic}.\n"
+                    f"Nó trả về mã lỗi 4{topic % 100:02d} nếu request không hợp lệ.\n")
+
+
+def contains(messages: list, needle: str) -> bool:
+    return any(needle in m["parts"][0]["text"] for m in messages)
+
+
+def tokens(messages: list) -> int:
+    return sum(estimate_tokens(m["parts"][0]["text"]) for m in messages)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="moibash_bench_"))
+    try:
+        print(f"{'messages':>9} {'cold ms':>8} {'turn ms':>8}   {'last-20 recall/tokens':>22}   {'retrieval recall/tokens':>24}")
+        for size in SIZES:
+            rng = random.Random(size)
+            path = work_dir / f"chat_history_{size}.txt"
+            write_history(path, size, rng)
+            history = ChatHistory(path)
+            history.last(1)  # side index của chat_history.py, không tính vào thời gian
+
+            query = "script backup invoices đẩy lên bucket nào vậy?"
+            history.append("user", query)
+
+            search = HistorySearch(path)
+            start = time.perf_counter()
+            selected = search.select(query)
+            cold = time.perf_counter() - start
+
+            elapsed = 0.0
+            for i in range(args.turns):
+                history.append("user", f"câu hỏi thêm {i} về service_{rng.randrange(TOPICS)}.py")
+                history.append("model", "Đây là câu trả lời.")
+                start = time.perf_counter()
+                search.select(query)
+                elapsed += time.perf_counter() - start
+
+            window = history.last(20)
+            needle = "s3://acme-archive"
+            print(f"{size:>9,} {cold * 1000:>8.1f} {elapsed / args.turns * 1000:>8.2f}   "
+                  f"{('yes' if contains(window, needle) else 'no'):>15}/{tokens(window):>6}   "
+                  f"{('yes' if contains(selected, needle) else 'no'):>17}/{tokens(selected):>6}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
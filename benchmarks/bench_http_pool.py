@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+bench_http_pool.py - Micro-benchmark: pooled session vs new connection per turn
+Starts a local stub Gemini server (HTTP or self-signed HTTPS) and times N
+generateContent-style POSTs made with requests.post() (new TCP/TLS handshake
+every turn) versus gemini_client.get_session() (connection reused).
+
+Usage: python3 benchmarks/bench_http_pool.py [--turns 50] [--tls]
+"""
+
+import os
+import sys
+import ssl
+import socket
+import json
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+import requests
+import gemini_client
+
+STUB_RESPONSE = json.dumps({
+    "candidates": [{"content": {"role": "model", "parts": [{"text": "ok"}]}, "finishReason": "STOP"}]
+}).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Minimal generateContent stub with HTTP/1.1 keep-alive"""
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Header và body được ghi riêng: tắt Nagle để không dính delayed-ACK 40ms
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(STUB_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(STUB_RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_cert(tmpdir: str) -> tuple:
+    """Generate a throwaway self-signed certificate with openssl"""
+    cert, key = os.path.join(tmpdir, "cert.pem"), os.path.join(tmpdir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+def start_server(tls: bool, tmpdir: str) -> tuple:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    scheme = "http"
+    if tls:
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(*make_cert(tmpdir))
+        server.socket = ctx.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}/v1beta/models/stub:generateContent"
+
+
+def run(post, url: str, turns: int) -> float:
+    """Return mean milliseconds per turn"""
+    payload = {"contents": [{"role": "user", "parts": [{"text": "x" * 2048}]}]}
+    start = time.perf_counter()
+    for _ in range(turns):
+        response = post(url, params={"key": "stub"}, json=payload, timeout=10, verify=False)
+        response.raise_for_status()
+    return (time.perf_counter() - start) * 1000 / turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--tls", action="store_true", help="serve HTTPS to include the TLS handshake")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        server, url = start_server(args.tls, tmpdir)
+        try:
+            cold = run(requests.post, url, args.turns)
+            session = gemini_client.get_session()
+            session.post(url, json={}, verify=False)  # mở connection trước (giống lượt đầu tiên)
+            warm = run(session.post, url, args.turns)
+        finally:
+            gemini_client.close_session()
+            server.shutdown()
+
+    print(f"Turns:                  {args.turns} ({'https' if args.tls else 'http'})")
+    print(f"New connection / turn:  {cold:.2f} ms")
+    print(f"Pooled session / turn:  {warm:.2f} ms")
+    print(f"Handshake cost saved:   {cold - warm:.2f} ms/turn ({(cold - warm) * args.turns:.0f} ms over {args.turns} turns)")
+
+
+if __name__ == "__main__":
+    main()
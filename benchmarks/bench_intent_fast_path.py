@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+bench_intent_fast_path.py - Coverage, accuracy and latency of the local intent tier
+Runs intent.local_classify() over a small labeled set of typical messages and
+reports how many would skip the Gemini round-trip at the configured threshold,
+how many of those are correct, and the per-message classification time.
+
+Usage: python3 benchmarks/bench_intent_fast_path.py [--threshold 0.75]
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+import intent
+
+SAMPLES = [
+    ("đọc file main.py", "filesystem"),
+    ("doc file README.md", "filesystem"),
+    ("tạo file hello.txt với nội dung xin chào", "filesystem"),
+    ("liệt kê các file trong thư mục src", "filesystem"),
+    ("đổi tên file a.txt thành b.txt", "filesystem"),
+    ("chạy script build.sh", "filesystem"),
+    ("xóa folder tmp", "filesystem"),
+    ("file router.sh có chức năng gì", "filesystem"),
+    ("bao nhiêu file python trong project", "filesystem"),
+    ("sửa lỗi trong utils.py", "filesystem"),
+    ("lịch hôm nay", "calendar"),
+    ("lich tuan nay co gi", "calendar"),
+    ("thêm cuộc họp lúc 3h chiều mai", "calendar"),
+    ("hủy lịch hẹn với khách hàng", "calendar"),
+    ("tạo event sinh nhật ngày 20/10", "calendar"),
+    ("thời tiết Hà Nội", "weather"),
+    ("thoi tiet sai gon hom nay", "weather"),
+    ("nhiệt độ Đà Nẵng ngày mai", "weather"),
+    ("chiều nay có mưa không", "weather"),
+    ("vẽ một con mèo đang ngủ", "image_create"),
+    ("tạo ảnh hoàng hôn trên biển", "image_create"),
+    ("generate image of a robot", "image_create"),
+    ("tin tức công nghệ mới nhất", "google_search"),
+    ("tin tuc bong da", "google_search"),
+    ("search giá vàng hôm nay", "google_search"),
+    ("xin chào", "chat"),
+    ("cảm ơn bạn nhiều", "chat"),
+    ("bạn là ai", "chat"),
+    ("giải thích thuật toán quicksort", "chat"),
+    ("Python là gì?", "chat"),
+    ("kể cho tôi một câu chuyện cười", "chat"),
+    ("chạy bộ buổi sáng có tốt không", "chat"),
+    ("tìm kiếm file config", "filesystem"),
+    ("mua sắm ở đâu rẻ", "chat"),
+    # Từ khóa đơn lẻ trùng từ thông dụng: không được đi fast path sai
+    ("kể cho tôi nghe về lịch sử Việt Nam", "chat"),
+    ("lịch sử nhà Trần", "chat"),
+    ("ảnh hưởng của AI tới việc làm", "chat"),
+    ("file PDF khác Word thế nào", "chat"),
+    ("mở youtube.com", "chat"),
+    ("du lịch Đà Lạt mùa nào đẹp", "chat"),
+    ("đọc tin trên vnexpress.net", "google_search"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threshold", type=float, default=intent.FAST_PATH_THRESHOLD)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    hits = correct = 0
+    for message, expected in SAMPLES:
+        predicted, confidence = intent.local_classify(message)
+        if confidence >= args.threshold:
+            hits += 1
+            correct += predicted == expected
+            mark = "✓" if predicted == expected else "✗"
+        else:
+            mark = "→ gemini"
+        print(f"{confidence:5.2f}  {predicted:<14} {mark:<9} {message}")
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        for message, _ in SAMPLES:
+            intent.local_classify(message)
+    per_message = (time.perf_counter() - start) * 1e6 / (args.rounds * len(SAMPLES))
+
+    print()
+    print(f"Threshold:           {args.threshold}")
+    print(f"Fast-path hit rate:  {hits}/{len(SAMPLES)} ({hits / len(SAMPLES):.0%})")
+    print(f"Fast-path accuracy:  {correct}/{hits} ({correct / hits if hits else 0:.0%})")
+    print(f"Local classify:      {per_message:.1f} µs/message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+bench_patch_file.py - Changing one line of a file: update_file overwrite vs mode="patch"
+For copies of files of growing size (function_call.py repeated), a one-line
+change made the old way (the whole new content as the update_file argument)
+and as a SEARCH/REPLACE block:
+- sent: bytes of the function call arguments the model has to generate
+- updatefile.sh: the content goes through argv, which fails past
+  MAX_ARG_STRLEN (128 KB on Linux)
+- native overwrite vs patch: time to apply (fs_tools.py, in-process)
+- backup: bytes stored by backup_file (whole file) vs backup_patch (touched ranges)
+
+Usage: python3 benchmarks/bench_patch_file.py [--sizes 64,512,4096,32768] [--repeat 5]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SCRIPT_DIR = ROOT_DIR / "tools" / "filesystem"
+sys.path.insert(0, str(SCRIPT_DIR))
+
+import fs_tools
+import file_patch
+import backup_manager
+
+SOURCE = SCRIPT_DIR / "function_call.py"
+
+
+def args_bytes(args: dict) -> int:
+    return len(json.dumps(args, ensure_ascii=False).encode())
+
+
+def timed(path: str, content: str, call, repeat: int = 1):
+    """ms per call, the file being reset to content before each one"""
+    total = 0.0
+    for _ in range(repeat):
+        Path(path).write_text(content)
+        start = time.perf_counter()
+        result = call()
+        total += time.perf_counter() - start
+    return total * 1000 / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="64,512,4096,32768", help="KB")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    source = SOURCE.read_text()
+    work_dir = Path(tempfile.mkdtemp(prefix="moibash_bench_"))
+    backups = backup_manager.BackupManager(f"bench_{os.getpid()}")
+    try:
+        print(f"{'size':>9} {'sent':>11} {'patch':>7} {'sh ms':>9} {'write ms':>9} {'patch ms':>9} "
+              f"{'backup':>11} {'patch bk':>9}")
+        for kb in (int(value) for value in args.sizes.split(",")):
+            path = str(work_dir / f"file_{kb}.py")
+            content = (source * (kb * 1024 // len(source) + 1))[:kb * 1024]
+            content = content[:content.rfind("\n") + 1]
+            lines = content.splitlines()
+            # Dòng duy nhất ở giữa file được sửa
+            target = len(lines) // 2
+            lines[target] = f"MARKER = {kb}"
+            content = "\n".join(lines) + "\n"
+            changed = content.replace(f"MARKER = {kb}\n", f"MARKER = {kb + 1}\n")
+            block = (f"<<<<<<< SEARCH\n{lines[target - 1]}\nMARKER = {kb}\n=======\n"
+                     f"{lines[target - 1]}\nMARKER = {kb + 1}\n>>>>>>> REPLACE")
+            overwrite_args = {"file_path": path, "content": changed[:-1], "mode": "overwrite"}
+            patch_args = {"file_path": path, "content": block, "mode": "patch"}
+
+            try:
+                sh_ms, result = timed(path, content, lambda: subprocess.run(
+                    [str(SCRIPT_DIR / "updatefile.sh"), path, changed[:-1], "overwrite"],
+                    capture_output=True, text=True))
+                sh = f"{sh_ms:.1f}" if result.returncode == 0 else "argv fail"
+            except OSError:
+                sh = "argv fail"
+            write_ms, _ = timed(path, content, lambda: fs_tools.update_file(path, changed[:-1], "overwrite"), args.repeat)
+            patch_ms, result = timed(path, content, lambda: fs_tools.update_file(path, block, "patch"), args.repeat)
+            assert result.get("success") and Path(path).read_text() == changed, result
+
+            Path(path).write_text(content)
+            stored = backups.stats()["stored"]
+            backups.backup_file(path, "update")
+            full = backups.stats()["stored"] - stored
+            stored += full
+            backups.backup_patch(path, file_patch.prepare(path, block).undo)
+            ranges = backups.stats()["stored"] - stored
+            print(f"{kb:>7}KB {args_bytes(overwrite_args):>11,} {args_bytes(patch_args):>7,} {sh:>9} "
+                  f"{write_ms:>9.2f} {patch_ms:>9.2f} {full:>11,} {ranges:>9,}")
+    finally:
+        backups.clear_backups()
+        shutil.rmtree(backups.backup_dir, ignore_errors=True)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
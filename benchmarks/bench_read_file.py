@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+bench_read_file.py - read_file on a huge log: whole-file read vs mmap ranges
+Writes a log of --size-mb MB and measures, each in a fresh process (time,
+peak RSS, bytes of the JSON tool result that would go into the request):
+- readfile.sh: cat | python3 json.dumps, captured like call_filesystem_script()
+- whole read: what the native read_file did before (read + json.dumps)
+- first page: read_file(path) now (auto-paged above MOIBASH_READ_MAX_BYTES)
+- line range: read_file(path, start_line=N*3/4, end_line=+50)
+- next page: read_file(path, offset=<middle of the file>)
+
+Usage: python3 benchmarks/bench_read_file.py [--size-mb 200]
+"""
+
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+FS_DIR = ROOT_DIR / "tools" / "filesystem"
+
+CHILD = r'''
+import sys, json, time, resource, subprocess
+sys.path.insert(0, sys.argv[1])
+import fs_tools
+variant, path, lines = sys.argv[2], sys.argv[3], int(sys.argv[4])
+start = time.perf_counter()
+if variant == "readfile.sh":
+    out = subprocess.run([sys.argv[1] + "/readfile.sh", path], capture_output=True, text=True).stdout
+    result = json.loads(out)
+elif variant == "whole read":
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        content = f.read()
+    result = {"content": content, "path": path, "size": len(content)}
+elif variant == "first page":
+    result = fs_tools.read_file(path)
+elif variant == "line range":
+    first = lines * 3 // 4
+    result = fs_tools.read_file(path, start_line=str(first), end_line=str(first + 50))
+else:
+    result = fs_tools.read_file(path, offset=str(int(sys.argv[5]) // 2))
+payload = len(json.dumps(result, ensure_ascii=False).encode())
+elapsed = time.perf_counter() - start
+rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+print(json.dumps({"ms": elapsed * 1000, "rss_mb": rss / 1024, "payload": payload}))
+'''
+
+VARIANTS = ("readfile.sh", "whole read", "first page", "line range", "next page")
+
+
+def write_log(path: Path, size: int) -> int:
+    lines = 0
+    with open(path, "w", encoding="utf-8") as f:
+        written = 0
+        while written < size:
+            line = f"2026-10-18 13:{lines % 60:02d}:00 INFO worker-{lines % 16} xử lý request #{lines} xong trong {lines % 997} ms\n"
+            f.write(line)
+            written += len(line.encode())
+            lines += 1
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=200)
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="moibash_bench_"))
+    try:
+        path = work_dir / "huge.log"
+        lines = write_log(path, args.size_mb * 1024 * 1024)
+        size = path.stat().st_size
+        print(f"file: {size / 1024 / 1024:.0f} MB, {lines:,} lines")
+        print(f"{'variant':<12} {'ms':>9} {'peak RSS MB':>12} {'result bytes':>14}")
+        for variant in VARIANTS:
+            out = subprocess.run([sys.executable, "-c", CHILD, str(FS_DIR), variant, str(path), str(lines), str(size)],
+                                 capture_output=True, text=True, check=True).stdout
+            stats = json.loads(out)
+            print(f"{variant:<12} {stats['ms']:>9.1f} {stats['rss_mb']:>12.0f} {stats['payload']:>14,}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+bench_symbols.py - Reading one function: read_file vs list_symbols + read_symbol
+For each file (the largest Python/shell sources of this repo by default), the
+bytes of tool results the model receives to look at one function:
+- read_file: the whole file (what the agent did before)
+- outline + symbol: list_symbols once, then read_symbol of the function,
+  averaged over every function/method of the file
+and the time to build the outline: cold (parse), warm (cache hit, stat only)
+and after the file is touched (mtime changed → parsed again).
+
+Usage: python3 benchmarks/bench_symbols.py [FILE ...] [--repeat 20]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "tools" / "filesystem"))
+
+import fs_tools
+import symbol_index
+
+DEFAULT_FILES = (
+    "tools/filesystem/function_call.py",
+    "tools/agent_server.py",
+    "tools/filesystem/fs_tools.py",
+    "moibash.sh",
+    "tools/filesystem/updatefile.sh",
+)
+
+
+def result_bytes(result: dict) -> int:
+    return len(json.dumps(result, ensure_ascii=False).encode())
+
+
+def timed(call, repeat: int = 1) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    files = [os.path.abspath(f) for f in args.files] or [str(ROOT_DIR / f) for f in DEFAULT_FILES if (ROOT_DIR / f).exists()]
+
+    print(f"{'file':<26} {'lines':>6} {'syms':>5} {'read_file':>10} {'outline':>8} {'symbol':>8} "
+          f"{'saved':>6} {'cold ms':>8} {'warm ms':>8} {'touch ms':>9}")
+    for path in files:
+        symbol_index._CACHE.clear()
+        cold = timed(lambda: symbol_index.symbols(path))
+        warm = timed(lambda: symbol_index.symbols(path), args.repeat)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        try:
+            touched = timed(lambda: symbol_index.symbols(path))
+        finally:
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        whole = result_bytes(fs_tools.read_file(path))
+        outline = fs_tools.list_symbols(path)
+        functions = [s for s in outline["symbols"] if s["kind"] != "class"]
+        if not functions:
+            continue
+        per_symbol = sum(result_bytes(fs_tools.read_symbol(path, s["name"])) for s in functions) / len(functions)
+        used = result_bytes(outline) + per_symbol
+        with open(path, encoding="utf-8", errors="replace") as f:
+            lines = sum(1 for _ in f)
+        print(f"{os.path.relpath(path, ROOT_DIR)[-26:]:<26} {lines:>6} {len(outline['symbols']):>5} {whole:>10,} "
+              f"{result_bytes(outline):>8,} {per_symbol:>8,.0f} {1 - used / whole:>6.0%} "
+              f"{cold:>8.2f} {warm:>8.3f} {touched:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
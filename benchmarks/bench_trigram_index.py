@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+bench_trigram_index.py - grep_files with and without the trigram index
+On a copy of a large tree (the Python standard library by default), for
+literal and regex patterns:
+- full scan: MOIBASH_GREP_INDEX=0, every file read on each call
+- build: first sync of a fresh index (in a temporary cache dir), in the
+  background thread grep_files starts, waited for here
+- warm: later calls, nothing changed (file list reused, candidates from the index)
+- after edit: one file appended to before the call (one file re-indexed)
+Results are checked against the full scan.
+
+Usage: python3 benchmarks/bench_trigram_index.py [--root DIR] [--repeat 5]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "tools" / "filesystem"))
+
+import content_search
+import trigram_index
+
+PATTERNS = (
+    ("def __init_subclass__", False),
+    ("DeprecationWarning", False),
+    (r"class \w+Error\(", True),
+    ("TODO|FIXME|XXX", True),
+    ("no_such_identifier_anywhere", False),
+)
+
+
+def grep(root: str, pattern: str, regex: bool) -> dict:
+    return content_search.grep(root, pattern, regex=regex, max_results=100000)
+
+
+def timed(call, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = call()
+    return (time.perf_counter() - start) * 1000 / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", default=os.path.dirname(os.__file__))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    work_dir = Path(tempfile.mkdtemp(prefix="moibash_bench_"))
+    try:
+        root = str(work_dir / "tree")
+        shutil.copytree(args.root, root, symlinks=True)
+        os.environ["MOIBASH_USER_PWD"] = root
+        cache_dir = work_dir / "cache"
+        trigram_index.CACHE_DIR = cache_dir
+        tree = content_search.list_tree(root)[0]
+        print(f"root: {args.root}, {len(tree.files):,} files, {tree.total_bytes / 1024 / 1024:,.0f} MB, cpus: {os.cpu_count()}")
+
+        build, _ = timed(lambda: (grep(root, PATTERNS[0][0], False), trigram_index.for_root(root).builder.join()))
+        size = sum(f.stat().st_size for f in cache_dir.rglob("*"))
+        print(f"build: {build / 1000:.1f} s, index {size / 1024 / 1024:.0f} MB")
+
+        edited = next(path for _, _, path, size, _ in tree.files if path.endswith(".py") and 0 < size < 65536)
+        print(f"{'pattern':<30} {'full ms':>9} {'warm ms':>9} {'edit ms':>9} {'files':>7} {'scanned':>8}")
+        for i, (pattern, regex) in enumerate(PATTERNS):
+            trigram_index.ENABLED = False
+            full, expected = timed(lambda: grep(root, pattern, regex), args.repeat)
+            trigram_index.ENABLED = True
+            warm, result = timed(lambda: grep(root, pattern, regex), args.repeat)
+            assert result["matches"] == expected["matches"], pattern
+            with open(edited, "ab") as f:
+                f.write(f"\n# edit {i}\n".encode())
+            after, result = timed(lambda: grep(root, pattern, regex))
+            trigram_index.ENABLED = False
+            assert result["matches"] == grep(root, pattern, regex)["matches"], pattern
+            trigram_index.ENABLED = True
+            files = len({m["path"] for m in result["matches"]})
+            print(f"{pattern:<30} {full:>9.1f} {warm:>9.1f} {after:>9.1f} {files:>7} {result['files_scanned']:>8,}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
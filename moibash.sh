@@ -72,10 +72,35 @@ check_and_setup_api_key() {
 
 # File lưu lịch sử chat (tạm thời trong session)
 CHAT_HISTORY="$SCRIPT_DIR/chat_history_$$.txt"
+# Index offset/role của từng tin nhắn (tools/chat_history.py)
+CHAT_HISTORY_INDEX="$CHAT_HISTORY.idx"
 
 # Export PID để các subprocess sử dụng
 export MOIBASH_PID="$$"
 
+# Resident agent server (giữ Python, HTTP connection và các tool đã load giữa các lượt chat)
+# Tắt bằng MOIBASH_DAEMON=0
+AGENT_SERVER_SCRIPT="$SCRIPT_DIR/tools/agent_server.py"
+AGENT_SOCKET="/tmp/moibash_agent_$$.sock"
+AGENT_SERVER_PID=""
+
+start_agent_server() {
+    if [ "${MOIBASH_DAEMON:-1}" = "0" ] || [ ! -f "$AGENT_SERVER_SCRIPT" ] || ! command -v python3 &> /dev/null; then
+        return
+    fi
+    python3 "$AGENT_SERVER_SCRIPT" "$AGENT_SOCKET" < /dev/null > /dev/null 2>&1 &
+    AGENT_SERVER_PID=$!
+    export MOIBASH_AGENT_SOCKET="$AGENT_SOCKET"
+}
+
+stop_agent_server() {
+    if [ -n "$AGENT_SERVER_PID" ]; then
+        kill "$AGENT_SERVER_PID" 2>/dev/null
+        AGENT_SERVER_PID=""
+    fi
+    rm -f "$AGENT_SOCKET"
+}
+
 # Version
 VERSION="1.1.0"
 
@@ -283,6 +308,9 @@ show_help() {
     echo -e "${CYAN}  /help${RESET}            - Hiển thị danh sách lệnh"
     echo -e "${CYAN}  /clear${RESET}           - Xóa màn hình và lịch sử chat"
     echo -e "${CYAN}  /rollback${RESET}        - Hoàn tác tất cả thay đổi file trong session"
+    echo -e "${CYAN}  /rollback --to N${RESET}     - Hoàn tác các thao tác sau thao tác #N"
+    echo -e "${CYAN}  /rollback --at HH:MM${RESET} - Hoàn tác các thao tác sau thời điểm đó"
+    echo -e "${CYAN}  /rollback --path X${RESET}   - Chỉ hoàn tác thay đổi của file/folder X"
     echo -e "${CYAN}  /rollback-status${RESET} - Xem danh sách file đã thay đổi"
     echo -e "${CYAN}  /exit, /quit${RESET}     - Thoát chương trình"
     echo ""
@@ -330,23 +358,32 @@ get_timestamp() {
     date '+%H:%M:%S'
 }
 
+# Ghi một tin nhắn vào lịch sử: một lần write, giữ flock để tool Python
+# (tools/chat_history.py) không đọc phải tin nhắn đang ghi dở
+append_history() {
+    local record="[$(get_timestamp)] $1: $2"
+    if command -v flock &> /dev/null; then
+        { flock -x 9; printf '%s\n' "$record" >&9; } 9>> "$CHAT_HISTORY"
+    else
+        printf '%s\n' "$record" >> "$CHAT_HISTORY"
+    fi
+}
+
 # Hàm hiển thị tin nhắn của user
 display_user_message() {
     local message="$1"
-    local timestamp=$(get_timestamp)
     echo -e "${GREEN}${BOLD}Bạn:${RESET} $message"
     # Lưu vào lịch sử
-    echo "[$timestamp] USER: $message" >> "$CHAT_HISTORY"
+    append_history "USER" "$message"
 }
 
 # Hàm hiển thị tin nhắn của agent
 display_agent_message() {
     local message="$1"
-    local timestamp=$(get_timestamp)
     echo -ne "${MAGENTA}${BOLD}moiBash:${RESET} "
     parse_markdown "$message"
     # Lưu vào lịch sử
-    echo "[$timestamp] moiBash: $message" >> "$CHAT_HISTORY"
+    append_history "moiBash" "$message"
 }
 
 # Hàm hiển thị lỗi
@@ -402,17 +439,20 @@ handle_command() {
             show_banner
             # Xóa lịch sử chat
             > "$CHAT_HISTORY"
+            rm -f "$CHAT_HISTORY_INDEX"
             display_info "Đã xóa màn hình và lịch sử chat!"
             return 0
             ;;
-        /rollback)
-            # Rollback filesystem operations
+        /rollback|"/rollback "*)
+            # Rollback filesystem operations (tất cả, hoặc --to N / --at TIME / --path X)
             echo -e "${YELLOW}${BOLD}🔄 Đang rollback các thao tác filesystem...${RESET}\n"
+            local rollback_args=()
+            read -r -a rollback_args <<< "${input#/rollback}"
             
             # Call backup manager to rollback
             local backup_script="$SCRIPT_DIR/tools/filesystem/backup_manager.py"
             if [ -f "$backup_script" ]; then
-                local result=$("$backup_script" rollback 2>&1)
+                local result=$("$backup_script" rollback "${rollback_args[@]}" 2>&1)
                 
                 # Parse result and display
                 if echo "$result" | grep -q '"success": true'; then
@@ -443,7 +483,8 @@ handle_command() {
         /exit|/quit)
             echo -e "\n${CYAN}${BOLD}👋 Tạm biệt! Hẹn gặp lại bạn!${RESET}\n"
             # Xóa file lịch sử tạm
-            rm -f "$CHAT_HISTORY"
+            rm -f "$CHAT_HISTORY" "$CHAT_HISTORY_INDEX"
+            stop_agent_server
             exit 0
             ;;
         /*)
@@ -473,8 +514,7 @@ process_input() {
     # display_user_message "$user_input"
     
     # LƯU TIN NHẮN USER VÀO LỊCH SỬ
-    local timestamp=$(get_timestamp)
-    echo "[$timestamp] USER: $user_input" >> "$CHAT_HISTORY"
+    append_history "USER" "$user_input"
     
     # Kiểm tra xem có phải lệnh đặc biệt không
     if handle_command "$user_input"; then
@@ -513,7 +553,10 @@ process_input() {
     local agent_response=$(call_agent "$user_input")
     
     if [ $? -eq 0 ]; then
-        display_agent_message "$agent_response"
+        # Response rỗng: agent đã stream câu trả lời ra terminal (MOIBASH_STREAM=1)
+        if [ -n "$agent_response" ]; then
+            display_agent_message "$agent_response"
+        fi
     else
         display_error "Không thể nhận phản hồi từ agent!"
     fi
@@ -524,6 +567,9 @@ init_chat() {
     # Tạo file lịch sử tạm
     touch "$CHAT_HISTORY"
     
+    # Khởi động agent server ở background (load trong lúc hiển thị banner)
+    start_agent_server
+    
     # Xóa màn hình và hiển thị banner
     clear_screen
     show_banner
@@ -567,7 +613,8 @@ main_loop() {
 # Hàm dọn dẹp khi thoát (Ctrl+C)
 cleanup() {
     echo -e "\n\n${YELLOW}Đang dọn dẹp...${RESET}"
-    rm -f "$CHAT_HISTORY"
+    rm -f "$CHAT_HISTORY" "$CHAT_HISTORY_INDEX"
+    stop_agent_server
     echo -e "${CYAN}${BOLD}👋 Tạm biệt! Hẹn gặp lại bạn!${RESET}\n"
     exit 0
 }
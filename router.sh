@@ -18,6 +18,9 @@ USER_MESSAGE="$1"
 # Thư mục tools
 TOOLS_DIR="$SCRIPT_DIR/tools"
 
+# Export chat history file path (sử dụng PID từ main process) cho các tool Python
+export MOIBASH_CHAT_HISTORY="$SCRIPT_DIR/chat_history_${MOIBASH_PID:-$$}.txt"
+
 # Spinner hiển thị khi đợi agent phản hồi
 SPINNER_PID=""
 SPINNER_ACTIVE=0
@@ -176,12 +179,25 @@ check_api_key() {
     return 0
 }
 
+# Gọi resident agent (tools/agent_server.py) nếu moibash.sh đã khởi động nó
+# Trả về 75 nếu không có server → dùng các script như bình thường
+agent_client() {
+    if [ -z "$MOIBASH_AGENT_SOCKET" ] || [ ! -S "$MOIBASH_AGENT_SOCKET" ]; then
+        return 75
+    fi
+    python3 -S "$TOOLS_DIR/agent_client.py" "$@"
+}
+
 # Hàm phân loại intent
 classify_intent() {
     local message="$1"
+    local intent
     
-    # Gọi intent classifier
-    local intent=$("$TOOLS_DIR/intent.sh" "$message" 2>/dev/null)
+    # Ưu tiên resident agent, sau đó mới gọi intent classifier
+    intent=$(agent_client classify "$message" 2>/dev/null)
+    if [ $? -ne 0 ] || [ -z "$intent" ]; then
+        intent=$("$TOOLS_DIR/intent.sh" "$message" 2>/dev/null)
+    fi
     
     if [ $? -eq 0 ] && [ ! -z "$intent" ]; then
         echo "$intent"
@@ -198,9 +214,17 @@ execute_tool() {
     local intent="$1"
     local message="$2"
     
+    # Resident agent chạy tool trong process đã warm
+    export MOIBASH_USER_PWD="$PWD"
+    agent_client run "$intent" "$message"
+    local agent_exit=$?
+    if [ $agent_exit -ne 75 ]; then
+        return $agent_exit
+    fi
+    
     case "$intent" in
         chat)
-            "$TOOLS_DIR/chat.sh" "$message"
+            "$TOOLS_DIR/chat/function_call.py" "$message"
             ;;
         image_create)
             "$TOOLS_DIR/image_create.sh" "$message"
@@ -225,8 +249,6 @@ execute_tool() {
             if [ -f "$TOOLS_DIR/filesystem/function_call.py" ]; then
                 # Export PWD để Python script có thể đọc
                 export MOIBASH_USER_PWD="$PWD"
-                # Export chat history file path (sử dụng PID từ main process)
-                export MOIBASH_CHAT_HISTORY="$SCRIPT_DIR/chat_history_${MOIBASH_PID:-$$}.txt"
                 "$TOOLS_DIR/filesystem/function_call.py" "$message"
             else
                 echo "❌ Filesystem agent chưa được cài đặt"
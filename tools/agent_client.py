@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+agent_client.py - Thin client for agent_server.py
+Usage:
+    agent_client.py classify <message>        → in intent
+    agent_client.py run <intent> <message>    → chạy tool, exit code của tool
+Exit code 75 (EX_TEMPFAIL) nghĩa là không kết nối được server: router.sh
+sẽ fallback sang chạy script trực tiếp.
+Chỉ dùng stdlib để khởi động nhanh (router.sh gọi với python3 -S).
+"""
+
+import os
+import sys
+import json
+import socket
+
+EX_TEMPFAIL = 75
+
+PASSTHROUGH_ENV = (
+    "MOIBASH_SPINNER_PID",
+    "MOIBASH_SPINNER_ACTIVE",
+    "MOIBASH_USER_PWD",
+    "MOIBASH_CHAT_HISTORY",
+)
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ("classify", "run") or (sys.argv[1] == "run" and len(sys.argv) < 4):
+        print(__doc__.strip(), file=sys.stderr)
+        sys.exit(2)
+
+    socket_path = os.environ.get("MOIBASH_AGENT_SOCKET", "")
+    request = {
+        "action": sys.argv[1],
+        "cwd": os.getcwd(),
+        "env": {k: os.environ[k] for k in PASSTHROUGH_ENV if k in os.environ},
+    }
+    if sys.argv[1] == "classify":
+        request["message"] = sys.argv[2]
+    else:
+        request["intent"] = sys.argv[2]
+        request["message"] = sys.argv[3]
+
+    data = (json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        # Gửi kèm stdin/stdout/stderr để server in thẳng ra terminal của user
+        sent = socket.send_fds(sock, [data], [0, 1, 2])
+        sock.sendall(data[sent:])
+    except OSError:
+        sys.exit(EX_TEMPFAIL)
+
+    response = b""
+    try:
+        while not response.endswith(b"\n"):
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            response += chunk
+    except KeyboardInterrupt:
+        # Server cũng nhận Ctrl+C (cùng process group) và tự hủy lượt đang chạy
+        sys.exit(130)
+    finally:
+        sock.close()
+
+    try:
+        reply = json.loads(response.decode("utf-8"))
+    except ValueError:
+        # Server chết giữa lượt: không fallback cho "run" để tránh chạy tool hai lần
+        sys.exit(EX_TEMPFAIL if request["action"] == "classify" else 1)
+
+    if "intent" in reply:
+        print(reply["intent"])
+        sys.exit(0)
+    sys.exit(reply.get("exit_code", 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+agent_server.py - Resident moibash agent listening on a Unix socket
+Started by moibash.sh for the whole chat session. Keeps the interpreter, the
+pooled HTTP session, the intent classifier and the Python tool agents loaded
+so a chat turn does not pay for a new process tree. router.sh talks to it
+through agent_client.py, which passes its stdin/stdout/stderr along with the
+request so tools read from and print to the user's terminal as usual.
+
+While a message is being classified, the server speculatively pre-warms the
+tools it is likely to be routed to (chat history, calendar auth/token refresh,
+Gemini connection). The run request then commits to the chosen tool and the
+other warm-ups are discarded. Disable with MOIBASH_PREWARM=0.
+
+Protocol (one request per connection, JSON lines):
+    → {"action": "classify"|"run", "message": ..., "intent": ..., "cwd": ..., "env": {...}}
+      + SCM_RIGHTS [stdin, stdout, stderr]
+    ← {"intent": ...} or {"exit_code": ...}
+"""
+
+import os
+import sys
+import json
+import signal
+import socket
+import subprocess
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+TOOLS_DIR = Path(__file__).resolve().parent
+sys.path[:0] = [str(TOOLS_DIR), str(TOOLS_DIR / "filesystem"), str(TOOLS_DIR / "calendar"), str(TOOLS_DIR / "chat")]
+
+import intent
+from gemini_client import get_session, warm_connection
+
+# Các tool Python được load sẵn trong process
+PYTHON_AGENTS = {
+    "filesystem": TOOLS_DIR / "filesystem" / "function_call.py",
+    "calendar": TOOLS_DIR / "calendar" / "function_call.py",
+    "chat": TOOLS_DIR / "chat" / "function_call.py",
+}
+
+# Các tool shell vẫn chạy bằng subprocess (như router.sh)
+SCRIPT_TOOLS = {
+    "image_create": TOOLS_DIR / "image_create.sh",
+    "google_search": TOOLS_DIR / "google_search.sh",
+    "weather": TOOLS_DIR / "weather" / "function_call.sh",
+}
+
+# Biến môi trường của router.sh được chuyển sang cho từng lượt
+PASSTHROUGH_ENV = (
+    "MOIBASH_SPINNER_PID",
+    "MOIBASH_SPINNER_ACTIVE",
+    "MOIBASH_USER_PWD",
+    "MOIBASH_CHAT_HISTORY",
+)
+
+MAX_REQUEST_BYTES = 1024 * 1024
+
+# Speculative pre-warm
+PREWARM_ENABLED = os.environ.get("MOIBASH_PREWARM", "1").lower() not in ("0", "false", "no")
+PREWARM_WAIT = 10  # giây tối đa chờ warm-up của tool được chọn
+
+
+def load_agent(name: str, path: Path):
+    """Import a tool's function_call.py under a unique module name"""
+    spec = importlib.util.spec_from_file_location(f"moibash_{name}_agent", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def exit_code_of(exc: SystemExit) -> int:
+    """Convert SystemExit.code to a process exit status"""
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code
+    print(exc.code, file=sys.stderr)
+    return 1
+
+
+class Prewarmer:
+    """Warm up the likely tools for one message in background threads"""
+
+    def __init__(self, executor: ThreadPoolExecutor, agents: Dict[str, Any], request: Dict[str, Any]):
+        self.executor = executor
+        self.agents = agents
+        # Chỉ dùng giá trị truyền vào: os.environ của process bị đổi trong lúc chạy lượt
+        self.history = request.get("env", {}).get("MOIBASH_CHAT_HISTORY", "")
+        self.futures: Dict[str, List[Future]] = {}
+
+    def candidates(self, message: str) -> List[str]:
+        """Tools worth warming, most likely first"""
+        prewarmable = [name for name in PYTHON_AGENTS if name in self.agents]
+        best, confidence = intent.local_classify(message)
+        if confidence >= intent.FAST_PATH_THRESHOLD:
+            return [best] if best in prewarmable else []
+        scores = intent.score_intents(message)
+        likely = sorted((n for n in prewarmable if scores.get(n, 0) > 0), key=lambda n: -scores[n])
+        # Không có tín hiệu nào: chỉ warm filesystem (tool hay dùng nhất, warm-up in-process).
+        # Calendar chạy auth.sh trong subprocess, tranh CPU với lượt hiện tại nếu đoán sai
+        if not likely and "filesystem" in prewarmable:
+            return ["filesystem"]
+        return likely
+
+    def start(self, message: str):
+        for name in self.candidates(message):
+            module = self.agents[name]
+            tasks = [(warm_connection, module.GEMINI_API_URL)]
+            if name in ("filesystem", "chat"):
+                tasks.append((self.load_history, module, message))
+            elif name == "calendar":
+                tasks.append((module.check_auth,))
+            self.futures[name] = [self.executor.submit(*task) for task in tasks]
+
+    def load_history(self, module, message: str):
+        # Cùng query với lượt chạy thật: index lịch sử được cập nhật sẵn trong lúc phân loại
+        if self.history:
+            module.load_chat_history(Path(self.history), message)
+
+    def commit(self, name: str):
+        """Wait for the chosen tool's warm-up and drop the others"""
+        for other, futures in self.futures.items():
+            if other != name:
+                for future in futures:
+                    future.cancel()
+        chosen = self.futures.get(name, [])
+        if chosen:
+            wait(chosen, timeout=PREWARM_WAIT)
+        self.futures.clear()
+
+
+class AgentServer:
+    """Serve classify/run requests one at a time on a Unix socket"""
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.agents: Dict[str, Any] = {}
+        self.in_turn = False
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prewarm")
+        self.prewarmer: Optional[Prewarmer] = None
+
+    def warm_up(self):
+        """Load tool agents and open the HTTP pool before the first turn"""
+        for name, path in PYTHON_AGENTS.items():
+            try:
+                self.agents[name] = load_agent(name, path)
+            except Exception as e:
+                # Tool sẽ chạy bằng subprocess như cũ
+                print(f"Warning: Could not load {name} agent: {e}", file=sys.stderr)
+        get_session()
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        old_umask = os.umask(0o077)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        os.umask(old_umask)
+        server.listen(4)
+        try:
+            while True:
+                conn, _ = server.accept()
+                with conn:
+                    self.handle(conn)
+        finally:
+            server.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def receive(self, conn: socket.socket) -> tuple:
+        """Read one JSON request line and the passed file descriptors"""
+        data, fds, _, _ = socket.recv_fds(conn, 65536, 3)
+        while not data.endswith(b"\n") and len(data) < MAX_REQUEST_BYTES:
+            more = conn.recv(65536)
+            if not more:
+                break
+            data += more
+        return json.loads(data.decode("utf-8")), fds
+
+    def handle(self, conn: socket.socket):
+        try:
+            request, fds = self.receive(conn)
+        except (OSError, ValueError):
+            return
+        try:
+            if len(fds) != 3:
+                reply = {"error": "stdin/stdout/stderr required"}
+            else:
+                reply = self.run_turn(request, fds)
+        finally:
+            for fd in fds:
+                os.close(fd)
+        try:
+            conn.sendall((json.dumps(reply) + "\n").encode("utf-8"))
+        except OSError:
+            pass
+
+    def run_turn(self, request: Dict[str, Any], fds: List[int]) -> Dict[str, Any]:
+        """Run one request with the client's terminal as stdin/stdout/stderr"""
+        saved_fds = [os.dup(i) for i in range(3)]
+        saved_env = dict(os.environ)
+        saved_cwd = os.getcwd()
+        saved_stdin = sys.stdin
+        try:
+            for i, fd in enumerate(fds):
+                os.dup2(fd, i)
+            sys.stdin = open(0, "r", closefd=False)
+            for key in PASSTHROUGH_ENV:
+                os.environ.pop(key, None)
+            os.environ.update({k: v for k, v in request.get("env", {}).items() if k in PASSTHROUGH_ENV})
+            try:
+                os.chdir(request.get("cwd") or saved_cwd)
+            except OSError:
+                pass
+
+            self.in_turn = True
+            try:
+                if request.get("action") == "classify":
+                    return {"intent": self.classify(request)}
+                intent_name = request.get("intent", "chat")
+                if self.prewarmer is not None:
+                    self.prewarmer.commit(intent_name)
+                    self.prewarmer = None
+                return {"exit_code": self.run_tool(intent_name, request.get("message", ""))}
+            except KeyboardInterrupt:
+                return {"exit_code": 130}
+            finally:
+                self.in_turn = False
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            sys.stdin = saved_stdin
+            for i, fd in enumerate(saved_fds):
+                os.dup2(fd, i)
+                os.close(fd)
+            os.chdir(saved_cwd)
+            os.environ.clear()
+            os.environ.update(saved_env)
+
+    def classify(self, request: Dict[str, Any]) -> str:
+        """Classify the message while its likely tools warm up in the background"""
+        message = request.get("message", "")
+        if self.prewarmer is not None:
+            # Lượt trước classify xong nhưng không chạy tool
+            self.prewarmer.commit("")
+        self.prewarmer = None
+        if PREWARM_ENABLED and message:
+            self.prewarmer = Prewarmer(self.executor, self.agents, request)
+            self.prewarmer.start(message)
+        return intent.classify(message)
+
+    def run_tool(self, intent_name: str, message: str) -> int:
+        """Execute the tool for an intent, in-process when it is a Python agent"""
+        module = self.agents.get(intent_name)
+        if module is not None:
+            self.reset_agent(intent_name, module)
+            sys.argv = [str(PYTHON_AGENTS[intent_name]), message]
+            try:
+                module.main()
+                return 0
+            except SystemExit as e:
+                return exit_code_of(e)
+            finally:
+                sys.stdout.flush()
+                # Backup nền phải lưu xong trước khi /rollback (process khác) đọc journal;
+                # manager bị bỏ ở lượt sau (reset_agent) nên dừng luôn các worker thread
+                backup_mgr = getattr(module, "SESSION_STATE", {}).get("backup_manager")
+                if backup_mgr is not None:
+                    backup_mgr.close()
+
+        script = SCRIPT_TOOLS.get(intent_name) or PYTHON_AGENTS.get(intent_name)
+        if script is None:
+            print(f"❌ Intent không hợp lệ: {intent_name}")
+            return 1
+        return subprocess.run([str(script), message], check=False).returncode
+
+    def reset_agent(self, name: str, module):
+        """Reset per-turn globals that the one-shot scripts compute at import time"""
+        history = os.environ.get("MOIBASH_CHAT_HISTORY", "")
+        if name == "filesystem":
+            module.USER_WORKING_DIR = os.environ.get("MOIBASH_USER_PWD", os.getcwd())
+            module.HISTORY_FILE = Path(history) if history else None
+            # "Always accept" chỉ áp dụng trong một lượt; manifest có thể đã đổi bởi /rollback
+            module.SESSION_STATE["always_accept"] = False
+            module.SESSION_STATE["backup_manager"] = None
+        elif name in ("calendar", "chat"):
+            module.HISTORY_FILE = history
+
+    def handle_sigint(self, signum, frame):
+        # Ctrl+C chỉ hủy lượt đang chạy; khi rảnh thì bỏ qua
+        if self.in_turn:
+            raise KeyboardInterrupt
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: agent_server.py <socket_path>", file=sys.stderr)
+        sys.exit(1)
+
+    server = AgentServer(sys.argv[1])
+    signal.signal(signal.SIGINT, server.handle_sigint)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    server.warm_up()
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
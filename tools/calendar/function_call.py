@@ -7,17 +7,30 @@ Flow: User message → Gemini Function Calling → Extract actions → Call cale
 import os
 import sys
 import json
+import time
 import subprocess
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import requests
 
+# Shared pooled HTTP session (tools/gemini_client.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from gemini_client import get_session, model_url, stream_generate_content
+from terminal_markdown import StreamPrinter
+from conversation_budget import ConversationBudget, request_bytes
+from chat_history import ChatHistory
+
 # Constants
 SCRIPT_DIR = Path(__file__).parent
 ENV_FILE = SCRIPT_DIR / "../../.env"
 MAX_ITERATIONS = 10
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-lite:generateContent"
+TOKEN_FILE = SCRIPT_DIR / ".calendar_token"
+# Kết quả check_auth() được dùng lại trong khoảng này nếu token file không đổi
+AUTH_CHECK_TTL = 60
+GEMINI_API_URL = model_url("gemini-2.5-flash-lite")
+GEMINI_STREAM_URL = model_url("gemini-2.5-flash-lite", "streamGenerateContent")
 
 # Load environment variables
 def load_env():
@@ -194,6 +207,15 @@ FUNCTION_DECLARATIONS = [
 # Debug mode
 DEBUG = os.environ.get('DEBUG', '').lower() in ('true', '1', 'yes')
 
+# Streaming mode: render câu trả lời ngay khi nhận từng chunk (MOIBASH_STREAM=1 trong .env)
+STREAM_MODE = os.environ.get('MOIBASH_STREAM', '').lower() in ('true', '1', 'yes')
+HISTORY_FILE = os.environ.get('MOIBASH_CHAT_HISTORY', '')
+# Function chỉ đọc: chạy song song khi model trả về nhiều functionCall trong một lượt
+READ_ONLY_FUNCTIONS = ("list_events", "get_current_time")
+TOOL_WORKERS = int(os.environ.get('MOIBASH_TOOL_WORKERS', '4'))
+# Compact conversation trước mỗi request (cắt kết quả tool cũ, giới hạn kích thước request)
+BUDGET = ConversationBudget("calendar", log=lambda message: debug_print(message))
+
 def debug_print(*args, **kwargs):
     """Print debug messages to stderr"""
     if DEBUG:
@@ -294,20 +316,94 @@ def handle_function_call(func_name: str, args: Dict[str, Any]) -> Dict[str, Any]
     debug_print(f"Result: {json.dumps(result, ensure_ascii=False)[:500]}")
     return result
 
-def call_gemini_api(conversation: List[Dict], api_key: str) -> Optional[Dict]:
-    """Call Gemini API with conversation history"""
+def execute_function_calls(calls: List[Dict], first_result: Optional[Dict] = None) -> List[Dict]:
+    """
+    Execute every functionCall of one model turn, returning results in call order
+    Consecutive read-only calls run concurrently; add/update/delete run one at a time, in order
+    
+    Args:
+        calls: [{"name", "args"}, ...]
+        first_result: result of calls[0] if it already ran (streaming mode)
+    """
+    results = []
+    i = 0
+    if first_result is not None:
+        results.append(first_result)
+        i = 1
+    
+    while i < len(calls):
+        j = i
+        while j < len(calls) and calls[j]["name"] in READ_ONLY_FUNCTIONS:
+            j += 1
+        if j - i < 2:
+            results.append(handle_function_call(calls[i]["name"], calls[i]["args"]))
+            i += 1
+            continue
+        
+        batch = calls[i:j]
+        debug_print(f"Running {len(batch)} read-only calls in parallel")
+        with ThreadPoolExecutor(max_workers=min(TOOL_WORKERS, len(batch))) as pool:
+            results.extend(pool.map(lambda call: handle_function_call(call["name"], call["args"]), batch))
+        i = j
+    return results
+
+_AUTH_STATUS = {"key": None, "ok": False, "checked_at": 0.0}
+
+def check_auth() -> bool:
+    """
+    Run auth.sh status (it also refreshes a token that is about to expire)
+    A recent successful result is reused so a pre-warmed check is not repeated
+    """
+    auth_sh = SCRIPT_DIR / "auth.sh"
+    if not auth_sh.exists():
+        return True
+    try:
+        token_mtime = TOKEN_FILE.stat().st_mtime_ns
+    except OSError:
+        token_mtime = None
+    if (_AUTH_STATUS["ok"] and _AUTH_STATUS["key"] == token_mtime
+            and time.time() - _AUTH_STATUS["checked_at"] < AUTH_CHECK_TTL):
+        debug_print("Reusing recent auth status")
+        return True
+    
+    result = subprocess.run(
+        [str(auth_sh), "status"],
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        check=False
+    )
+    ok = result.returncode == 0
+    try:
+        # auth.sh có thể vừa refresh và ghi lại token file
+        token_mtime = TOKEN_FILE.stat().st_mtime_ns
+    except OSError:
+        token_mtime = None
+    _AUTH_STATUS.update({"key": token_mtime, "ok": ok, "checked_at": time.time()})
+    return ok
+
+def build_payload(conversation: List[Dict]) -> Dict[str, Any]:
+    """Build generateContent payload for the conversation"""
     payload = {
-        "contents": conversation,
+        "contents": [],
         "tools": [{"functionDeclarations": FUNCTION_DECLARATIONS}],
         "systemInstruction": {
             "parts": [{"text": SYSTEM_INSTRUCTION}]
         }
     }
+    # Gửi bản đã compact; phần còn lại của payload tính vào giới hạn kích thước request
+    payload["contents"] = BUDGET.fit(conversation, overhead=request_bytes(payload))
+    return payload
+
+def call_gemini_api(conversation: List[Dict], api_key: str) -> Optional[Dict]:
+    """Call Gemini API with conversation history"""
+    payload = build_payload(conversation)
     
     try:
         debug_print("Calling Gemini API...")
-        response = requests.post(
-            f"{GEMINI_API_URL}?key={api_key}",
+        # Dùng session chung để tái sử dụng TCP/TLS connection giữa các vòng lặp
+        response = get_session().post(
+            GEMINI_API_URL,
+            params={"key": api_key},
             json=payload,
             timeout=30
         )
@@ -317,6 +413,54 @@ def call_gemini_api(conversation: List[Dict], api_key: str) -> Optional[Dict]:
         debug_print(f"API Error: {str(e)}")
         return None
 
+def stop_spinner():
+    """Stop the spinner if it's running (from router.sh)"""
+    spinner_pid = os.environ.get('MOIBASH_SPINNER_PID')
+    if spinner_pid:
+        try:
+            print("\r\033[K", end='', file=sys.stderr, flush=True)
+            subprocess.run(['kill', spinner_pid], stderr=subprocess.DEVNULL)
+        except Exception:
+            pass
+
+def call_gemini_api_stream(conversation: List[Dict], api_key: str) -> tuple:
+    """
+    Streaming variant of call_gemini_api()
+    Text is rendered to the terminal while it arrives, and the first functionCall
+    is executed as soon as it shows up in the stream.
+    Returns: (aggregated_response, executed) - executed is None or
+             {"name", "args", "result"} of the call that already ran
+    """
+    printer = StreamPrinter(on_start=stop_spinner)
+    executed = None
+    
+    def on_function_call(part: Dict):
+        nonlocal executed
+        if executed is None:
+            func_call = part["functionCall"]
+            func_name = func_call.get("name", "")
+            func_args = func_call.get("args", {})
+            executed = {
+                "name": func_name,
+                "args": func_args,
+                "result": handle_function_call(func_name, func_args)
+            }
+    
+    try:
+        debug_print("Calling Gemini API (stream)...")
+        response = stream_generate_content(
+            GEMINI_STREAM_URL,
+            build_payload(conversation),
+            api_key,
+            on_text=printer.write,
+            on_function_call=on_function_call
+        )
+    except Exception as e:
+        debug_print(f"API Error: {str(e)}")
+        response = None
+    printer.flush()
+    return response, executed
+
 def parse_response(response: Dict) -> tuple:
     """
     Parse Gemini response
@@ -333,13 +477,13 @@ def parse_response(response: Dict) -> tuple:
     content = candidates[0].get("content", {})
     parts = content.get("parts", [])
     
-    # Check for function call
-    for part in parts:
-        if "functionCall" in part:
-            func_call = part["functionCall"]
-            func_name = func_call.get("name", "")
-            func_args = func_call.get("args", {})
-            return ("FUNCTION_CALL", func_name, func_args)
+    # Check for function calls: value là call đầu tiên, extra chứa tất cả theo thứ tự
+    calls = [
+        {"name": part["functionCall"].get("name", ""), "args": part["functionCall"].get("args", {})}
+        for part in parts if "functionCall" in part
+    ]
+    if calls:
+        return ("FUNCTION_CALL", calls[0]["name"], calls)
     
     # Check for text response
     for part in parts:
@@ -365,17 +509,10 @@ def main():
         sys.exit(1)
     
     # Check authentication
-    auth_sh = SCRIPT_DIR / "auth.sh"
-    if auth_sh.exists():
-        result = subprocess.run(
-            [str(auth_sh), "status"],
-            capture_output=True,
-            check=False
-        )
-        if result.returncode != 0:
-            print("❌ Chưa đăng nhập Google Calendar", file=sys.stderr)
-            print("💡 Vui lòng chạy: ./tools/calendar/auth.sh login", file=sys.stderr)
-            sys.exit(1)
+    if not check_auth():
+        print("❌ Chưa đăng nhập Google Calendar", file=sys.stderr)
+        print("💡 Vui lòng chạy: ./tools/calendar/auth.sh login", file=sys.stderr)
+        sys.exit(1)
     
     # Initialize conversation
     conversation = [
@@ -385,47 +522,55 @@ def main():
         }
     ]
     
+    BUDGET.reset()
+    
     # Multi-turn conversation loop
     tool_calls_made = 0
     
     while tool_calls_made < MAX_ITERATIONS:
         # Call Gemini API
-        response = call_gemini_api(conversation, api_key)
+        executed = None
+        if STREAM_MODE:
+            response, executed = call_gemini_api_stream(conversation, api_key)
+        else:
+            response = call_gemini_api(conversation, api_key)
         
         # Parse response
         response_type, value, extra = parse_response(response)
         debug_print(f"Response type: {response_type}")
         
+        if executed and response_type != "FUNCTION_CALL":
+            response_type, value, extra = "FUNCTION_CALL", executed["name"], [executed]
+        
         if response_type == "FUNCTION_CALL":
-            tool_calls_made += 1
-            func_name = value
-            func_args = extra
+            calls = extra
+            tool_calls_made += len(calls)
             
-            # Execute function
-            func_result = handle_function_call(func_name, func_args)
+            # Execute functions (streaming mode đã chạy call đầu tiên ngay khi nó xuất hiện)
+            func_results = execute_function_calls(calls, executed["result"] if executed else None)
             
-            # Add model response with function call to conversation
+            # Add model response with function calls to conversation
             conversation.append({
                 "role": "model",
                 "parts": [{
                     "functionCall": {
-                        "name": func_name,
-                        "args": func_args
+                        "name": call["name"],
+                        "args": call["args"]
                     }
-                }]
+                } for call in calls]
             })
             
-            # Add function response to conversation
+            # Add all function responses to conversation in one turn
             conversation.append({
                 "role": "function",
                 "parts": [{
                     "functionResponse": {
-                        "name": func_name,
+                        "name": call["name"],
                         "response": {
                             "content": func_result
                         }
                     }
-                }]
+                } for call, func_result in zip(calls, func_results)]
             })
             
             # Continue loop for Gemini to process function response
@@ -433,7 +578,12 @@ def main():
             
         elif response_type == "TEXT":
             # Final response from Gemini
-            print(value)
+            if STREAM_MODE:
+                # Đã hiển thị trên terminal khi stream → chỉ lưu lịch sử, stdout để trống
+                if HISTORY_FILE:
+                    ChatHistory(HISTORY_FILE).append("model", value)
+            else:
+                print(value)
             sys.exit(0)
             
         elif response_type == "NO_RESPONSE":
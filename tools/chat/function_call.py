@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+function_call.py - Chat thông thường với Gemini
+Flow: User message + recent chat history (multi-turn contents) → Gemini → answer
+Replaces the bash/sed pipeline of tools/chat.sh: the request is built with one
+json serialization and sent through the pooled session of gemini_client.py.
+"""
+
+import os
+import sys
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+# Shared pooled HTTP session (tools/gemini_client.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from gemini_client import get_session, model_url, stream_generate_content
+from terminal_markdown import StreamPrinter
+from chat_history import ChatHistory
+from history_search import relevant_history
+
+# Constants
+SCRIPT_DIR = Path(__file__).parent
+ENV_FILE = SCRIPT_DIR / "../../.env"
+GEMINI_API_URL = model_url("gemini-2.5-flash-lite")
+GEMINI_STREAM_URL = model_url("gemini-2.5-flash-lite", "streamGenerateContent")
+MAX_HISTORY_MESSAGES = 10  # Keep last 10 pairs when history retrieval is off
+GENERATION_CONFIG = {
+    "temperature": 0.9,
+    "topK": 40,
+    "topP": 0.95,
+    "maxOutputTokens": 1024
+}
+
+# Load environment variables
+def load_env():
+    """Load environment variables from .env file"""
+    if ENV_FILE.exists():
+        with open(ENV_FILE) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    # Remove quotes if present
+                    value = value.strip().strip('"').strip("'")
+                    os.environ[key] = value
+
+load_env()
+
+# System instruction
+SYSTEM_INSTRUCTION = """You are Moibash Agent, an intelligent AI assistant integrated into the Moibash system. Moibash is a comprehensive AI-powered terminal application that provides natural language interfaces for various productivity tasks.
+
+Core Capabilities:
+- Intelligent conversation and general assistance
+- File system management (create, read, update, delete files and folders with safety confirmations)
+- Google Calendar integration for scheduling and event management
+- Weather information retrieval by location
+- AI-powered image generation from text descriptions
+- Web search functionality for real-time information
+
+Response Guidelines:
+- Respond in Vietnamese for Vietnamese queries, English for English queries
+- Provide clear, concise, and helpful responses
+- Maintain professional and friendly tone
+- Focus on chat-related queries; for specific tools, guide users to use appropriate commands
+- Explain complex concepts in simple terms when needed
+- Ask clarifying questions when user intent is unclear
+- Use markdown formatting for better readability
+- The earlier turns of this conversation are the chat history of the current Moibash session (including answers given by other Moibash tools). Refer to them when relevant to provide contextual responses.
+
+When users ask about system capabilities or need help with specific features, provide accurate information about available tools and how to use them effectively."""
+
+# Debug mode
+DEBUG = os.environ.get('DEBUG', '').lower() in ('true', '1', 'yes')
+
+# Streaming mode: render câu trả lời ngay khi nhận từng chunk (MOIBASH_STREAM=1 trong .env)
+STREAM_MODE = os.environ.get('MOIBASH_STREAM', '').lower() in ('true', '1', 'yes')
+HISTORY_FILE = os.environ.get('MOIBASH_CHAT_HISTORY', '')
+
+def debug_print(*args, **kwargs):
+    """Print debug messages to stderr"""
+    if DEBUG:
+        print("[DEBUG]", *args, file=sys.stderr, **kwargs)
+
+def load_chat_history(history_file: Optional[Path] = None, query: str = "") -> List[Dict]:
+    """Session history to send with query: recent messages + relevant past turns (Gemini contents)"""
+    history_file = history_file or HISTORY_FILE
+    if not history_file:
+        return []
+    try:
+        return relevant_history(history_file, query, MAX_HISTORY_MESSAGES * 2)
+    except Exception as e:
+        debug_print(f"Error loading history: {e}")
+        return []
+
+def build_contents(history: List[Dict], user_message: str) -> List[Dict]:
+    """
+    Multi-turn contents: history followed by the current message
+    moibash.sh ghi câu hỏi hiện tại vào lịch sử trước khi gọi tool, nên bỏ bản trùng ở cuối.
+    Các tin nhắn liền nhau cùng role được gộp, và contents bắt đầu bằng lượt user.
+    """
+    if history and history[-1]["role"] == "user" and history[-1]["parts"][0]["text"].strip() == user_message.strip():
+        history = history[:-1]
+    contents = []
+    for message in history + [{"role": "user", "parts": [{"text": user_message}]}]:
+        if not contents and message["role"] != "user":
+            continue
+        if contents and contents[-1]["role"] == message["role"]:
+            contents[-1]["parts"].extend(message["parts"])
+        else:
+            contents.append({"role": message["role"], "parts": list(message["parts"])})
+    return contents
+
+def build_payload(contents: List[Dict]) -> Dict[str, Any]:
+    """Build generateContent payload"""
+    return {
+        "contents": contents,
+        "systemInstruction": {
+            "parts": [{"text": SYSTEM_INSTRUCTION}]
+        },
+        "generationConfig": GENERATION_CONFIG
+    }
+
+def call_gemini_api(contents: List[Dict], api_key: str) -> Dict[str, Any]:
+    """Call Gemini API; raises on HTTP/network errors"""
+    debug_print("Calling Gemini API...")
+    # Dùng session chung để tái sử dụng TCP/TLS connection giữa các lượt chat
+    response = get_session().post(
+        GEMINI_API_URL,
+        params={"key": api_key},
+        json=build_payload(contents),
+        timeout=30
+    )
+    return response.json()
+
+def stop_spinner():
+    """Stop the spinner if it's running (from router.sh)"""
+    spinner_pid = os.environ.get('MOIBASH_SPINNER_PID')
+    if spinner_pid:
+        try:
+            print("\r\033[K", end='', file=sys.stderr, flush=True)
+            subprocess.run(['kill', spinner_pid], stderr=subprocess.DEVNULL)
+        except Exception:
+            pass
+
+def call_gemini_api_stream(contents: List[Dict], api_key: str) -> Dict[str, Any]:
+    """Streaming variant of call_gemini_api(): text is rendered while it arrives"""
+    printer = StreamPrinter(on_start=stop_spinner)
+    try:
+        debug_print("Calling Gemini API (stream)...")
+        return stream_generate_content(GEMINI_STREAM_URL, build_payload(contents), api_key, on_text=printer.write)
+    finally:
+        printer.flush()
+
+def response_text(response: Dict[str, Any]) -> str:
+    """Text of the first candidate ("" if none)"""
+    for candidate in response.get("candidates", [])[:1]:
+        return "".join(part.get("text", "") for part in candidate.get("content", {}).get("parts", []))
+    return ""
+
+def main():
+    """Main entry point"""
+    if len(sys.argv) < 2 or not sys.argv[1]:
+        print("❌ Không có tin nhắn")
+        sys.exit(1)
+
+    user_message = sys.argv[1]
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        print("❌ Lỗi: Chưa thiết lập GEMINI_API_KEY!")
+        sys.exit(1)
+
+    contents = build_contents(load_chat_history(query=user_message), user_message)
+    debug_print(f"Sending {len(contents)} turns")
+
+    try:
+        if STREAM_MODE:
+            response = call_gemini_api_stream(contents, api_key)
+        else:
+            response = call_gemini_api(contents, api_key)
+    except Exception as e:
+        print(f"❌ API Error: {e}")
+        sys.exit(1)
+
+    if "error" in response:
+        print(f"❌ API Error: {response['error'].get('message', 'API Error')}")
+        sys.exit(1)
+
+    text = response_text(response)
+    if not text:
+        print("❌ Lỗi parse response: không có nội dung trả về")
+        sys.exit(1)
+
+    if STREAM_MODE:
+        # Đã hiển thị trên terminal khi stream → chỉ lưu lịch sử, stdout để trống
+        if HISTORY_FILE:
+            ChatHistory(HISTORY_FILE).append("model", text)
+    else:
+        print(text)
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
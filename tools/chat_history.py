@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+chat_history.py - Incremental index over the session chat history
+moibash.sh appends every message to chat_history_<PID>.txt as
+"[HH:MM:SS] USER: ..." / "[HH:MM:SS] moiBash: ..." (a message may span several
+lines). ChatHistory keeps a side index <history>.idx with the offset, length and
+role of each message, so reading the last N messages only scans what was
+appended since the previous read and then slices the file through mmap instead
+of re-parsing it.
+
+Index layout: a header (magic, version, message count, indexed end offset,
+CRC of the bytes just before it) followed by fixed-size records. The last
+message is never indexed (moiBash may still be appending lines to it); it is
+re-read from the indexed end on each call.
+"""
+
+import os
+import re
+import sys
+import mmap
+import zlib
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+MAGIC = b"MBHI"
+VERSION = 1
+# magic, version, count, end, crc(history[end - CRC_SPAN:end])
+HEADER = struct.Struct("<4sBxxxIQI")
+# offset, length, prefix length ("[HH:MM:SS] USER: "), role
+RECORD = struct.Struct("<QIHB")
+CRC_SPAN = 64
+ROLES = ("user", "model")
+# Dòng bắt đầu một tin nhắn (như moibash.sh ghi)
+MESSAGE_START = re.compile(rb'^\[[^\]\n]*\] (USER|moiBash): ', re.M)
+
+
+class ChatHistory:
+    """Chat history file with an incrementally maintained side index"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+
+    def append(self, role: str, text: str):
+        """Append one message the way moibash.sh does (locked, one write)"""
+        label = "USER" if role == "user" else "moiBash"
+        line = f"[{datetime.now().strftime('%H:%M:%S')}] {label}: {text}\n".encode('utf-8')
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def __len__(self) -> int:
+        return self._read(0, 0)[0]
+
+    def last(self, count: int) -> List[Dict]:
+        """Last count messages as Gemini contents ({"role", "parts": [{"text"}]})"""
+        return self.slice(-count) if count > 0 else []
+
+    def slice(self, start: int, stop: Optional[int] = None) -> List[Dict]:
+        """Messages [start:stop] (list slice semantics) as Gemini contents"""
+        return [
+            {"role": role, "parts": [{"text": text}]}
+            for _, role, text in self._read(start, stop)[1]
+        ]
+
+    def messages(self, start: int = 0, stop: Optional[int] = None) -> Tuple[int, List[Tuple[int, str, str]]]:
+        """(message count, [(index, role, text)] for messages[start:stop]); empty messages are skipped"""
+        return self._read(start, stop)
+
+    def _read(self, start: int, stop: Optional[int]) -> Tuple[int, List[Tuple[int, str, str]]]:
+        """Bring the index up to date and return (message count, messages[start:stop])"""
+        try:
+            history_fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            return 0, []
+        index_fd = None
+        try:
+            # Shared lock: moibash.sh ghi mỗi tin nhắn dưới flock -x, không đọc phải dòng ghi dở
+            if fcntl is not None:
+                fcntl.flock(history_fd, fcntl.LOCK_SH)
+            size = os.fstat(history_fd).st_size
+            if size == 0:
+                return 0, []
+            with mmap.mmap(history_fd, size, access=mmap.ACCESS_READ) as data:
+                try:
+                    index_fd = os.open(self.index_path, os.O_RDWR | os.O_CREAT, 0o644)
+                    if fcntl is not None:
+                        fcntl.flock(index_fd, fcntl.LOCK_EX)
+                    count, end = self._update(index_fd, data)
+                    scanned = None
+                except OSError as e:
+                    # Không ghi được index (thư mục read-only, ...): parse toàn bộ trong bộ nhớ
+                    print(f"Warning: Could not update history index: {e}", file=sys.stderr)
+                    scanned, end = scan(data, 0)
+                    count = len(scanned)
+
+                tail = scan_tail(data, end)
+                total = count + (1 if tail else 0)
+                first, last, _ = slice(start, stop).indices(total)
+                if first >= last:
+                    return total, []
+                selected = []
+                if first < count:
+                    if scanned is None:
+                        selected = self._records(index_fd, first, min(last, count))
+                    else:
+                        selected = scanned[first:min(last, count)]
+                if last > count:
+                    selected.append(tail)
+                messages = []
+                for index, (offset, length, prefix, role) in enumerate(selected, first):
+                    text = data[offset + prefix:offset + length].rstrip(b'\n').decode('utf-8', 'replace')
+                    if text.strip():
+                        messages.append((index, ROLES[role], text))
+                return total, messages
+        finally:
+            if index_fd is not None:
+                os.close(index_fd)
+            os.close(history_fd)
+
+    def _update(self, fd: int, data) -> Tuple[int, int]:
+        """Index the messages appended since the last call; returns (count, end)"""
+        header = os.pread(fd, HEADER.size, 0)
+        count, end = 0, 0
+        if len(header) == HEADER.size:
+            magic, version, count, end, crc = HEADER.unpack(header)
+            valid = (
+                magic == MAGIC and version == VERSION and end <= len(data)
+                and os.fstat(fd).st_size >= HEADER.size + count * RECORD.size
+                and crc == zlib.crc32(data[max(end - CRC_SPAN, 0):end])
+            )
+            if not valid:
+                # /clear hoặc file bị ghi lại: index cũ không còn khớp, dựng lại từ đầu
+                count, end = 0, 0
+
+        records, new_end = scan(data, end)
+        if new_end == end and count:
+            return count, end
+        if records:
+            os.pwrite(fd, b''.join(RECORD.pack(*r) for r in records), HEADER.size + count * RECORD.size)
+        count += len(records)
+        # Header ghi sau records: crash giữa chừng chỉ làm mất các record mới, không làm hỏng index
+        os.pwrite(fd, HEADER.pack(MAGIC, VERSION, count, new_end,
+                                  zlib.crc32(data[max(new_end - CRC_SPAN, 0):new_end])), 0)
+        return count, new_end
+
+    def _records(self, fd: int, first: int, last: int) -> List[Tuple[int, int, int, int]]:
+        raw = os.pread(fd, (last - first) * RECORD.size, HEADER.size + first * RECORD.size)
+        return list(RECORD.iter_unpack(raw))
+
+
+def complete_end(data) -> int:
+    """Offset just past the last complete line"""
+    return data.rfind(b'\n') + 1
+
+
+def scan(data, start: int) -> Tuple[List[Tuple[int, int, int, int]], int]:
+    """
+    Records of the messages that start at or after start and are followed by
+    another message, and the offset of the last (still open) message
+    """
+    stop = complete_end(data)
+    records = []
+    previous = None
+    end = start
+    for match in MESSAGE_START.finditer(data, start, stop):
+        if previous is not None:
+            records.append((previous.start(), match.start() - previous.start(),
+                            previous.end() - previous.start(), previous.group(1) == b"moiBash"))
+        previous = match
+        end = match.start()
+    return records, end
+
+
+def scan_tail(data, end: int) -> Optional[Tuple[int, int, int, int]]:
+    """Record of the open message at end (up to the last complete line)"""
+    match = MESSAGE_START.match(data, end, complete_end(data))
+    if match is None:
+        return None
+    return match.start(), complete_end(data) - match.start(), match.end() - match.start(), match.group(1) == b"moiBash"
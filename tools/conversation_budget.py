@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+conversation_budget.py - Token budgeting for the agent loop
+The agents keep the full conversation (history + every tool call/result) and
+re-send it on each iteration. ConversationBudget builds the compacted view that
+is actually sent:
+- file contents that show up again later are replaced by a stable reference
+- functionResponse payloads older than the last few tool turns are truncated
+- the request is kept under a configurable size (MOIBASH_MAX_REQUEST_BYTES)
+and logs how many bytes each iteration sends.
+"""
+
+import os
+import json
+import time
+import hashlib
+from typing import Callable, Dict, List, Optional, Any
+
+# Kích thước tối đa của một request generateContent (bytes JSON gửi đi)
+MAX_REQUEST_BYTES = int(os.environ.get('MOIBASH_MAX_REQUEST_BYTES', '400000'))
+# Số lượt function response gần nhất được gửi nguyên vẹn
+KEEP_TOOL_TURNS = int(os.environ.get('MOIBASH_KEEP_TOOL_TURNS', '3'))
+# Chuỗi dài hơn mức này trong các lượt cũ bị cắt bớt
+OLD_RESULT_CHARS = int(os.environ.get('MOIBASH_OLD_RESULT_CHARS', '1500'))
+# Nội dung file từ mức này trở lên mới được thay bằng reference khi trùng lặp
+REF_MIN_CHARS = 1024
+# Danh sách dài hơn mức này trong các lượt cũ chỉ giữ phần đầu
+OLD_LIST_ITEMS = 50
+# Không cắt chuỗi ngắn hơn mức này khi phải ép request vừa giới hạn
+MIN_FIT_CHARS = 200
+# MOIBASH_REQUEST_LOG=<file>: ghi mỗi request một dòng JSON (bytes, token ước lượng)
+REQUEST_LOG = os.environ.get('MOIBASH_REQUEST_LOG', '')
+
+
+def estimate_tokens(value: Any) -> int:
+    """Rough token count (~4 characters per token) of a turn, part or payload"""
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False)
+    return (len(value) + 3) // 4
+
+
+def request_bytes(value: Any) -> int:
+    """Size of value serialized the way requests sends json= bodies"""
+    return len(json.dumps(value))
+
+
+def content_ref(text: str) -> str:
+    """Stable reference for a piece of content (same text → same reference)"""
+    return "sha256:" + hashlib.sha256(text.encode("utf-8", "replace")).hexdigest()[:16]
+
+
+def truncate_text(text: str, limit: int) -> str:
+    """Keep the head and tail of text, with a marker saying how much was cut"""
+    if len(text) <= limit:
+        return text
+    head = limit * 2 // 3
+    tail = limit - head
+    omitted = len(text) - head - tail
+    return f"{text[:head]}\n…[{omitted} chars omitted]…\n{text[-tail:] if tail else ''}"
+
+
+def shrink_value(value: Any, limit: int) -> Any:
+    """Copy of a function result with long strings and lists cut down"""
+    if isinstance(value, str):
+        return truncate_text(value, limit)
+    if isinstance(value, list):
+        items = [shrink_value(item, limit) for item in value[:OLD_LIST_ITEMS]]
+        if len(value) > OLD_LIST_ITEMS:
+            items.append(f"…[{len(value) - OLD_LIST_ITEMS} more items omitted]")
+        return items
+    if isinstance(value, dict):
+        return {key: shrink_value(item, limit) for key, item in value.items()}
+    return value
+
+
+def _response_content(part: Dict) -> Any:
+    return part.get("functionResponse", {}).get("response", {}).get("content")
+
+
+def _with_content(part: Dict, content: Any) -> Dict:
+    response = part["functionResponse"]
+    return {"functionResponse": dict(response, response=dict(response["response"], content=content))}
+
+
+class ConversationBudget:
+    """Compact the conversation before each request and log request sizes"""
+
+    def __init__(self, agent: str, log: Optional[Callable[[str], None]] = None,
+                 max_request_bytes: int = MAX_REQUEST_BYTES, keep_tool_turns: int = KEEP_TOOL_TURNS,
+                 old_result_chars: int = OLD_RESULT_CHARS):
+        self.agent = agent
+        self.log = log or (lambda message: None)
+        self.max_request_bytes = max_request_bytes
+        self.keep_tool_turns = max(1, keep_tool_turns)
+        self.old_result_chars = old_result_chars
+        self.reset()
+
+    def reset(self, pinned: int = 0):
+        """
+        Start a new agent run (the agent server reuses the module across turns)
+
+        Args:
+            pinned: conversation index of the current user message; older turns are
+                    chat history and may be dropped when the request is too large
+        """
+        self.pinned = pinned
+        self.iteration = 0
+        self.total_bytes = 0
+        self._last = None
+
+    def compact(self, conversation: List[Dict], max_chars: Optional[int] = None,
+                keep_tool_turns: Optional[int] = None) -> List[Dict]:
+        """
+        Compacted copy of conversation (the original is not modified)
+
+        Args:
+            max_chars: string limit for function responses outside the window
+            keep_tool_turns: number of newest function turns sent in full
+        """
+        max_chars = self.old_result_chars if max_chars is None else max_chars
+        keep = self.keep_tool_turns if keep_tool_turns is None else keep_tool_turns
+        function_turns = [i for i, turn in enumerate(conversation) if turn.get("role") == "function"]
+        recent = set(function_turns[len(function_turns) - keep:]) if keep > 0 else set()
+
+        compacted = list(conversation)
+        seen = set()
+        # Từ mới đến cũ: bản đọc mới nhất của một nội dung được giữ, các bản trước thành reference
+        for index in reversed(function_turns):
+            parts = []
+            for part in conversation[index].get("parts", []):
+                content = _response_content(part)
+                if not isinstance(content, dict):
+                    parts.append(part)
+                    continue
+                text = content.get("content")
+                if isinstance(text, str) and len(text) >= REF_MIN_CHARS:
+                    ref = content_ref(text)
+                    if ref in seen:
+                        content = dict(content, content=f"[unchanged, same content as the later result {ref}]")
+                    else:
+                        seen.add(ref)
+                        content = dict(content, content_ref=ref)
+                if index not in recent:
+                    content = shrink_value(content, max_chars)
+                parts.append(_with_content(part, content))
+            compacted[index] = dict(conversation[index], parts=parts)
+        return compacted
+
+    def fit(self, conversation: List[Dict], overhead: int = 0, record: bool = True) -> List[Dict]:
+        """
+        Compacted conversation whose request stays under max_request_bytes
+
+        Args:
+            overhead: bytes of the rest of the payload (system instruction, tools, ...)
+            record: log the request now; False when it may be rebuilt and sent
+                differently (call record_last() with the payload actually sent)
+        """
+        raw_bytes = request_bytes(conversation)
+        contents = self.compact(conversation)
+        size = overhead + request_bytes(contents)
+
+        if size > self.max_request_bytes:
+            # 1. Chỉ giữ nguyên lượt function mới nhất
+            contents = self.compact(conversation, keep_tool_turns=1)
+            size = overhead + request_bytes(contents)
+        if size > self.max_request_bytes:
+            # 2. Bỏ chat history cũ nhất (theo cặp user/model), giữ nguyên yêu cầu hiện tại
+            dropped = 0
+            pinned = min(self.pinned, len(contents))
+            while size > self.max_request_bytes and dropped < pinned:
+                dropped += 2 if dropped + 1 < pinned else 1
+                size = overhead + request_bytes(contents[dropped:])
+            contents = contents[dropped:]
+            if dropped:
+                self.log(f"Budget: dropped {dropped} chat history turns")
+        limit = self.old_result_chars
+        while size > self.max_request_bytes and limit > MIN_FIT_CHARS:
+            # 3. Cắt cả các function response mới nhất
+            limit //= 2
+            contents = self.compact(contents, max_chars=limit, keep_tool_turns=0)
+            size = overhead + request_bytes(contents)
+        if size > self.max_request_bytes:
+            self.log(f"Budget: request is {size} bytes, over the {self.max_request_bytes} byte limit")
+
+        self._last = (size, overhead + raw_bytes, contents)
+        if record:
+            self._record(*self._last)
+        return contents
+
+    def record_last(self):
+        """Log the request built by the last fit(record=False)"""
+        if self._last is not None:
+            self._record(*self._last)
+            self._last = None
+
+    def _record(self, size: int, raw_size: int, contents: List[Dict]):
+        """Log bytes sent for this iteration"""
+        self.iteration += 1
+        self.total_bytes += size
+        last_turn_tokens = estimate_tokens(contents[-1]) if contents else 0
+        self.log(
+            f"Request #{self.iteration}: {size} bytes (~{(size + 3) // 4} tokens, "
+            f"last turn ~{last_turn_tokens}), uncompacted {raw_size} bytes, total sent {self.total_bytes}"
+        )
+        if not REQUEST_LOG:
+            return
+        try:
+            with open(REQUEST_LOG, "a") as f:
+                f.write(json.dumps({
+                    "time": round(time.time(), 3),
+                    "agent": self.agent,
+                    "iteration": self.iteration,
+                    "bytes": size,
+                    "uncompacted_bytes": raw_size,
+                    "last_turn_tokens": last_turn_tokens,
+                }) + "\n")
+        except OSError:
+            pass
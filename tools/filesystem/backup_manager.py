@@ -2,15 +2,553 @@
 """
 backup_manager.py - Manages file backups for rollback functionality
 Stores backups in /tmp/moibash_backup_<PID>/ for each session
+Contents go to a content-addressed object store (objects/<hash>): each unique
+file content is kept once, directories are stored as trees of hashes.
+Operations are recorded in an append-only journal (journal.jsonl).
+Older versions of an edited text file are kept as reverse deltas against the
+next version (RCS-style), with a full snapshot at least every
+MOIBASH_BACKUP_DELTA_CHAIN versions; deltas are computed by a background
+thread after the backup has returned. A patch (update_file mode=patch) only
+records the old text of the ranges it touched.
+Operations can be rolled back all at once, after an operation id, after a
+point in time, or for a single path.
+With MOIBASH_BACKUP_ASYNC=1, delete/rename backups are staged as hardlinks and
+stored by a background worker, so the tool does not wait for the copy.
+Blobs are compressed (zstd/lz4 when installed, zlib otherwise) and each session
+is kept under a size/operation quota by evicting its oldest backups.
 """
 
 import os
 import sys
+import io
 import json
+import stat
 import shutil
+import bisect
+import atexit
+import hashlib
+import zlib
+from collections import defaultdict
+import queue
+import threading
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Set, Any
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+# ioctl FICLONE (Linux): reflink copy-on-write trên btrfs, XFS, ...
+FICLONE = 0x40049409
+COPY_CHUNK = 1024 * 1024
+# Reverse delta cho các phiên bản cũ của file text lớn (MOIBASH_BACKUP_DELTA=0 để tắt)
+DELTA_ENABLED = os.environ.get('MOIBASH_BACKUP_DELTA', '1').lower() not in ('0', 'false', 'no')
+DELTA_MIN_SIZE = int(os.environ.get('MOIBASH_BACKUP_DELTA_MIN_SIZE', str(16 * 1024)))
+DELTA_MAX_SIZE = int(os.environ.get('MOIBASH_BACKUP_DELTA_MAX_SIZE', str(8 * 1024 * 1024)))
+# Tối đa số delta phải áp dụng để khôi phục một phiên bản (sau đó là một full snapshot)
+DELTA_CHAIN = max(1, int(os.environ.get('MOIBASH_BACKUP_DELTA_CHAIN', '8')))
+# Backup nền cho delete/rename (hardlink vào staging, worker lưu vào object store)
+ASYNC_ENABLED = os.environ.get('MOIBASH_BACKUP_ASYNC', '').lower() in ('true', '1', 'yes')
+# Số backup tối đa đang chờ; đầy thì backup_file() chờ worker (backpressure)
+ASYNC_QUEUE_SIZE = max(1, int(os.environ.get('MOIBASH_BACKUP_QUEUE', '4')))
+# Nén backup: auto (zstd/lz4 nếu đã cài, không thì zlib), zstd, lz4, zlib hoặc none
+COMPRESS = os.environ.get('MOIBASH_BACKUP_COMPRESS', 'auto').lower()
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_SAMPLE = 16 * 1024
+# File lớn hơn mức này dùng codec nhanh nhất (lz4, hoặc mức nén thấp)
+FAST_CODEC_SIZE = 32 * 1024 * 1024
+# Định dạng đã nén sẵn: lưu nguyên
+INCOMPRESSIBLE = frozenset((
+    ".gz", ".tgz", ".bz2", ".xz", ".zst", ".lz4", ".zip", ".7z", ".rar", ".jar", ".whl",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".mp3", ".mp4", ".mkv", ".mov", ".webm",
+    ".pdf", ".woff", ".woff2",
+))
+# Quota mỗi session; vượt quota thì bỏ các backup cũ nhất (0 = không giới hạn)
+MAX_BYTES = int(os.environ.get('MOIBASH_BACKUP_MAX_BYTES', str(1024 ** 3)))
+MAX_OPERATIONS = int(os.environ.get('MOIBASH_BACKUP_MAX_OPS', '0'))
+# Journal được viết lại (chỉ giữ operations còn hiệu lực) khi số record chết vượt mức này
+JOURNAL_COMPACT_MIN = 256
+
+
+def _new_hash():
+    return hashlib.blake2b(digest_size=20)
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    """Copy src to dst as a reflink; False if the filesystem does not support it"""
+    if fcntl is None:
+        return False
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        try:
+            dst.unlink()
+        except OSError:
+            pass
+        return False
+
+
+def _snapshot(src, dst):
+    """Private copy of src at dst: reflink when possible, else a plain copy"""
+    if not _reflink(Path(src), Path(dst)):
+        shutil.copyfile(src, dst)
+
+
+def _hash_file(path: Path) -> str:
+    h = _new_hash()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _copy_and_hash(src: Path, dst: Path) -> str:
+    """Copy src to dst, hashing while copying (src is read once)"""
+    h = _new_hash()
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        for chunk in iter(lambda: fsrc.read(COPY_CHUNK), b''):
+            h.update(chunk)
+            fdst.write(chunk)
+    return h.hexdigest()
+
+
+class Codec:
+    """Streaming compression for blobs stored as <hash>.<suffix>"""
+    
+    def __init__(self, suffix: str, level: int):
+        self.suffix = suffix
+        self.level = level
+    
+    def compress_stream(self, fsrc, fdst):
+        if self.suffix == "zst":
+            zstandard.ZstdCompressor(level=self.level).copy_stream(fsrc, fdst)
+            return
+        if self.suffix == "lz4":
+            compressor = lz4_frame.LZ4FrameCompressor(compression_level=self.level)
+            fdst.write(compressor.begin())
+        else:
+            compressor = zlib.compressobj(self.level)
+        for chunk in iter(lambda: fsrc.read(COPY_CHUNK), b''):
+            fdst.write(compressor.compress(chunk))
+        fdst.write(compressor.flush())
+    
+    def decompress_stream(self, fsrc, fdst):
+        if self.suffix == "zst":
+            zstandard.ZstdDecompressor().copy_stream(fsrc, fdst)
+            return
+        if self.suffix == "lz4":
+            decompressor = lz4_frame.LZ4FrameDecompressor()
+        else:
+            decompressor = zlib.decompressobj()
+        for chunk in iter(lambda: fsrc.read(COPY_CHUNK), b''):
+            fdst.write(decompressor.decompress(chunk))
+        if self.suffix == "zlib":
+            fdst.write(decompressor.flush())
+
+
+# Codec đọc được trong process này, theo suffix
+CODECS = {"zlib": Codec("zlib", 6)}
+if zstandard is not None:
+    CODECS["zst"] = Codec("zst", 3)
+if lz4_frame is not None:
+    CODECS["lz4"] = Codec("lz4", 0)
+
+
+def choose_codec(name: str, size: int) -> Optional[Codec]:
+    """Codec for a blob by file type and size (None = store raw)"""
+    if COMPRESS in ("none", "0", "false", "no") or size < COMPRESS_MIN_SIZE:
+        return None
+    if Path(name).suffix.lower() in INCOMPRESSIBLE:
+        return None
+    forced = {"zstd": "zst", "zst": "zst", "lz4": "lz4", "zlib": "zlib"}.get(COMPRESS)
+    if forced:
+        return CODECS.get(forced, CODECS["zlib"])
+    if size > FAST_CODEC_SIZE:
+        # File lớn: ưu tiên tốc độ hơn tỉ lệ nén
+        return CODECS.get("lz4") or (Codec("zst", 1) if "zst" in CODECS else Codec("zlib", 1))
+    return CODECS.get("zst") or CODECS.get("lz4") or CODECS["zlib"]
+
+
+def make_delta(base: str, target: str) -> List:
+    """
+    Line-based delta that rebuilds target from base
+    Ops: [i1, i2] copies base lines i1..i2, a string is inserted as is.
+    Linear in the number of lines: each target line extends the current copy,
+    starts a copy at its first occurrence in base after the previous copy, or
+    is inserted (no LCS, whose cost grows with the number of changes).
+    """
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    positions = defaultdict(list)
+    for i, line in enumerate(base_lines):
+        positions[line].append(i)
+    ops = []
+    following = 0
+    for line in target_lines:
+        if ops and not isinstance(ops[-1], str) and following < len(base_lines) and base_lines[following] == line:
+            ops[-1][1] += 1
+            following += 1
+            continue
+        found = positions.get(line)
+        if found:
+            k = bisect.bisect_left(found, following)
+            i = found[k] if k < len(found) else found[0]
+            ops.append([i, i + 1])
+            following = i + 1
+        elif ops and isinstance(ops[-1], str):
+            ops[-1] += line
+        else:
+            ops.append(line)
+    return ops
+
+
+def apply_delta(base: str, ops: List) -> str:
+    base_lines = base.splitlines(keepends=True)
+    return "".join(op if isinstance(op, str) else "".join(base_lines[op[0]:op[1]]) for op in ops)
+
+
+class ObjectStore:
+    """
+    Content-addressed blob store: objects/<hash[:2]>/<hash[2:]>[.<codec>]
+    Blobs are written once and never modified; storing identical content again
+    only returns the existing hash. A blob is compressed when its codec makes it
+    smaller, and may later be replaced by a reverse delta (<hash>.delta) against
+    a newer blob, see deltify().
+    """
+    
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.tmp_dir = self.root / "tmp"
+        # Blob dựng từ delta gần nhất: rollback đi từ mới đến cũ nên delta kế tiếp dùng nó làm base
+        self._last_built = (None, b'')
+        # Tổng dung lượng store, tính lần đầu khi cần rồi cập nhật dần
+        self._size: Optional[int] = None
+    
+    def path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:]
+    
+    def delta_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / f"{digest[2:]}.delta"
+    
+    def locate(self, digest: str) -> Optional[tuple]:
+        """(path, codec or None) of the full blob, None if missing or stored as a delta"""
+        raw = self.path(digest)
+        if raw.exists():
+            return raw, None
+        for suffix, codec in CODECS.items():
+            compressed = raw.with_name(f"{raw.name}.{suffix}")
+            if compressed.exists():
+                return compressed, codec
+        return None
+    
+    def has(self, digest: str) -> bool:
+        return self.locate(digest) is not None or self.delta_path(digest).exists()
+    
+    def is_delta(self, digest: str) -> bool:
+        return self.locate(digest) is None and self.delta_path(digest).exists()
+    
+    def _tmp_path(self) -> Path:
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        return self.tmp_dir / f"{os.getpid()}_{threading.get_ident()}_{datetime.now().strftime('%H%M%S_%f')}"
+    
+    def _add_size(self, delta: int):
+        if self._size is not None:
+            self._size += delta
+    
+    def _commit(self, tmp: Path, digest: str, name: str = "") -> str:
+        """Move a snapshot into place (compressed if worth it), or drop it if already stored"""
+        if self.has(digest):
+            tmp.unlink()
+            return digest
+        target = self.path(digest)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        size = tmp.stat().st_size
+        codec = choose_codec(name, size)
+        if codec is not None and size > COMPRESS_SAMPLE:
+            # File lớn: thử nén một đoạn đầu trước, bỏ qua nếu dữ liệu không nén được
+            with open(tmp, 'rb') as f:
+                sample = f.read(COMPRESS_SAMPLE)
+            if len(zlib.compress(sample, 1)) > len(sample) * 0.9:
+                codec = None
+        if codec is not None:
+            packed = tmp.with_name(f"{tmp.name}.{codec.suffix}")
+            with open(tmp, 'rb') as fsrc, open(packed, 'wb') as fdst:
+                codec.compress_stream(fsrc, fdst)
+            packed_size = packed.stat().st_size
+            # Nén không được bao nhiêu (dữ liệu ngẫu nhiên, đã nén): lưu nguyên
+            if packed_size < size * 0.95:
+                os.replace(packed, target.with_name(f"{target.name}.{codec.suffix}"))
+                tmp.unlink()
+                self._add_size(packed_size)
+                return digest
+            packed.unlink()
+        os.replace(tmp, target)
+        self._add_size(size)
+        return digest
+    
+    def put_file(self, src: Path, allow_hardlink: bool = False) -> str:
+        """
+        Store the content of a file and return its hash
+        
+        Snapshot order: hardlink (only when allowed, i.e. the source is a staging
+        name whose original has already been deleted), reflink, then a plain copy.
+        """
+        tmp = self._tmp_path()
+        name = Path(src).name
+        if allow_hardlink and os.stat(src).st_nlink == 1:
+            try:
+                os.link(src, tmp)
+                return self._commit(tmp, _hash_file(tmp), name)
+            except OSError:
+                pass
+        if _reflink(src, tmp):
+            return self._commit(tmp, _hash_file(tmp), name)
+        return self._commit(tmp, _copy_and_hash(src, tmp), name)
+    
+    def put_bytes(self, data: bytes) -> str:
+        h = _new_hash()
+        h.update(data)
+        digest = h.hexdigest()
+        if not self.has(digest):
+            tmp = self._tmp_path()
+            tmp.write_bytes(data)
+            self._commit(tmp, digest)
+        return digest
+    
+    def get_bytes(self, digest: str) -> bytes:
+        found = self.locate(digest)
+        if found is not None:
+            path, codec = found
+            if codec is None:
+                return path.read_bytes()
+            with open(path, 'rb') as fsrc:
+                out = io.BytesIO()
+                codec.decompress_stream(fsrc, out)
+                return out.getvalue()
+        if self._last_built[0] == digest:
+            return self._last_built[1]
+        delta = json.loads(self.delta_path(digest).read_bytes())
+        base = self.get_bytes(delta["base"]).decode('utf-8')
+        data = apply_delta(base, delta["ops"]).encode('utf-8')
+        self._last_built = (digest, data)
+        return data
+    
+    def copy_to(self, digest: str, dst: Path):
+        """Write a blob to dst (reflink when possible, never a hardlink)"""
+        found = self.locate(digest)
+        if found is None:
+            dst.write_bytes(self.get_bytes(digest))
+            return
+        src, codec = found
+        if codec is not None:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                codec.decompress_stream(fsrc, fdst)
+        elif not _reflink(src, dst):
+            shutil.copyfile(src, dst)
+    
+    def deltify(self, digest: str, base: str, lock=None) -> bool:
+        """
+        Replace the full blob digest by a reverse delta against blob base
+        
+        Only for UTF-8 text of DELTA_MIN_SIZE to DELTA_MAX_SIZE bytes, when base is
+        a full blob (so deltas never form a cycle) and the delta is under half the
+        size. lock, if given, is held only while the blob is replaced.
+        """
+        found = self.locate(digest)
+        if digest == base or found is None or self.locate(base) is None:
+            return False
+        try:
+            raw = self.get_bytes(digest)
+            if not DELTA_MIN_SIZE <= len(raw) <= DELTA_MAX_SIZE:
+                return False
+            target = raw.decode('utf-8')
+            base_text = self.get_bytes(base).decode('utf-8')
+        except (UnicodeDecodeError, OSError):
+            # OSError: object vừa bị quota GC xóa
+            return False
+        
+        ops = make_delta(base_text, target)
+        data = json.dumps({"base": base, "ops": ops}, ensure_ascii=False).encode('utf-8')
+        if apply_delta(base_text, ops) != target:
+            return False
+        with lock or threading.Lock():
+            # Trong lúc tính delta, GC có thể đã xóa một trong hai object
+            found = self.locate(digest)
+            if found is None or self.locate(base) is None:
+                return False
+            full_size = found[0].stat().st_size
+            if len(data) * 2 > full_size:
+                return False
+            tmp = self._tmp_path()
+            tmp.write_bytes(data)
+            os.replace(tmp, self.delta_path(digest))
+            found[0].unlink()
+            self._add_size(len(data) - full_size)
+        return True
+    
+    def put_tree(self, src: Path, allow_hardlink: bool = False,
+                 dir_meta: Optional[Dict[str, tuple]] = None, rel: str = "") -> str:
+        """
+        Store a directory as a tree object: JSON list of entries pointing to blobs/trees
+        
+        Args:
+            dir_meta: (mode, mtime) of subdirectories by relative path, used when src
+                      is a staging copy whose directories were created just now
+        """
+        entries = []
+        for entry in sorted(os.scandir(src), key=lambda e: e.name):
+            st = entry.stat(follow_symlinks=False)
+            entry_rel = os.path.join(rel, entry.name)
+            item = {"name": entry.name, "mode": stat.S_IMODE(st.st_mode), "mtime": st.st_mtime}
+            if entry.is_symlink():
+                item.update(type="symlink", target=os.readlink(entry.path))
+            elif entry.is_dir(follow_symlinks=False):
+                if dir_meta and entry_rel in dir_meta:
+                    item["mode"], item["mtime"] = dir_meta[entry_rel]
+                item.update(type="tree", hash=self.put_tree(Path(entry.path), allow_hardlink, dir_meta, entry_rel))
+            elif entry.is_file(follow_symlinks=False):
+                item.update(type="blob", hash=self.put_file(Path(entry.path), allow_hardlink), size=st.st_size)
+            else:
+                continue
+            entries.append(item)
+        data = json.dumps({"type": "tree", "entries": entries}, ensure_ascii=False, sort_keys=True)
+        return self.put_bytes(data.encode('utf-8'))
+    
+    def restore_tree(self, digest: str, dst: Path):
+        """Recreate a directory from a tree object (dst must not exist)"""
+        tree = json.loads(self.get_bytes(digest))
+        dst.mkdir(parents=True)
+        for item in tree["entries"]:
+            target = dst / item["name"]
+            if item["type"] == "symlink":
+                os.symlink(item["target"], target)
+                continue
+            if item["type"] == "tree":
+                self.restore_tree(item["hash"], target)
+            else:
+                self.copy_to(item["hash"], target)
+            os.chmod(target, item["mode"])
+            os.utime(target, (item["mtime"], item["mtime"]))
+    
+    def tree_size(self, digest: str) -> int:
+        """Total size of the files in a stored tree (original, uncompressed)"""
+        total = 0
+        for item in json.loads(self.get_bytes(digest))["entries"]:
+            if item["type"] == "tree":
+                total += self.tree_size(item["hash"])
+            elif item["type"] == "blob":
+                total += item.get("size", 0)
+        return total
+    
+    def disk_usage(self) -> int:
+        """Bytes used by stored blobs, trees and deltas"""
+        if self._size is None:
+            self._size = sum(
+                p.stat().st_size for p in self.root.glob("??/*") if p.is_file()
+            ) if self.root.exists() else 0
+        return self._size
+    
+    def gc(self, live: List[str], trees: Set[str]) -> int:
+        """
+        Delete every object not reachable from live hashes (through trees and
+        delta bases). Returns the number of bytes freed.
+        
+        Args:
+            trees: the live hashes that are tree objects (directory backups); only
+                   these and the subtrees they list are read, other blobs are kept
+                   by hash without being decompressed
+        """
+        reachable = set()
+        pending = [(digest, digest in trees) for digest in live]
+        while pending:
+            digest, is_tree = pending.pop()
+            if digest in reachable:
+                continue
+            reachable.add(digest)
+            if self.is_delta(digest):
+                pending.append((json.loads(self.delta_path(digest).read_bytes())["base"], False))
+                continue
+            if not is_tree:
+                continue
+            try:
+                tree = json.loads(self.get_bytes(digest))
+            except (OSError, ValueError):
+                continue
+            pending.extend((item["hash"], item.get("type") == "tree") for item in tree.get("entries", [])
+                           if isinstance(item, dict) and isinstance(item.get("hash"), str))
+        
+        freed = 0
+        for path in self.root.glob("??/*"):
+            digest = path.parent.name + path.name.split(".", 1)[0]
+            if digest not in reachable and path.is_file():
+                freed += path.stat().st_size
+                path.unlink()
+        self._size = None
+        self._last_built = (None, b'')
+        return freed
+
+
+class OperationIndex:
+    """
+    Bisect index over the operation list (append order = id order = time order)
+    Lookups by id, by time and by path prefix are O(log n + k).
+    """
+    
+    def __init__(self, operations: List[Dict]):
+        self.rebuild(operations)
+    
+    def rebuild(self, operations: List[Dict]):
+        self.operations = operations
+        self.ids = []
+        self.times = []
+        self.by_path: Dict[str, List[int]] = {}
+        self.paths = []
+        for op in operations:
+            self.add(op)
+    
+    def add(self, op: Dict):
+        """Index an operation that was just appended to self.operations"""
+        position = len(self.ids)
+        self.ids.append(op["id"])
+        # Giữ times không giảm (đồng hồ có thể bị chỉnh lùi) để bisect đúng
+        self.times.append(max(op["timestamp"], self.times[-1]) if self.times else op["timestamp"])
+        for path in {op["original_path"], op.get("new_path") or op["original_path"]}:
+            if path not in self.by_path:
+                self.by_path[path] = []
+                bisect.insort(self.paths, path)
+            self.by_path[path].append(position)
+    
+    def after_id(self, op_id: int) -> List[Dict]:
+        return self.operations[bisect.bisect_right(self.ids, op_id):]
+    
+    def after_time(self, timestamp: str) -> List[Dict]:
+        return self.operations[bisect.bisect_right(self.times, timestamp):]
+    
+    def for_path(self, path: str, exact: bool = False) -> List[Dict]:
+        """Operations on path (as source or rename target), or anywhere under it unless exact"""
+        positions = list(self.by_path.get(path, []))
+        if not exact:
+            prefix = path.rstrip(os.sep) + os.sep
+            i = bisect.bisect_left(self.paths, prefix)
+            while i < len(self.paths) and self.paths[i].startswith(prefix):
+                positions.extend(self.by_path[self.paths[i]])
+                i += 1
+        return [self.operations[i] for i in sorted(set(positions))]
+
 
 class BackupManager:
     """Manages file backups for rollback functionality"""
@@ -23,44 +561,145 @@ class BackupManager:
         self.session_pid = session_pid
         self.backup_dir = Path(f"/tmp/moibash_backup_{session_pid}")
         self.manifest_file = self.backup_dir / "manifest.json"
+        self.journal_file = self.backup_dir / "journal.jsonl"
+        self.objects = ObjectStore(self.backup_dir / "objects")
         
         # Create backup directory if it doesn't exist
         self.backup_dir.mkdir(parents=True, exist_ok=True)
         
+        # Backup nền: worker được tạo khi có job đầu tiên
+        self._lock = threading.RLock()
+        self._queue: Optional[queue.Queue] = None
+        # Delta của phiên bản trước: (path, object mới), tính trên thread riêng
+        self._deltas: Optional[queue.Queue] = None
+        self._exit_hook = False
+        
         # Load or initialize manifest
+        self.journal_records = 0
         self.manifest = self._load_manifest()
+        self.index = OperationIndex(self.manifest["operations"])
+        self.next_id = max((op["id"] for op in self.manifest["operations"]), default=0) + 1
     
     def _load_manifest(self) -> Dict:
-        """Load manifest from disk or create new one"""
-        if self.manifest_file.exists():
+        """Rebuild the manifest by replaying the journal"""
+        manifest = {"operations": [], "session_pid": self.session_pid}
+        if not self.journal_file.exists():
+            if self.manifest_file.exists():
+                # Session cũ dùng manifest.json: chuyển sang journal
+                try:
+                    with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                        manifest["operations"] = json.load(f).get("operations", [])
+                    for i, op in enumerate(manifest["operations"], 1):
+                        op.setdefault("id", i)
+                    self.manifest = manifest
+                    self._compact_journal()
+                    self.manifest_file.unlink()
+                except Exception as e:
+                    print(f"Warning: Could not load manifest: {e}", file=sys.stderr)
+            return manifest
+        
+        try:
+            with open(self.journal_file, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            print(f"Warning: Could not load journal: {e}", file=sys.stderr)
+            return manifest
+        
+        offset = 0
+        while offset < len(data):
+            end = data.find(b'\n', offset)
             try:
-                with open(self.manifest_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Warning: Could not load manifest: {e}", file=sys.stderr)
-                return {"operations": [], "session_pid": self.session_pid}
-        else:
-            return {"operations": [], "session_pid": self.session_pid}
+                if end == -1:
+                    raise ValueError("record without newline")
+                record = json.loads(data[offset:end])
+            except ValueError:
+                if end == -1 or data.find(b'\n', end + 1) == -1:
+                    # Record cuối bị ghi dở (crash giữa chừng): cắt bỏ để append tiếp được
+                    self._truncate_journal(offset)
+                    break
+                print(f"Warning: Skipping corrupt journal record at byte {offset}", file=sys.stderr)
+                offset = end + 1
+                continue
+            self._apply(manifest, record)
+            self.journal_records += 1
+            offset = end + 1
+        return manifest
     
-    def _save_manifest(self):
-        """Save manifest to disk"""
+    def _apply(self, manifest: Dict, record: Dict):
+        """Apply one journal record to the in-memory manifest"""
+        if record.get("type") == "op":
+            op = record["op"]
+            operations = manifest["operations"]
+            op.setdefault("id", operations[-1]["id"] + 1 if operations else 1)
+            operations.append(op)
+        elif record.get("type") == "clear":
+            manifest["operations"] = []
+        elif record.get("type") in ("undo", "evict"):
+            undone = set(record.get("ids", []))
+            manifest["operations"] = [op for op in manifest["operations"] if op["id"] not in undone]
+    
+    def _truncate_journal(self, size: int):
         try:
-            with open(self.manifest_file, 'w', encoding='utf-8') as f:
-                json.dump(self.manifest, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Warning: Could not save manifest: {e}", file=sys.stderr)
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(size)
+                os.fsync(f.fileno())
+        except OSError as e:
+            print(f"Warning: Could not repair journal: {e}", file=sys.stderr)
+    
+    def _append_journal(self, record: Dict):
+        """Append one record to the journal and fsync it"""
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+        try:
+            fd = os.open(self.journal_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self.journal_records += 1
+        except OSError as e:
+            print(f"Warning: Could not write journal: {e}", file=sys.stderr)
+            return
+        
+        dead = self.journal_records - len(self.manifest["operations"])
+        if dead > JOURNAL_COMPACT_MIN and dead > len(self.manifest["operations"]):
+            # Replay lại trước: process khác (CLI rollback) có thể đã append vào journal
+            self.journal_records = 0
+            self.manifest = self._load_manifest()
+            self.index.rebuild(self.manifest["operations"])
+            self._compact_journal()
+    
+    def _compact_journal(self):
+        """Rewrite the journal with only the live operations (atomic replace)"""
+        operations = self.manifest["operations"]
+        tmp_file = self.journal_file.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                for op in operations:
+                    f.write(json.dumps({"type": "op", "op": op}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.journal_file)
+            self.journal_records = len(operations)
+        except OSError as e:
+            print(f"Warning: Could not compact journal: {e}", file=sys.stderr)
     
     def backup_file(self, file_path: str, operation: str, **metadata) -> Optional[str]:
         """
         Create a backup of a file before modification
         
+        In async mode, delete/rename return as soon as the source is staged
+        (hardlinked for delete, reflinked/copied for rename) and hashing,
+        compression and the object store write happen on the worker thread.
+        Other operations first wait for pending background backups.
+        
         Args:
             file_path: Path to the file to backup
             operation: Type of operation (update, delete, rename)
             **metadata: Additional metadata to store
             
         Returns:
-            Path to backup file or None if backup failed
+            Path to backup file (or staging copy) or None if backup failed
         """
         try:
             file_path = Path(file_path).resolve()
@@ -69,38 +708,351 @@ class BackupManager:
             if not file_path.exists():
                 return None
             
-            # Generate unique backup filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-            backup_name = f"{timestamp}_{file_path.name}"
-            backup_path = self.backup_dir / backup_name
+            if metadata.get("new_path"):
+                # Đường dẫn tuyệt đối để index theo path và rollback từ thư mục khác
+                metadata["new_path"] = str(Path(metadata["new_path"]).resolve())
             
-            # Copy file to backup location
-            if file_path.is_file():
-                shutil.copy2(file_path, backup_path)
-            elif file_path.is_dir():
-                shutil.copytree(file_path, backup_path)
-            else:
+            st = file_path.stat()
+            if not (file_path.is_file() or file_path.is_dir()):
                 return None
             
-            # Record operation in manifest
-            operation_record = {
-                "timestamp": timestamp,
-                "operation": operation,
-                "original_path": str(file_path),
-                "backup_path": str(backup_path),
-                "is_directory": file_path.is_dir(),
-                **metadata
-            }
+            with self._lock:
+                operation_record = {
+                    "id": self.next_id,
+                    "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S_%f"),
+                    "operation": operation,
+                    "original_path": str(file_path),
+                    "is_directory": file_path.is_dir(),
+                    "mode": stat.S_IMODE(st.st_mode),
+                    "mtime": st.st_mtime,
+                    "size": 0 if file_path.is_dir() else st.st_size,
+                    **metadata
+                }
+                self.next_id += 1
             
-            self.manifest["operations"].append(operation_record)
-            self._save_manifest()
+            if ASYNC_ENABLED and operation in ("delete", "rename"):
+                staged = self._stage(file_path, operation_record["id"], link=operation == "delete")
+                if staged is not None:
+                    self._submit(staged, operation_record)
+                    return str(staged[0])
+            # Update ghi đè tại chỗ: các job đang chờ (hardlink chung inode) phải xong trước.
+            # Cũng để quota GC không xóa object worker vừa ghi mà chưa vào manifest
+            self.wait(deltas=False)
             
+            # Không hardlink file đang sống: nếu delete thất bại, ghi tại chỗ sau đó sẽ sửa luôn backup
+            return self._store(file_path, operation_record)
+            
+        except Exception as e:
+            print(f"Warning: Could not backup file {file_path}: {e}", file=sys.stderr)
+            return None
+    
+    def backup_patch(self, file_path: str, undo: List[list]) -> Optional[str]:
+        """
+        Record a patch (update_file mode=patch) by its touched ranges only
+        
+        Args:
+            file_path: Path of the file about to be patched
+            undo: file_patch.Patch.undo, [offset in the patched file, old text,
+                new text] for each edit
+            
+        Returns:
+            Path to the stored ranges or None if backup failed
+        """
+        try:
+            file_path = Path(file_path).resolve()
+            st = file_path.stat()
+            data = json.dumps(undo, ensure_ascii=False).encode('utf-8')
+            # Quota GC không được xóa object worker vừa ghi mà chưa vào manifest
+            self.wait(deltas=False)
+            digest = self.objects.put_bytes(data)
+            found = self.objects.locate(digest)
+            backup_path = found[0] if found else self.objects.path(digest)
+            
+            with self._lock:
+                operation_record = {
+                    "id": self.next_id,
+                    "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S_%f"),
+                    "operation": "patch",
+                    "original_path": str(file_path),
+                    "is_directory": False,
+                    "mode": stat.S_IMODE(st.st_mode),
+                    "mtime": st.st_mtime,
+                    "size": len(data),
+                    "backup_path": str(backup_path),
+                    "object": digest,
+                }
+                self.next_id += 1
+                self.manifest["operations"].append(operation_record)
+                self.index.add(operation_record)
+                self._append_journal({"type": "op", "op": operation_record})
+                self._enforce_quota()
             return str(backup_path)
             
         except Exception as e:
             print(f"Warning: Could not backup file {file_path}: {e}", file=sys.stderr)
             return None
     
+    def _store(self, source: Path, operation_record: Dict, allow_hardlink: bool = False,
+               dir_meta: Optional[Dict[str, tuple]] = None) -> str:
+        """Store source in the object store and record the operation"""
+        # Store content in the object store (each unique content is kept once)
+        if operation_record["is_directory"]:
+            digest = self.objects.put_tree(source, allow_hardlink, dir_meta)
+            operation_record["size"] = self.objects.tree_size(digest)
+        else:
+            digest = self.objects.put_file(source, allow_hardlink)
+        found = self.objects.locate(digest)
+        backup_path = found[0] if found else self.objects.path(digest)
+        
+        with self._lock:
+            # Record operation in manifest
+            operation_record.update(backup_path=str(backup_path), object=digest)
+            self.manifest["operations"].append(operation_record)
+            self.index.add(operation_record)
+            self._append_journal({"type": "op", "op": operation_record})
+            self._enforce_quota()
+        
+        if DELTA_ENABLED and not operation_record["is_directory"]:
+            self._defer_delta(operation_record["original_path"], digest, operation_record["id"])
+        return str(backup_path)
+    
+    def _enforce_quota(self):
+        """
+        Evict the oldest backups until the session is within MAX_OPERATIONS and
+        MAX_BYTES (the newest backup is always kept)
+        """
+        operations = self.manifest["operations"]
+        count = max(len(operations) - MAX_OPERATIONS, 0) if MAX_OPERATIONS > 0 else 0
+        while True:
+            excess = self.objects.disk_usage() - MAX_BYTES if MAX_BYTES > 0 else 0
+            # Bỏ thêm backup cũ đến khi dung lượng gốc của chúng bù được phần vượt; object
+            # dùng chung với backup còn lại không được giải phóng nên có thể phải lặp lại
+            freed = 0
+            while freed < excess and count < len(operations) - 1:
+                freed += max(operations[count].get("size", 0), 1)
+                count += 1
+            count = min(count, len(operations) - 1)
+            if count <= 0:
+                return
+            self._evict(operations[:count])
+            operations = self.manifest["operations"]
+            count = 0
+    
+    def _evict(self, evict: List[Dict]):
+        """Drop operations from the log and delete objects no longer reachable"""
+        evicted = {op["id"] for op in evict}
+        for op in evict:
+            if not op.get("object") and op.get("backup_path"):
+                # Backup cũ: bản copy nằm ngoài object store
+                path = Path(op["backup_path"])
+                shutil.rmtree(path, ignore_errors=True) if path.is_dir() else path.unlink(missing_ok=True)
+        self.manifest["operations"] = [op for op in self.manifest["operations"] if op["id"] not in evicted]
+        self.index.rebuild(self.manifest["operations"])
+        self._append_journal({"type": "evict", "ids": sorted(evicted)})
+        live = [op for op in self.manifest["operations"] if op.get("object")]
+        self.objects.gc([op["object"] for op in live],
+                        {op["object"] for op in live if op.get("is_directory", False)})
+    
+    def stats(self) -> Dict[str, int]:
+        """Original size of the backed-up content vs bytes used in the object store"""
+        return {
+            "operations": len(self.manifest["operations"]),
+            "original": sum(op.get("size", 0) for op in self.manifest["operations"]),
+            "stored": self.objects.disk_usage(),
+        }
+    
+    def _stage(self, file_path: Path, op_id: int, link: bool = True) -> Optional[tuple]:
+        """
+        Hardlink file_path (a file or a whole tree) into staging/<op_id>
+        Only metadata is written, so the tool can run right after. Returns
+        (staged_path, dir_meta) or None when hardlinks are not possible (e.g.
+        source on another filesystem than /tmp), in which case the caller copies.
+        
+        link=False (rename): the file stays live under its new name, so each
+        file is reflinked or copied instead and later writes cannot reach it.
+        """
+        staged = self.backup_dir / "staging" / str(op_id)
+        dir_meta = {}
+        snapshot = os.link if link else _snapshot
+        try:
+            staged.parent.mkdir(parents=True, exist_ok=True)
+            if file_path.is_file():
+                snapshot(file_path, staged)
+                return staged, dir_meta
+            
+            for root, dirs, files in os.walk(file_path):
+                rel = os.path.relpath(root, file_path)
+                target = staged if rel == "." else staged / rel
+                target.mkdir()
+                if rel != ".":
+                    st = os.stat(root)
+                    dir_meta[rel] = (stat.S_IMODE(st.st_mode), st.st_mtime)
+                for name in files + [d for d in dirs if os.path.islink(os.path.join(root, d))]:
+                    src = os.path.join(root, name)
+                    if os.path.islink(src):
+                        os.symlink(os.readlink(src), target / name)
+                    elif os.path.isfile(src):
+                        snapshot(src, target / name)
+            return staged, dir_meta
+        except OSError as e:
+            print(f"Warning: Could not stage {file_path}, copying instead: {e}", file=sys.stderr)
+            self._unstage(staged)
+            return None
+    
+    def _submit(self, staged: tuple, operation_record: Dict):
+        """Queue a staged backup; blocks while the queue is full"""
+        with self._lock:
+            if self._queue is None:
+                self._queue = queue.Queue(maxsize=ASYNC_QUEUE_SIZE)
+                self._start_worker(self._worker, self._queue, "backup-worker")
+        self._queue.put((staged, operation_record))
+    
+    def _start_worker(self, target, jobs: queue.Queue, name: str):
+        """Start a worker thread for jobs (called with self._lock held)"""
+        threading.Thread(target=target, args=(jobs,), daemon=True, name=name).start()
+        if not self._exit_hook:
+            # Thoát process (sys.exit trong agent) chỉ sau khi mọi backup đã được lưu
+            atexit.register(self.close)
+            self._exit_hook = True
+    
+    def _worker(self, jobs: queue.Queue):
+        while True:
+            job = jobs.get()
+            if job is None:
+                jobs.task_done()
+                return
+            (staged_path, dir_meta), operation_record = job
+            try:
+                self._store(staged_path, operation_record, allow_hardlink=True, dir_meta=dir_meta)
+            except Exception as e:
+                print(f"Warning: Could not backup file {operation_record['original_path']}: {e}", file=sys.stderr)
+            finally:
+                self._unstage(staged_path)
+                jobs.task_done()
+    
+    def _unstage(self, staged: Path):
+        if staged.is_dir() and not staged.is_symlink():
+            shutil.rmtree(staged, ignore_errors=True)
+        else:
+            staged.unlink(missing_ok=True)
+    
+    def _defer_delta(self, path: str, digest: str, op_id: int):
+        """Queue the reverse delta of the previous backup of path (the tool does not wait for it)"""
+        with self._lock:
+            if self._deltas is None:
+                self._deltas = queue.Queue()
+                self._start_worker(self._delta_worker, self._deltas, "backup-delta")
+        self._deltas.put((path, digest, op_id))
+    
+    def _delta_worker(self, jobs: queue.Queue):
+        while True:
+            job = jobs.get()
+            if job is None:
+                jobs.task_done()
+                return
+            path, digest, op_id = job
+            try:
+                self._deltify_previous(path, digest, op_id)
+            except Exception as e:
+                print(f"Warning: Could not deltify backup of {path}: {e}", file=sys.stderr)
+            finally:
+                jobs.task_done()
+    
+    def wait(self, deltas: bool = True):
+        """
+        Block until every queued background backup is stored
+        
+        Args:
+            deltas: also wait for pending reverse deltas (needed before reading
+                    old versions back, not before taking a new backup)
+        """
+        if self._queue is not None:
+            self._queue.join()
+        if deltas and self._deltas is not None:
+            self._deltas.join()
+    
+    def close(self):
+        """
+        Finish pending background work and stop the worker threads
+        The agent server drops its manager after each turn; without this each
+        turn would leave its threads (and, through atexit, the manager) alive.
+        The manager stays usable: a later background job starts a new worker.
+        """
+        self.wait()
+        with self._lock:
+            workers = [jobs for jobs in (self._queue, self._deltas) if jobs is not None]
+            self._queue = self._deltas = None
+            if self._exit_hook:
+                atexit.unregister(self.close)
+                self._exit_hook = False
+        for jobs in workers:
+            jobs.put(None)
+    
+    def _deltify_previous(self, path: str, digest: str, op_id: int):
+        """
+        Turn the backup of path before operation op_id into a reverse delta against digest
+        Keeps it as a full snapshot when the versions before it already form a
+        chain of DELTA_CHAIN - 1 deltas, so a restore applies at most DELTA_CHAIN.
+        """
+        with self._lock:
+            # Backup của patch chỉ chứa các đoạn bị sửa, không phải một phiên bản của file
+            previous = [
+                op["object"] for op in self.index.for_path(path, exact=True)
+                if op["original_path"] == path and op.get("object") and not op.get("is_directory", False)
+                and op["operation"] != "patch" and op["id"] < op_id
+            ]
+            if not previous:
+                return
+            chain = 0
+            for older in reversed(previous[:-1]):
+                if not self.objects.is_delta(older):
+                    break
+                chain += 1
+        if chain < DELTA_CHAIN - 1:
+            # Tính delta ngoài lock: backup mới không phải chờ
+            self.objects.deltify(previous[-1], digest, self._lock)
+    
+    def _restore(self, op: Dict, target: Path):
+        """Write the backed-up content of op to target (target must not exist)"""
+        target.parent.mkdir(parents=True, exist_ok=True)
+        digest = op.get("object")
+        if digest is None:
+            # Backup cũ: bản copy đầy đủ tại backup_path
+            if op.get("is_directory", False):
+                shutil.copytree(op["backup_path"], target)
+            else:
+                shutil.copy2(op["backup_path"], target)
+            return
+        if op.get("is_directory", False):
+            self.objects.restore_tree(digest, target)
+        else:
+            self.objects.copy_to(digest, target)
+        os.chmod(target, op["mode"])
+        os.utime(target, (op["mtime"], op["mtime"]))
+    
+    def _unpatch(self, op: Dict, target: Path):
+        """Put back the old text of every range a patch touched (atomic replace)"""
+        undo = json.loads(self.objects.get_bytes(op["object"]))
+        with open(target, 'rb') as f:
+            data = f.read()
+        for offset, old, new in reversed(undo):
+            new = new.encode('utf-8')
+            if data[offset:offset + len(new)] != new:
+                raise ValueError(f"File đã bị sửa sau patch, không hoàn tác được: {target}")
+            data = data[:offset] + old.encode('utf-8') + data[offset + len(new):]
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp, op["mode"])
+            os.replace(tmp, target)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        os.utime(target, (op["mtime"], op["mtime"]))
+    
     def get_operations(self) -> List[Dict]:
         """Get list of all operations in this session"""
         return self.manifest.get("operations", [])
@@ -116,7 +1068,31 @@ class BackupManager:
         Returns:
             Dict with success status and details
         """
-        operations = self.manifest.get("operations", [])
+        self.wait()
+        return self._rollback(self.manifest.get("operations", []))
+    
+    def rollback_to(self, op_id: int) -> Dict[str, Any]:
+        """Rollback every operation after op_id (op_id itself is kept; 0 = all)"""
+        self.wait()
+        return self._rollback(self.index.after_id(op_id))
+    
+    def rollback_since(self, timestamp: str) -> Dict[str, Any]:
+        """
+        Rollback every operation made after a point in time
+        
+        Args:
+            timestamp: "%Y%m%d_%H%M%S_%f" like operation records (see parse_time())
+        """
+        self.wait()
+        return self._rollback(self.index.after_time(timestamp))
+    
+    def rollback_path(self, path: str) -> Dict[str, Any]:
+        """Rollback every operation on path, on files under it, or renaming into it"""
+        self.wait()
+        return self._rollback(self.index.for_path(str(Path(path).resolve())))
+    
+    def _rollback(self, operations: List[Dict]) -> Dict[str, Any]:
+        """Restore operations in reverse order, then drop them from the log"""
         if not operations:
             return {
                 "success": False,
@@ -136,7 +1112,7 @@ class BackupManager:
                 backup_path = Path(op["backup_path"])
                 operation = op["operation"]
                 
-                if not backup_path.exists():
+                if not (self.objects.has(op["object"]) if op.get("object") else backup_path.exists()):
                     failed += 1
                     errors.append(f"Backup không tồn tại: {backup_path}")
                     continue
@@ -146,17 +1122,17 @@ class BackupManager:
                     # Restore old content
                     if original_path.exists():
                         original_path.unlink()
-                    original_path.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(backup_path, original_path)
+                    self._restore(op, original_path)
+                    restored += 1
+                    
+                elif operation == "patch":
+                    # Chỉ các đoạn bị sửa được khôi phục
+                    self._unpatch(op, original_path)
                     restored += 1
                     
                 elif operation == "delete":
                     # Restore deleted file
-                    if op.get("is_directory", False):
-                        original_path.parent.mkdir(parents=True, exist_ok=True)
-                        shutil.copytree(backup_path, original_path)
-                    else:
-                        shutil.copy2(backup_path, original_path)
+                    self._restore(op, original_path)
                     restored += 1
                     
                 elif operation == "rename":
@@ -164,19 +1140,22 @@ class BackupManager:
                     new_path = Path(op.get("new_path", ""))
                     if new_path.exists():
                         new_path.unlink() if new_path.is_file() else shutil.rmtree(new_path)
-                    if op.get("is_directory", False):
-                        shutil.copytree(backup_path, original_path)
-                    else:
-                        shutil.copy2(backup_path, original_path)
+                    self._restore(op, original_path)
                     restored += 1
                 
             except Exception as e:
                 failed += 1
                 errors.append(f"Lỗi khôi phục {op['original_path']}: {str(e)}")
         
-        # Clear manifest after rollback
-        self.manifest["operations"] = []
-        self._save_manifest()
+        # Remove rolled-back operations from the log
+        if len(operations) == len(self.manifest["operations"]):
+            self.manifest["operations"] = []
+            self._append_journal({"type": "clear"})
+        else:
+            undone = {op["id"] for op in operations}
+            self.manifest["operations"] = [op for op in self.manifest["operations"] if op["id"] not in undone]
+            self._append_journal({"type": "undo", "ids": sorted(undone)})
+        self.index.rebuild(self.manifest["operations"])
         
         return {
             "success": restored > 0,
@@ -193,6 +1172,8 @@ class BackupManager:
                 shutil.rmtree(self.backup_dir)
             self.backup_dir.mkdir(parents=True, exist_ok=True)
             self.manifest = {"operations": [], "session_pid": self.session_pid}
+            self.index.rebuild(self.manifest["operations"])
+            self.journal_records = 0
         except Exception as e:
             print(f"Warning: Could not clear backups: {e}", file=sys.stderr)
 
@@ -202,14 +1183,35 @@ def get_backup_manager() -> BackupManager:
     return BackupManager()
 
 
+def parse_time(value: str) -> str:
+    """
+    Parse a CLI time into the operation timestamp format
+    Accepts HH:MM[:SS] (today), YYYY-MM-DD HH:MM[:SS] and YYYYmmdd_HHMMSS[_ffffff]
+    """
+    value = value.strip().replace("T", " ")
+    today = datetime.now().strftime("%Y-%m-%d")
+    for fmt, prefix in (("%H:%M:%S", today + " "), ("%H:%M", today + " "),
+                        ("%Y-%m-%d %H:%M:%S", ""), ("%Y-%m-%d %H:%M", ""),
+                        ("%Y%m%d_%H%M%S_%f", ""), ("%Y%m%d_%H%M%S", "")):
+        try:
+            parsed = datetime.strptime(prefix + value, (prefix and "%Y-%m-%d ") + fmt)
+        except ValueError:
+            continue
+        return parsed.strftime("%Y%m%d_%H%M%S_%f")
+    raise ValueError(f"Thời gian không hợp lệ: {value}")
+
+
 if __name__ == "__main__":
     # CLI interface for backup manager
     if len(sys.argv) < 2:
         print("Usage: backup_manager.py <command> [args...]")
         print("Commands:")
-        print("  list              - List all operations")
-        print("  rollback          - Rollback all operations")
-        print("  clear             - Clear all backups")
+        print("  list                  - List all operations")
+        print("  rollback              - Rollback all operations")
+        print("  rollback --to N       - Rollback operations after #N (keep 1..N)")
+        print("  rollback --at TIME    - Rollback operations after TIME (HH:MM[:SS] or YYYY-MM-DD HH:MM[:SS])")
+        print("  rollback --path PATH  - Rollback operations on PATH (file or folder)")
+        print("  clear                 - Clear all backups")
         sys.exit(1)
     
     command = sys.argv[1]
@@ -220,15 +1222,31 @@ if __name__ == "__main__":
         if not ops:
             print("Không có thao tác nào được backup")
         else:
+            stats = manager.stats()
+            ratio = stats["stored"] / stats["original"] if stats["original"] else 1.0
             print(f"Tổng số thao tác: {len(ops)}")
-            for i, op in enumerate(ops, 1):
-                print(f"\n{i}. {op['operation'].upper()} - {op['timestamp']}")
+            print(f"Dung lượng backup: {stats['stored']:,} / {stats['original']:,} bytes gốc ({ratio:.0%})")
+            for op in ops:
+                print(f"\n{op['id']}. {op['operation'].upper()} - {op['timestamp']}")
                 print(f"   File: {op['original_path']}")
                 if op.get('new_path'):
                     print(f"   → {op['new_path']}")
     
     elif command == "rollback":
-        result = manager.rollback_all()
+        args = sys.argv[2:]
+        try:
+            if not args:
+                result = manager.rollback_all()
+            elif args[0] == "--to" and len(args) == 2 and args[1].isdigit():
+                result = manager.rollback_to(int(args[1]))
+            elif args[0] == "--at" and len(args) >= 2:
+                result = manager.rollback_since(parse_time(" ".join(args[1:])))
+            elif args[0] == "--path" and len(args) >= 2:
+                result = manager.rollback_path(" ".join(args[1:]))
+            else:
+                raise ValueError(f"Tham số không hợp lệ: {' '.join(args)}")
+        except ValueError as e:
+            result = {"success": False, "message": str(e), "restored": 0, "failed": 0}
         print(json.dumps(result, ensure_ascii=False, indent=2))
     
     elif command == "clear":
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+content_search.py - Parallel content search (grep_files) over the working directory
+search_files only matches file names, so the agent used to find code by
+reading files one by one. grep() scans file contents:
+- the file list comes from the metadata index of file_index.py, one directory
+  at a time so that directories ignored by .gitignore (including the ones of
+  parent directories up to the git work tree) are never listed
+- files are memory-mapped and binary files (NUL in the first block) skipped
+- batches of files are scanned by a process pool across cores; small trees
+  and single-core machines are scanned in-process
+- the match count and the bytes scanned are capped (MOIBASH_GREP_MAX_RESULTS,
+  MOIBASH_GREP_MAX_BYTES); the result says when a cap was hit
+- on trees above MOIBASH_GREP_INDEX_MIN_BYTES the trigram index of
+  trigram_index.py narrows the files to scan; the file list itself is reused
+  while the file index reports no change (inotify)
+"""
+
+import os
+import re
+import mmap
+import atexit
+import fnmatch
+import sqlite3
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional, Tuple, Union, Any
+
+import file_index
+import trigram_index
+
+# Số kết quả tối đa trả về cho model
+MAX_RESULTS = int(os.environ.get('MOIBASH_GREP_MAX_RESULTS', '200'))
+# Tổng số byte tối đa được quét trong một lần gọi
+MAX_BYTES = int(os.environ.get('MOIBASH_GREP_MAX_BYTES', str(512 * 1024 * 1024)))
+# File lớn hơn mức này bị bỏ qua (log, dump, ...)
+MAX_FILE_BYTES = int(os.environ.get('MOIBASH_GREP_MAX_FILE_BYTES', str(16 * 1024 * 1024)))
+# Số process quét song song (0 = số CPU)
+WORKERS = int(os.environ.get('MOIBASH_GREP_WORKERS', '0')) or (os.cpu_count() or 1)
+# Dưới mức này quét ngay trong process (khởi động pool đắt hơn quét)
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+BATCH_BYTES = 4 * 1024 * 1024
+BINARY_PROBE = 8192
+SNIPPET_CHARS = 200
+ALWAYS_SKIP = frozenset((".git", ".hg", ".svn"))
+# Số danh sách file (theo thư mục tìm) được giữ lại giữa các lần gọi
+MAX_TREES = 8
+
+
+class GitIgnore:
+    """.gitignore rules of one directory (patterns relative to it)"""
+
+    def __init__(self, base: str, lines: List[str]):
+        self.base = base
+        self.rules: List[Tuple[re.Pattern, bool, bool, bool]] = []
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            elif line.startswith("\\"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            # Có "/" ở đầu hoặc giữa: so với path tương đối từ base, không thì so với tên
+            anchored = "/" in line
+            self.rules.append((re.compile(_glob_regex(line.lstrip("/"))), negate, dir_only, anchored))
+
+    @classmethod
+    def load(cls, directory: str, rel: str) -> Optional["GitIgnore"]:
+        try:
+            with open(os.path.join(directory, ".gitignore"), encoding="utf-8", errors="replace") as f:
+                ignore = cls(rel, f.readlines())
+        except OSError:
+            return None
+        return ignore if ignore.rules else None
+
+    def match(self, rel: str, name: str, is_dir: bool) -> Optional[bool]:
+        """True/False if a rule decides (last match wins), None otherwise"""
+        local = rel[len(self.base) + 1:] if self.base else rel
+        decision = None
+        for regex, negate, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.fullmatch(local if anchored else name):
+                decision = not negate
+        return decision
+
+
+def _glob_regex(pattern: str) -> str:
+    """gitignore glob → regex ("**" qua nhiều thư mục, "*" và "?" không qua "/")"""
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end < 0:
+                out.append(re.escape(c))
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                out.append("[" + ("^" + body[1:] if body.startswith("!") else body) + "]")
+                i = end + 1
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out)
+
+
+def _ignored(ignores: List[GitIgnore], rel: str, name: str, is_dir: bool) -> bool:
+    decision = None
+    for ignore in ignores:
+        matched = ignore.match(rel, name, is_dir)
+        if matched is not None:
+            decision = matched
+    return bool(decision)
+
+
+def _repo_ignores(top: str) -> Tuple[str, List[GitIgnore]]:
+    """
+    Path of top relative to its git work tree and the .gitignore files of the
+    directories above it (rules of a parent directory apply below it)
+    """
+    root = top
+    while not os.path.exists(os.path.join(root, ".git")):
+        parent = os.path.dirname(root)
+        if parent == root:
+            return "", []
+        root = parent
+    rel = os.path.relpath(top, root)
+    if rel == ".":
+        return "", []
+    ignores = []
+    parts = rel.split(os.sep)
+    for depth in range(len(parts)):
+        base = "/".join(parts[:depth])
+        ignore = GitIgnore.load(os.path.join(root, *parts[:depth]), base)
+        if ignore is not None:
+            ignores.append(ignore)
+    return "/".join(parts), ignores
+
+
+class Tree:
+    """Files under a directory: (path, name, real path, size, mtime), .gitignore applied"""
+
+    __slots__ = ("files", "total_bytes", "indexable")
+
+    def __init__(self, files: List[Tuple[str, str, str, int, float]]):
+        self.files = files
+        self.total_bytes = sum(f[3] for f in files)
+        # (real path, size, mtime) cho trigram index, bỏ file quá lớn
+        self.indexable = [(real, size, mtime) for _, _, real, size, mtime in files if size <= MAX_FILE_BYTES]
+
+
+_TREES: "OrderedDict[Tuple[str, str], Tuple[file_index.FileIndex, int, Tree]]" = OrderedDict()
+_TREES_LOCK = threading.Lock()
+
+
+def _walk(index: file_index.FileIndex, real_path: str, dir_path: str) -> List[Tuple[str, str, str, int, float]]:
+    top_rel, top_ignores = _repo_ignores(real_path)
+    files = []
+    # (path thật để hỏi index, path hiển thị, path tương đối trong repo, rules đang áp dụng)
+    pending = [(real_path, dir_path, top_rel, top_ignores)]
+    while pending:
+        path, display, rel, ignores = pending.pop()
+        try:
+            entries = index.listing(path, False)[0][1]
+        except OSError:
+            continue
+        if any(name == ".gitignore" for name, _ in entries):
+            ignore = GitIgnore.load(path, rel)
+            if ignore is not None:
+                ignores = ignores + [ignore]
+        subdirs = []
+        for name, (kind, size, mtime) in entries:
+            child_rel = f"{rel}/{name}" if rel else name
+            if kind == file_index.DIR:
+                if name not in ALWAYS_SKIP and not _ignored(ignores, child_rel, name, True):
+                    subdirs.append((os.path.join(path, name), os.path.join(display, name), child_rel, ignores))
+            elif kind == file_index.FILE and not _ignored(ignores, child_rel, name, False):
+                files.append((os.path.join(display, name), name, os.path.join(path, name), size, mtime))
+        pending.extend(reversed(subdirs))
+    return files
+
+
+def list_tree(dir_path: str) -> Tuple[Tree, str, Optional[file_index.FileIndex]]:
+    """(files under dir_path, its real path, the file index it came from if under the working directory)"""
+    indexed = file_index.lookup(dir_path)
+    if indexed is None:
+        real_path = os.path.realpath(dir_path)
+        return Tree(_walk(file_index.FileIndex(dir_path, watch=False), real_path, dir_path)), real_path, None
+    index, real_path = indexed
+    key = (dir_path, real_path)
+    version = index.version()
+    with _TREES_LOCK:
+        cached = _TREES.get(key)
+    if cached is not None and cached[0] is index and version is not None and cached[1] == version:
+        return cached[2], real_path, index
+    tree = Tree(_walk(index, real_path, dir_path))
+    # Chỉ giữ lại nếu không có thay đổi nào trong lúc duyệt
+    if version is not None and index.version() == version:
+        with _TREES_LOCK:
+            _TREES[key] = (index, version, tree)
+            _TREES.move_to_end(key)
+            while len(_TREES) > MAX_TREES:
+                _TREES.popitem(last=False)
+    return tree, real_path, index
+
+
+def list_candidates(dir_path: str, name_pattern: str = "*") -> List[Tuple[str, int]]:
+    """(path, size) of the files to scan under dir_path, .gitignore applied"""
+    files = list_tree(dir_path)[0].files
+    if name_pattern and name_pattern != "*":
+        name_match = re.compile(fnmatch.translate(name_pattern)).match
+        files = [f for f in files if name_match(f[1])]
+    return [(path, size) for path, _, _, size, _ in files]
+
+
+def _scan_data(path: str, data, regex: re.Pattern, matches: list, max_matches: int) -> bool:
+    """
+    Append (path, line, snippet) of each matching line; True once max_matches is reached
+    data is bytes (or an mmap), or str when the pattern is a str regex.
+    """
+    newline = "\n" if isinstance(data, str) else b"\n"
+    size = len(data)
+    line = 1
+    counted = 0
+    last_line_end = -1
+    for match in regex.finditer(data):
+        start = match.start()
+        if start <= last_line_end:
+            # Một dòng chỉ báo một lần
+            continue
+        line += data[counted:start].count(newline)
+        counted = start
+        line_start = data.rfind(newline, 0, start) + 1
+        line_end = data.find(newline, start)
+        if line_end < 0:
+            line_end = size
+        last_line_end = line_end
+        snippet = data[line_start:min(line_end, line_start + SNIPPET_CHARS * 4)]
+        if not isinstance(snippet, str):
+            snippet = snippet.decode("utf-8", errors="replace")
+        matches.append((path, line, snippet.strip()[:SNIPPET_CHARS]))
+        if len(matches) >= max_matches:
+            return True
+    return False
+
+
+def scan_files(paths: List[str], pattern: Union[bytes, str], flags: int,
+               max_matches: int) -> Tuple[List[Tuple[str, int, str]], int]:
+    """
+    (matches as (path, line, snippet), bytes scanned) - runs in a worker process
+    A str pattern is matched against the decoded text of each file.
+    """
+    regex = re.compile(pattern, flags)
+    text = isinstance(pattern, str)
+    matches = []
+    scanned = 0
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                head = f.read(BINARY_PROBE)
+                if b"\0" in head:
+                    continue
+                if len(head) < BINARY_PROBE:
+                    # File nhỏ: đã đọc hết, không cần mmap
+                    scanned += len(head)
+                    if text:
+                        head = head.decode("utf-8", errors="replace")
+                    if _scan_data(path, head, regex, matches, max_matches):
+                        break
+                    continue
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            continue
+        with data:
+            scanned += len(data)
+            if _scan_data(path, data[:].decode("utf-8", errors="replace") if text else data,
+                          regex, matches, max_matches):
+                break
+    return matches, scanned
+
+
+_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        # forkserver: agent server có nhiều thread, fork trực tiếp không an toàn
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else None)
+        _POOL = ProcessPoolExecutor(max_workers=WORKERS, mp_context=context)
+        atexit.register(_POOL.shutdown, wait=False, cancel_futures=True)
+    return _POOL
+
+
+def _batches(files: List[Tuple[str, int]]) -> List[List[str]]:
+    batches, batch, size = [], [], 0
+    for path, file_size in files:
+        batch.append(path)
+        size += file_size
+        if size >= BATCH_BYTES:
+            batches.append(batch)
+            batch, size = [], 0
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _map_batches(func, batches: List[List[str]]):
+    """func(batch) for each batch, in order; through the pool when it pays off"""
+    if WORKERS <= 1 or len(batches) < 2:
+        return map(func, batches)
+    return _pool().map(func, batches)
+
+
+def _narrow(tree: Tree, real_path: str, index: Optional[file_index.FileIndex],
+            pattern: bytes, regex: bool, flags: int) -> Optional[set]:
+    """Real paths of the files that can match (trigram index), None to scan them all"""
+    if index is None or tree.total_bytes < trigram_index.MIN_BYTES:
+        return None
+    query = trigram_index.query_for(pattern, regex, flags)
+    if query is None:
+        return None
+    trigrams = trigram_index.for_root(index.root)
+    if trigrams is None:
+        return None
+    try:
+        if not trigrams.sync(real_path, tree.indexable, _map_batches):
+            return None
+        return trigrams.candidates(query)
+    except (sqlite3.Error, OSError, RuntimeError):
+        return None
+
+
+def grep(dir_path: str, pattern: str, name_pattern: str = "*", regex: bool = False,
+         case_sensitive: bool = True, max_results: int = MAX_RESULTS) -> Dict[str, Any]:
+    """Search file contents under dir_path; matches come back in file-list order"""
+    flags = re.MULTILINE | (0 if case_sensitive else re.IGNORECASE)
+    raw = pattern.encode("utf-8")
+    if case_sensitive or raw.isascii():
+        compiled = raw if regex else re.escape(raw)
+    else:
+        # IGNORECASE trên bytes chỉ gộp hoa/thường ASCII ("LỊCH" không khớp "lịch"): so khớp trên text
+        compiled = pattern if regex else re.escape(pattern)
+    re.compile(compiled, flags)  # lỗi regex báo ngay ở đây
+
+    tree, real_path, index = list_tree(dir_path)
+    candidates = _narrow(tree, real_path, index, raw, regex, flags)
+    name_match = re.compile(fnmatch.translate(name_pattern)).match if name_pattern and name_pattern != "*" else None
+    files = []
+    skipped_large = 0
+    budget = MAX_BYTES
+    truncated = False
+    for path, name, real, size, _ in tree.files:
+        if name_match is not None and not name_match(name):
+            continue
+        if size > MAX_FILE_BYTES:
+            skipped_large += 1
+            continue
+        if candidates is not None and real not in candidates:
+            continue
+        if size > budget:
+            truncated = True
+            break
+        budget -= size
+        files.append((path, size))
+
+    total_bytes = sum(size for _, size in files)
+    batches = _batches(files)
+    results: Dict[int, Tuple[list, int]] = {}
+    if WORKERS <= 1 or total_bytes < PARALLEL_MIN_BYTES or len(batches) < 2:
+        found = 0
+        for i, batch in enumerate(batches):
+            results[i] = scan_files(batch, compiled, flags, max_results - found)
+            found += len(results[i][0])
+            if found >= max_results:
+                break
+    else:
+        pool = _pool()
+        # Giữ tối đa 2 batch/worker đang chạy để dừng sớm khi đủ kết quả
+        queue = list(enumerate(batches))
+        running = {}
+        found = 0
+        # Chỉ đếm các batch đã xong liền nhau từ batch đầu: dừng khi một batch sau
+        # đủ kết quả mà batch trước còn chạy sẽ bỏ sót match ở các file đứng trước
+        done_prefix = 0
+        while (queue or running) and found < max_results:
+            while queue and len(running) < WORKERS * 2:
+                i, batch = queue.pop(0)
+                running[pool.submit(scan_files, batch, compiled, flags, max_results)] = i
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+            while done_prefix in results:
+                found += len(results[done_prefix][0])
+                done_prefix += 1
+        for future in running:
+            future.cancel()
+
+    matches = []
+    scanned = 0
+    for i in sorted(results):
+        batch_matches, batch_bytes = results[i]
+        scanned += batch_bytes
+        for path, line, text in batch_matches:
+            if len(matches) < max_results:
+                matches.append({"path": path, "line": line, "text": text})
+    if len(matches) >= max_results:
+        truncated = True
+
+    result = {
+        "matches": matches,
+        "count": len(matches),
+        "files_scanned": sum(len(batches[i]) for i in results),
+        "bytes_scanned": scanned,
+        "truncated": truncated,
+        "pattern": pattern,
+        "search_path": dir_path,
+    }
+    if skipped_large:
+        result["skipped_large_files"] = skipped_large
+    return result
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+file_index.py - In-memory metadata index of the user's working directory
+list_files and search_files used to walk the tree and stat every file on each
+call, and the agent calls them many times in one task. FileIndex keeps, for
+each directory under USER_WORKING_DIR, its entries with (type, size, mtime):
+- a directory is scanned the first time a query reaches it
+- with inotify (Linux, through ctypes) each scanned directory is watched and
+  the queued events are applied before the next query: only the changed
+  entries are stat'ed again
+- without inotify (or when the watch limit is reached) a directory is checked
+  with one stat of its mtime and rescanned when it changed. A file edited in
+  place does not change its directory, so its size can be stale until the
+  next change in that directory (the files written by update_file are
+  refreshed through file_changed())
+version() lets callers that derive data from a listing (content_search.py)
+reuse it while nothing under the root changed.
+In the agent server the index lives across turns; a one-shot agent process
+builds it on its first list/search call.
+"""
+
+import os
+import stat
+import time
+import errno
+import struct
+import ctypes
+import ctypes.util
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# auto: inotify nếu có, không thì kiểm tra mtime thư mục; mtime; 0: duyệt lại mỗi lần gọi như cũ
+MODE = os.environ.get('MOIBASH_FILE_INDEX', 'auto').lower()
+# Số thư mục gốc (USER_WORKING_DIR) được giữ index cùng lúc
+MAX_ROOTS = 4
+# Thư mục đổi trong khoảng này sau lần quét có thể bị sửa tiếp mà mtime không đổi → quét lại
+RACY_NS = 2 * 10 ** 9
+
+# Loại entry (theo lstat; link_* là symlink trỏ tới file/thư mục)
+FILE = "file"
+DIR = "dir"
+LINK_FILE = "link_file"
+LINK_DIR = "link_dir"
+LINK = "link"
+OTHER = "other"
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    """Minimal non-blocking inotify binding (directories only)"""
+
+    _libc = None
+
+    def __init__(self):
+        if Inotify._libc is None:
+            Inotify._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            Inotify._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = Inotify._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+
+    def add(self, path: str) -> int:
+        wd = Inotify._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code), path)
+        return wd
+
+    def remove(self, wd: int):
+        Inotify._libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self) -> List[Tuple[int, int, str]]:
+        """Queued events as (wd, mask, name)"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT.unpack_from(data, offset)
+                offset += EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                events.append((wd, mask, name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+def stat_entry(path: str) -> Optional[Tuple[str, int, float]]:
+    """(type, size, mtime) of path, None if it no longer exists"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return None
+    if stat.S_ISLNK(st.st_mode):
+        try:
+            target = os.stat(path)
+        except OSError:
+            return (LINK, 0, st.st_mtime)
+        if stat.S_ISDIR(target.st_mode):
+            return (LINK_DIR, target.st_size, target.st_mtime)
+        if stat.S_ISREG(target.st_mode):
+            return (LINK_FILE, target.st_size, target.st_mtime)
+        return (LINK, 0, target.st_mtime)
+    if stat.S_ISDIR(st.st_mode):
+        return (DIR, st.st_size, st.st_mtime)
+    if stat.S_ISREG(st.st_mode):
+        return (FILE, st.st_size, st.st_mtime)
+    return (OTHER, st.st_size, st.st_mtime)
+
+
+class Directory:
+    """Entries of one directory: name → (type, size, mtime), in listdir order"""
+
+    __slots__ = ("entries", "mtime_ns", "scanned_ns", "wd")
+
+    def __init__(self, entries: Dict[str, Tuple[str, int, float]], mtime_ns: int, wd: Optional[int]):
+        self.entries = entries
+        self.mtime_ns = mtime_ns
+        self.scanned_ns = time.time_ns()
+        self.wd = wd
+
+    def stale(self, path: str) -> bool:
+        """Revalidation without inotify: one stat of the directory"""
+        mtime_ns = os.stat(path).st_mtime_ns
+        return mtime_ns != self.mtime_ns or self.scanned_ns - mtime_ns < RACY_NS
+
+
+class FileIndex:
+    """Metadata index of the directories under root"""
+
+    def __init__(self, root: str, watch: bool = True):
+        self.root = root
+        self.dirs: Dict[str, Directory] = {}
+        self.watches: Dict[int, str] = {}
+        self.lock = threading.Lock()
+        # Tăng mỗi khi dữ liệu đã index có thể đã đổi (event, quét lại, refresh)
+        self.generation = 0
+        # Có thư mục không watch được: không biết chắc khi nào đổi
+        self.partial = False
+        self.inotify = None
+        if watch:
+            try:
+                self.inotify = Inotify()
+            except (OSError, AttributeError, TypeError):
+                self.inotify = None
+
+    def listing(self, top: str, recursive: bool) -> List[Tuple[str, List[Tuple[str, Tuple[str, int, float]]]]]:
+        """
+        (relative dir, entries) of top and, if recursive, of every directory below
+        it (not following symlinks), in os.walk top-down order
+        Unreadable subdirectories are skipped like os.walk; an unreadable top raises OSError.
+        """
+        with self.lock:
+            self._apply_events()
+            result = []
+            pending = [("", top)]
+            while pending:
+                rel, path = pending.pop()
+                try:
+                    node = self._directory(path)
+                except OSError:
+                    if not rel:
+                        raise
+                    continue
+                entries = list(node.entries.items())
+                result.append((rel, entries))
+                if recursive:
+                    children = [name for name, meta in entries if meta[0] == DIR]
+                    for name in reversed(children):
+                        pending.append((os.path.join(rel, name) if rel else name, os.path.join(path, name)))
+            return result
+
+    def version(self) -> Optional[int]:
+        """
+        Counter that changes whenever an indexed directory may have changed,
+        None without inotify (only listing() again can tell)
+        """
+        with self.lock:
+            self._apply_events()
+            if self.inotify is None or self.partial:
+                return None
+            return self.generation
+
+    def refresh_entry(self, path: str):
+        """Stat path again (a file edited in place does not change its directory mtime)"""
+        with self.lock:
+            node = self.dirs.get(os.path.dirname(path))
+            if node is None:
+                return
+            self.generation += 1
+            name = os.path.basename(path)
+            meta = stat_entry(path)
+            if meta is None:
+                node.entries.pop(name, None)
+            else:
+                node.entries[name] = meta
+
+    def close(self):
+        with self.lock:
+            self._stop_watching()
+            self.dirs.clear()
+
+    def _directory(self, path: str) -> Directory:
+        node = self.dirs.get(path)
+        if node is not None and (node.wd is not None or not node.stale(path)):
+            return node
+        return self._scan(path)
+
+    def _scan(self, path: str) -> Directory:
+        # Watch trước khi đọc thư mục: thay đổi trong lúc quét vẫn có event
+        wd = self._watch(path)
+        if path in self.dirs:
+            self.generation += 1
+        if wd is None and self.inotify is not None:
+            self.partial = True
+        mtime_ns = os.stat(path).st_mtime_ns
+        entries = {}
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_symlink():
+                    meta = stat_entry(entry.path)
+                    if meta is not None:
+                        entries[entry.name] = meta
+                    continue
+                # Loại entry lấy từ d_type, chỉ một lstat cho size/mtime
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                kind = DIR if entry.is_dir(follow_symlinks=False) else FILE if entry.is_file(follow_symlinks=False) else OTHER
+                entries[entry.name] = (kind, st.st_size, st.st_mtime)
+        node = self.dirs[path] = Directory(entries, mtime_ns, wd)
+        return node
+
+    def _watch(self, path: str) -> Optional[int]:
+        if self.inotify is None:
+            return None
+        old = self.dirs.get(path)
+        if old is not None and old.wd is not None:
+            return old.wd
+        try:
+            wd = self.inotify.add(path)
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                # Hết fs.inotify.max_user_watches: chuyển cả index sang kiểm tra mtime
+                self._apply_events()
+                self._stop_watching()
+            return None
+        self.watches[wd] = path
+        return wd
+
+    def _stop_watching(self):
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+        self.watches.clear()
+        for node in self.dirs.values():
+            node.wd = None
+
+    def _apply_events(self):
+        if self.inotify is None:
+            return
+        changed = OrderedDict()
+        events = self.inotify.read()
+        if events:
+            self.generation += 1
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                # Mất event: quên hết, quét lại khi cần
+                self._forget(self.root)
+                self.dirs.clear()
+                changed.clear()
+                continue
+            path = self.watches.get(wd)
+            if path is None:
+                continue
+            if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                self._forget(path)
+                continue
+            if not name:
+                continue
+            child = os.path.join(path, name)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO):
+                self._forget(child)
+            changed[(path, name)] = child
+        for (path, name), child in changed.items():
+            node = self.dirs.get(path)
+            if node is None:
+                continue
+            meta = stat_entry(child)
+            if meta is None:
+                node.entries.pop(name, None)
+            else:
+                node.entries[name] = meta
+
+    def _forget(self, path: str):
+        """Drop path and the directories below it (the watch of a moved directory follows it)"""
+        prefix = path.rstrip("/") + "/"
+        for key in [key for key in self.dirs if key == path or key.startswith(prefix)]:
+            node = self.dirs.pop(key)
+            if node.wd is not None and self.watches.pop(node.wd, None) is not None and self.inotify is not None:
+                self.inotify.remove(node.wd)
+
+
+_INDEXES: "OrderedDict[str, FileIndex]" = OrderedDict()
+_INDEXES_LOCK = threading.Lock()
+
+
+def lookup(dir_path: str) -> Optional[Tuple[FileIndex, str]]:
+    """
+    (index, real path) for a directory under the working directory
+    (MOIBASH_USER_PWD, read per call for the agent server), None when the
+    index is disabled or the directory is outside it.
+    """
+    if MODE in ('0', 'false', 'no', 'off'):
+        return None
+    root = os.path.realpath(os.environ.get('MOIBASH_USER_PWD') or os.getcwd())
+    path = os.path.realpath(dir_path)
+    if path != root and not path.startswith(root.rstrip("/") + "/"):
+        return None
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(root)
+        if index is None:
+            index = _INDEXES[root] = FileIndex(root, watch=MODE != 'mtime')
+            while len(_INDEXES) > MAX_ROOTS:
+                _INDEXES.popitem(last=False)[1].close()
+        _INDEXES.move_to_end(root)
+    return index, path
+
+
+def file_changed(file_path: str):
+    """Update the indexed metadata of a file the tools have just written"""
+    path = os.path.realpath(file_path)
+    with _INDEXES_LOCK:
+        indexes = list(_INDEXES.values())
+    for index in indexes:
+        index.refresh_entry(path)
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+file_patch.py - Small edits to a file without sending its whole content
+update_file mode="patch" takes either search/replace blocks:
+
+    <<<<<<< SEARCH
+    lines as they are in the file
+    =======
+    new lines
+    >>>>>>> REPLACE
+
+or unified-diff hunks (`@@ -12,3 +12,4 @@` followed by ` `/`-`/`+` lines).
+Every block has to match whole lines of the file: a SEARCH block exactly once,
+a hunk (context + removed lines) at the occurrence nearest to its line number.
+A stale or wrong context is reported with the lines actually in the file
+instead of being patched in. The file is mapped, not decoded, and written to a
+temporary file in the same directory that is renamed over it, so a failed
+write never leaves a half-written file. Patch.undo holds the old text of the
+touched ranges only, which is what backup_manager.py keeps for a patch.
+"""
+
+import os
+import re
+import mmap
+import stat
+import difflib
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+SEARCH = re.compile(r"^<{5,9}[ \t]*SEARCH[ \t]*$")
+DIVIDER = re.compile(r"^={5,9}[ \t]*$")
+REPLACE = re.compile(r"^>{5,9}[ \t]*REPLACE[ \t]*$")
+HUNK = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+SCAN_CHUNK = 1024 * 1024
+# Số dòng của file hiện tại trả về khi một khối không khớp
+EXCERPT_LINES = 8
+# Số vị trí khớp tối đa được xét cho một khối
+MAX_MATCHES = 1000
+
+
+class Edit:
+    """One located block: bytes [start, end) of the file are replaced by new"""
+
+    __slots__ = ("label", "start", "end", "new", "line", "old_lines", "new_lines")
+
+    def __init__(self, label: str, start: int, end: int, new: bytes, line: int,
+                 old_lines: List[str], new_lines: List[str]):
+        self.label = label
+        self.start = start
+        self.end = end
+        self.new = new
+        self.line = line
+        self.old_lines = old_lines
+        self.new_lines = new_lines
+
+
+def _search_blocks(lines: List[str]) -> List[tuple]:
+    """(old lines, new lines, line hint, label) of each SEARCH/REPLACE block"""
+    blocks, state, old, new = [], None, [], []
+    for line in lines:
+        if state is None:
+            # Dòng ngoài khối (tên file, ```) được bỏ qua
+            if SEARCH.match(line):
+                state, old, new = "search", [], []
+        elif state == "search":
+            if DIVIDER.match(line):
+                state = "replace"
+            else:
+                old.append(line)
+        elif REPLACE.match(line):
+            blocks.append((old, new, None, f"Khối SEARCH #{len(blocks) + 1}"))
+            state = None
+        else:
+            new.append(line)
+    if state is not None:
+        raise ValueError(f"Khối SEARCH #{len(blocks) + 1} thiếu dòng {'=======' if state == 'search' else '>>>>>>> REPLACE'}")
+    return blocks
+
+
+def _hunks(lines: List[str]) -> List[tuple]:
+    """(old lines, new lines, line hint, label) of each unified-diff hunk; counts in @@ are not trusted"""
+    blocks, current = [], None
+    for i, line in enumerate(lines):
+        match = HUNK.match(line)
+        if match:
+            current = ([], [], int(match.group(1)), f"Hunk #{len(blocks) + 1}")
+            blocks.append(current)
+            continue
+        if line.startswith(("diff ", "index ")) or (
+                line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ ")):
+            # Header của file tiếp theo
+            current = None
+            continue
+        if current is None or line.startswith("\\"):
+            continue
+        tag, body = line[:1], line[1:]
+        if tag == "-":
+            current[0].append(body)
+        elif tag == "+":
+            current[1].append(body)
+        elif tag == " " or not line:
+            # Dòng context rỗng thường mất dấu cách đầu dòng
+            current[0].append(body)
+            current[1].append(body)
+        else:
+            current = None
+    return blocks
+
+
+def parse(text: str) -> List[tuple]:
+    """Blocks of a patch: [(old lines, new lines, line hint or None, label)]"""
+    lines = text.splitlines()
+    if any(SEARCH.match(line) for line in lines):
+        blocks = _search_blocks(lines)
+    elif any(HUNK.match(line) for line in lines):
+        blocks = _hunks(lines)
+    else:
+        raise ValueError("Patch phải gồm các khối <<<<<<< SEARCH / ======= / >>>>>>> REPLACE "
+                         "hoặc các hunk unified diff (@@ -a,b +c,d @@)")
+    if not blocks:
+        raise ValueError("Patch không có thay đổi nào")
+    return blocks
+
+
+def _count_lines(data, start: int, end: int) -> int:
+    """Newlines in data[start:end], counted by chunks (mmap has no count())"""
+    return sum(data[pos:min(pos + SCAN_CHUNK, end)].count(b"\n") for pos in range(start, end, SCAN_CHUNK))
+
+
+def _line_offset(data, line: int) -> int:
+    """Byte offset of 1-based line; len(data) past the end"""
+    pos, remaining, size = 0, line - 1, len(data)
+    while remaining > 0 and pos < size:
+        chunk = data[pos:pos + SCAN_CHUNK]
+        count = chunk.count(b"\n")
+        if count < remaining:
+            remaining -= count
+            pos += len(chunk)
+            continue
+        index = -1
+        for _ in range(remaining):
+            index = chunk.find(b"\n", index + 1)
+        return pos + index + 1
+    return min(pos, size)
+
+
+def _matches(data, block: bytes, newline: bytes) -> List[Tuple[int, int, bool]]:
+    """Line-aligned occurrences of block: (start, end, at end of a file without final newline)"""
+    found = []
+    pos = data.find(block)
+    while pos != -1 and len(found) < MAX_MATCHES:
+        if pos == 0 or data[pos - 1:pos] == b"\n":
+            found.append((pos, pos + len(block), False))
+        pos = data.find(block, pos + 1)
+    size = len(data)
+    tail = block[:-len(newline)]
+    if size and data[size - 1:] != b"\n" and tail:
+        # Dòng cuối của file không có newline
+        start = size - len(tail)
+        if start >= 0 and data[start:] == tail and (start == 0 or data[start - 1:start] == b"\n"):
+            found.append((start, size, True))
+    return found
+
+
+def _excerpt(data, line: int, count: int) -> str:
+    """Lines line..line+count-1 of the file, numbered like read_file ranges"""
+    start = _line_offset(data, line)
+    lines = data[start:start + SCAN_CHUNK].decode("utf-8", errors="replace").splitlines()[:count]
+    return "\n".join(f"{line + i:>6}| {text}" for i, text in enumerate(lines))
+
+
+def _mismatch(data, label: str, old_lines: List[str], hint: Optional[int]) -> ValueError:
+    """Error for a block that is not in the file, with the lines where it was expected"""
+    if hint is None:
+        # Khối SEARCH: đoán vị trí theo dòng không rỗng đầu tiên (bỏ khoảng trắng)
+        first = next((text.strip() for text in old_lines if text.strip()), "")
+        pos = data.find(first.encode("utf-8")) if first else -1
+        hint = _count_lines(data, 0, pos) + 1 if pos != -1 else None
+    message = f"{label} không khớp với nội dung file (context sai hoặc file đã thay đổi)"
+    if hint is None:
+        return ValueError(f"{message}. Đọc lại file (read_file/grep_files) rồi gửi lại patch")
+    count = min(max(len(old_lines), 1) + 2, EXCERPT_LINES)
+    return ValueError(f"{message}. Nội dung hiện tại từ dòng {hint}:\n{_excerpt(data, hint, count)}\n"
+                      f"Sửa khối theo đúng các dòng này rồi gửi lại patch")
+
+
+class Patch:
+    """Edits located in one file; write() applies them"""
+
+    def __init__(self, path: str, version: tuple, edits: List[Edit], data):
+        self.path = path
+        self.version = version
+        self.edits = edits
+        # [offset trong file sau patch, text cũ, text mới] của mỗi edit, để hoàn tác
+        self.undo = []
+        shift = 0
+        for e in edits:
+            old = data[e.start:e.end]
+            self.undo.append([e.start + shift, old.decode("utf-8"), e.new.decode("utf-8")])
+            shift += len(e.new) - len(old)
+
+    def summary(self) -> List[Dict[str, int]]:
+        """Line, removed and added line counts of each edit (in the original file)"""
+        return [{"line": e.line, "removed": len(e.old_lines), "added": len(e.new_lines)} for e in self.edits]
+
+    def diff(self, display_path: str) -> List[str]:
+        """Unified diff of the touched ranges only"""
+        lines = [f"--- a/{display_path}", f"+++ b/{display_path}"]
+        shift = 0
+        for e in self.edits:
+            lines.append(f"@@ -{e.line},{len(e.old_lines)} +{e.line + shift},{len(e.new_lines)} @@")
+            matcher = difflib.SequenceMatcher(None, e.old_lines, e.new_lines, autojunk=False)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                if tag == "equal":
+                    lines.extend(" " + text for text in e.old_lines[i1:i2])
+                    continue
+                lines.extend("-" + text for text in e.old_lines[i1:i2])
+                lines.extend("+" + text for text in e.new_lines[j1:j2])
+            shift += len(e.new_lines) - len(e.old_lines)
+        return lines
+
+    def write(self):
+        """Write the patched file to a temporary file and rename it over the original"""
+        directory, name = os.path.split(self.path)
+        fd, tmp = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+        try:
+            with open(self.path, "rb") as src, os.fdopen(fd, "wb") as dst:
+                st = os.fstat(src.fileno())
+                if (st.st_mtime_ns, st.st_size) != self.version:
+                    raise ValueError(f"File đã thay đổi từ lúc tạo patch: {self.path}")
+                data = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else b""
+                try:
+                    with memoryview(data) as view:
+                        pos = 0
+                        # Các đoạn không đổi được ghi thẳng từ mmap, không copy
+                        for e in self.edits:
+                            dst.write(view[pos:e.start])
+                            dst.write(e.new)
+                            pos = e.end
+                        dst.write(view[pos:])
+                finally:
+                    if st.st_size:
+                        data.close()
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.chmod(tmp, stat.S_IMODE(st.st_mode))
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+
+def locate(data, blocks: List[tuple]) -> List[Edit]:
+    """Find every block in data (bytes or mmap); edits sorted by position"""
+    first = data.find(b"\n")
+    newline = b"\r\n" if first > 0 and data[first - 1:first] == b"\r" else b"\n"
+    edits = []
+    for old_lines, new_lines, hint, label in blocks:
+        if not old_lines:
+            raise ValueError(f"{label} không có dòng nào của file (SEARCH/context rỗng): "
+                             f"cần ít nhất một dòng để định vị; thêm vào cuối file thì dùng mode append")
+        block = newline.join(text.encode("utf-8") for text in old_lines) + newline
+        found = _matches(data, block, newline)
+        if not found:
+            raise _mismatch(data, label, old_lines, hint)
+        lines = []
+        previous = line = 0
+        for start, _, _ in found:
+            line += _count_lines(data, previous, start)
+            previous = start
+            lines.append(line + 1)
+        if hint is None and len(found) > 1:
+            shown = ", ".join(str(n) for n in lines[:5])
+            raise ValueError(f"{label} xuất hiện {len(found)} lần (dòng {shown}{', ...' if len(found) > 5 else ''}): "
+                             f"thêm dòng context để khối là duy nhất")
+        # Hunk: chọn vị trí gần số dòng trong @@ nhất (file có thể đã lệch vài dòng)
+        index = min(range(len(found)), key=lambda k: abs(lines[k] - hint)) if hint is not None else 0
+        start, end, at_eof = found[index]
+        new = newline.join(text.encode("utf-8") for text in new_lines)
+        if new_lines and not at_eof:
+            new += newline
+        edits.append(Edit(label, start, end, new, lines[index], old_lines, new_lines))
+    edits.sort(key=lambda e: e.start)
+    for before, after in zip(edits, edits[1:]):
+        if after.start < before.end:
+            raise ValueError(f"{before.label} và {after.label} chồng lên nhau: gộp thành một khối")
+    return edits
+
+
+def prepare(path: str, text: str) -> Patch:
+    """Parse text and locate it in path; raises ValueError when it does not apply"""
+    blocks = parse(text)
+    path = os.path.realpath(path)
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else b""
+        try:
+            return Patch(path, (st.st_mtime_ns, st.st_size), locate(data, blocks), data)
+        finally:
+            if st.st_size:
+                data.close()
@@ -0,0 +1,642 @@
+#!/usr/bin/env python3
+"""
+fs_tools.py - Native Python implementation of the filesystem tools
+Mirrors readfile.sh, createfile.sh, updatefile.sh, deletefile.sh,
+renamefile.sh, listfiles.sh, searchfiles.sh and shell.sh so that
+function_call.py can run them in-process instead of forking bash + python3.
+list_files/search_files under the working directory are served from the
+metadata index of file_index.py. grep_files, list_symbols and read_symbol
+have no script: they search file contents through content_search.py and read
+outlines / single functions through symbol_index.py. update_file mode="patch"
+(patch_file, no script either) applies search/replace blocks or diff hunks
+through file_patch.py.
+Every function returns the same JSON dict the corresponding script prints.
+"""
+
+import os
+import re
+import mmap
+import shutil
+import difflib
+import fnmatch
+import subprocess
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+import file_index
+import file_patch
+import content_search
+import symbol_index
+
+# File lớn hơn mức này không được đọc nguyên vẹn: trả về từng trang (MOIBASH_READ_MAX_BYTES)
+READ_MAX_BYTES = int(os.environ.get('MOIBASH_READ_MAX_BYTES', str(256 * 1024)))
+# Kích thước một trang khi tự phân trang hoặc khi chỉ có offset
+READ_PAGE_BYTES = int(os.environ.get('MOIBASH_READ_PAGE_BYTES', str(64 * 1024)))
+READ_SCAN_CHUNK = 1024 * 1024
+# list_symbols trên thư mục: số file và số symbol tối đa trả về
+SYMBOL_MAX_FILES = 200
+SYMBOL_MAX_RESULTS = 1000
+
+
+def _error(message: str) -> Dict[str, Any]:
+    """Error result, same shape call_filesystem_script() builds for a failing script"""
+    return {"error": message, "exit_code": 1}
+
+
+def _abs_path(path: str) -> str:
+    """Chuyển relative path sang absolute giống `$(pwd)/$path` trong các script"""
+    if path.startswith('/'):
+        return path
+    return f"{os.getcwd()}/{path}"
+
+
+def _int_arg(value: str) -> Optional[int]:
+    """Tham số số nguyên của tool (chuỗi rỗng → None)"""
+    if value is None or str(value).strip() == "":
+        return None
+    return int(float(value))
+
+
+def _char_start(data, pos: int) -> int:
+    """Lùi pos về đầu ký tự UTF-8 (không cắt giữa một ký tự nhiều byte)"""
+    start = pos
+    while pos > 0 and start - pos < 3 and (data[pos] & 0xC0) == 0x80:
+        pos -= 1
+    return pos if (data[pos] & 0xC0) != 0x80 else start
+
+
+def _line_offset(data, line: int) -> int:
+    """Byte offset của dòng thứ line (1-based); len(data) nếu file ít dòng hơn"""
+    pos = 0
+    remaining = line - 1
+    size = len(data)
+    # Đếm newline theo từng khối bằng bytes.count (C), không tách cả file thành dòng
+    while remaining > 0 and pos < size:
+        chunk = data[pos:pos + READ_SCAN_CHUNK]
+        count = chunk.count(b"\n")
+        if count < remaining:
+            remaining -= count
+            pos += len(chunk)
+            continue
+        index = -1
+        for _ in range(remaining):
+            index = chunk.find(b"\n", index + 1)
+        return pos + index + 1
+    return min(pos, size)
+
+
+def _read_range(file_path: str, offset: Optional[int], length: Optional[int],
+                start_line: Optional[int], end_line: Optional[int]) -> Dict[str, Any]:
+    """Đọc một đoạn file qua mmap; trả về content + cursor để đọc tiếp"""
+    file_size = os.path.getsize(file_path)
+    by_lines = start_line is not None or end_line is not None
+    auto_page = not by_lines and offset is None and length is None
+    if by_lines:
+        start_line = max(start_line or 1, 1)
+        if end_line is not None and end_line < start_line:
+            return _error(f"end_line ({end_line}) phải lớn hơn hoặc bằng start_line ({start_line})")
+        limit = READ_MAX_BYTES if end_line is not None else READ_PAGE_BYTES
+    else:
+        limit = min(length if length and length > 0 else READ_PAGE_BYTES, READ_MAX_BYTES)
+
+    with open(file_path, 'rb') as f:
+        if file_size == 0:
+            data = b""
+        else:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if by_lines:
+                start = _line_offset(data, start_line)
+                stop = file_size
+                if end_line is not None:
+                    stop = start + _line_offset(data[start:min(file_size, start + READ_MAX_BYTES + 1)], end_line - start_line + 2)
+            else:
+                start = min(max(offset or 0, 0), file_size)
+                if start < file_size:
+                    start = _char_start(data, start)
+                stop = file_size
+            cut = stop - start > limit
+            if cut:
+                stop = start + limit
+                newline = data.rfind(b"\n", start, stop) if (by_lines or auto_page) else -1
+                if newline >= start:
+                    # Trang kết thúc ở cuối dòng
+                    stop = newline + 1
+                elif stop < file_size:
+                    stop = _char_start(data, stop)
+                if stop <= start:
+                    # length nhỏ hơn một ký tự: vẫn trả về trọn ký tự đầu để cursor luôn tiến
+                    stop = start + 1
+                    while stop < file_size and stop - start < 4 and (data[stop] & 0xC0) == 0x80:
+                        stop += 1
+            chunk = data[start:stop]
+        finally:
+            if file_size:
+                data.close()
+
+    content = chunk.decode('utf-8', errors='replace')
+    result = {
+        'content': content,
+        'path': file_path,
+        'size': len(content),
+        'file_size': file_size,
+        'offset': start,
+        'end_offset': stop,
+        'eof': stop >= file_size,
+    }
+    if by_lines and start >= file_size:
+        # start_line vượt quá số dòng của file: không có dòng nào để trả về
+        result['start_line'] = start_line
+        result['note'] = f"File không có dòng {start_line} (đã hết file)"
+    elif by_lines:
+        result['start_line'] = start_line
+        result['end_line'] = start_line + max(chunk.count(b"\n") - (1 if chunk.endswith(b"\n") else 0), 0)
+    if stop < file_size and (cut or by_lines):
+        result['next_offset'] = stop
+        if by_lines:
+            result['next_line'] = result['end_line'] + 1
+        if cut:
+            result['note'] = (f"File lớn ({file_size:,} bytes): chỉ trả về {stop - start:,} bytes. "
+                              f"Đọc tiếp bằng offset={stop}" + (f" hoặc start_line={result['end_line'] + 1}" if by_lines else "")
+                              + ", hoặc dùng start_line/end_line để đọc đúng đoạn cần.")
+    return result
+
+
+def read_file(file_path: str = "", offset: str = "", length: str = "",
+              start_line: str = "", end_line: str = "") -> Dict[str, Any]:
+    """
+    Đọc nội dung file (readfile.sh)
+    offset/length (bytes) hoặc start_line/end_line (1-based, gồm end_line) đọc một
+    đoạn qua mmap. File lớn hơn READ_MAX_BYTES không có range được trả về từng trang
+    kèm next_offset để đọc tiếp.
+    """
+    if not file_path:
+        return _error("Đường dẫn file là bắt buộc")
+
+    file_path = _abs_path(file_path)
+
+    if not os.path.isfile(file_path):
+        return _error(f"File không tồn tại: {file_path}")
+
+    if not os.access(file_path, os.R_OK):
+        return _error(f"Không có quyền đọc file: {file_path}")
+
+    try:
+        ranges = [_int_arg(value) for value in (offset, length, start_line, end_line)]
+    except ValueError:
+        return _error("offset, length, start_line, end_line phải là số nguyên")
+
+    if any(value is not None for value in ranges) or os.path.getsize(file_path) > READ_MAX_BYTES:
+        return _read_range(file_path, *ranges)
+
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        content = f.read()
+
+    return {'content': content, 'path': file_path, 'size': len(content)}
+
+
+def create_file(file_path: str = "", content: str = "") -> Dict[str, Any]:
+    """Tạo file mới (createfile.sh)"""
+    if not file_path:
+        return _error("Đường dẫn file là bắt buộc")
+
+    file_path = _abs_path(file_path)
+
+    if os.path.isfile(file_path):
+        return _error(f"File đã tồn tại: {file_path}")
+
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        # `echo "$content" > file` luôn thêm newline ở cuối
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(content + '\n')
+    except OSError:
+        return _error(f"Không thể tạo file: {file_path}")
+
+    return {"success": True, "path": file_path, "message": "Đã tạo file thành công"}
+
+
+def update_file(file_path: str = "", content: str = "", mode: str = "overwrite") -> Dict[str, Any]:
+    """Cập nhật nội dung file, mode overwrite hoặc append (updatefile.sh)"""
+    if mode == "patch":
+        return patch_file(file_path, content)
+
+    if not file_path:
+        return _error("Đường dẫn file là bắt buộc")
+
+    file_path = _abs_path(file_path)
+
+    if not os.path.isfile(file_path):
+        return _error(f"File không tồn tại: {file_path}")
+
+    if not os.access(file_path, os.W_OK):
+        return _error(f"Không có quyền ghi file: {file_path}")
+
+    try:
+        with open(file_path, 'a' if mode == "append" else 'w', encoding='utf-8') as f:
+            f.write(content + '\n')
+    except OSError:
+        return _error(f"Không thể cập nhật file: {file_path}")
+
+    file_index.file_changed(file_path)
+
+    return {"success": True, "path": file_path, "message": "Đã cập nhật file thành công"}
+
+
+def patch_file(file_path: str = "", patch: str = "") -> Dict[str, Any]:
+    """Áp dụng các khối SEARCH/REPLACE hoặc hunk unified diff vào file (update_file mode patch)"""
+    if not file_path:
+        return _error("Đường dẫn file là bắt buộc")
+
+    file_path = _abs_path(file_path)
+
+    if not os.path.isfile(file_path):
+        return _error(f"File không tồn tại: {file_path}")
+
+    if not os.access(file_path, os.W_OK):
+        return _error(f"Không có quyền ghi file: {file_path}")
+
+    try:
+        patch = file_patch.prepare(file_path, patch)
+        patch.write()
+    except ValueError as e:
+        return _error(str(e))
+    except OSError:
+        return _error(f"Không thể cập nhật file: {file_path}")
+
+    file_index.file_changed(file_path)
+
+    return {"success": True, "path": file_path, "message": f"Đã áp dụng {len(patch.edits)} thay đổi",
+            "edits": patch.summary()}
+
+
+def delete_file(file_path: str = "") -> Dict[str, Any]:
+    """Xóa file hoặc folder (deletefile.sh)"""
+    if not file_path:
+        return _error("Đường dẫn file là bắt buộc")
+
+    file_path = _abs_path(file_path)
+
+    if not os.path.lexists(file_path):
+        return _error(f"File/folder không tồn tại: {file_path}")
+
+    try:
+        if os.path.isdir(file_path) and not os.path.islink(file_path):
+            shutil.rmtree(file_path)
+        else:
+            os.remove(file_path)
+    except OSError:
+        return _error(f"Không thể xóa: {file_path}")
+
+    return {"success": True, "path": file_path, "message": "Đã xóa thành công"}
+
+
+def rename_file(old_path: str = "", new_path: str = "") -> Dict[str, Any]:
+    """Đổi tên file/folder (renamefile.sh)"""
+    if not old_path or not new_path:
+        return _error("Cần cung cấp đường dẫn cũ và mới")
+
+    old_path = _abs_path(old_path)
+    new_path = _abs_path(new_path)
+
+    if not os.path.exists(old_path):
+        return _error(f"File/folder không tồn tại: {old_path}")
+
+    if os.path.exists(new_path):
+        return _error(f"File/folder đích đã tồn tại: {new_path}")
+
+    try:
+        shutil.move(old_path, new_path)
+    except (OSError, shutil.Error):
+        return _error(f"Không thể đổi tên từ {old_path} sang {new_path}")
+
+    return {
+        "success": True,
+        "old_path": old_path,
+        "new_path": new_path,
+        "message": "Đã đổi tên thành công"
+    }
+
+
+def list_files(dir_path: str = ".", pattern: str = "*", recursive: str = "false") -> Dict[str, Any]:
+    """Liệt kê files và folders trong thư mục (listfiles.sh)"""
+    dir_path = _abs_path(dir_path or ".")
+    pattern = pattern or "*"
+
+    if not os.path.isdir(dir_path):
+        return _error(f"Thư mục không tồn tại: {dir_path}")
+
+    files = []
+    folders = []
+    suffix = pattern.replace('*', '')
+
+    try:
+        indexed = file_index.lookup(dir_path)
+        if indexed is not None:
+            # Metadata từ index (file_index.py), cùng thứ tự với os.walk/os.listdir
+            index, real_path = indexed
+            for rel, entries in index.listing(real_path, recursive == "true"):
+                prefix = os.path.join(dir_path, rel, '')
+                for name, (kind, size, _) in entries:
+                    if kind in (file_index.FILE, file_index.LINK_FILE):
+                        if pattern == '*' or name.endswith(suffix):
+                            files.append({'name': name, 'path': prefix + name, 'size': size})
+                    elif kind in (file_index.DIR, file_index.LINK_DIR):
+                        folders.append({'name': name, 'path': prefix + name})
+        elif recursive == "true":
+            for root, dirs, filenames in os.walk(dir_path):
+                for filename in filenames:
+                    if pattern == '*' or filename.endswith(suffix):
+                        full_path = os.path.join(root, filename)
+                        size = os.path.getsize(full_path)
+                        files.append({'name': filename, 'path': full_path, 'size': size})
+                for dirname in dirs:
+                    full_path = os.path.join(root, dirname)
+                    folders.append({'name': dirname, 'path': full_path})
+        else:
+            for item in os.listdir(dir_path):
+                full_path = os.path.join(dir_path, item)
+                if os.path.isfile(full_path):
+                    if pattern == '*' or item.endswith(suffix):
+                        size = os.path.getsize(full_path)
+                        files.append({'name': item, 'path': full_path, 'size': size})
+                elif os.path.isdir(full_path):
+                    folders.append({'name': item, 'path': full_path})
+    except Exception as e:
+        return {'error': str(e)}
+
+    return {
+        'files': files,
+        'folders': folders,
+        'file_count': len(files),
+        'folder_count': len(folders),
+        'path': dir_path
+    }
+
+
+def _find_files(dir_path: str, recursive: bool) -> Iterator[str]:
+    """Duyệt thư mục theo thứ tự của `find -type f` (pre-order, không follow symlink)"""
+    try:
+        entries = os.scandir(dir_path)
+    except OSError:
+        return
+    with entries:
+        for entry in entries:
+            try:
+                if entry.is_file(follow_symlinks=False):
+                    yield entry.path
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    yield from _find_files(entry.path, recursive)
+            except OSError:
+                continue
+
+
+def _find_indexed(listing: Dict[str, list], root: str, rel: str, match) -> Iterator[Tuple[str, str, int]]:
+    """(path, name, size) của các file khớp, theo thứ tự của _find_files(), từ FileIndex.listing()"""
+    prefix = root if root.endswith('/') else root + '/'
+    for name, (kind, size, _) in listing.get(rel, ()):
+        if kind == file_index.FILE:
+            if match(name):
+                yield prefix + name, name, size
+        elif kind == file_index.DIR:
+            yield from _find_indexed(listing, prefix + name, f"{rel}/{name}" if rel else name, match)
+
+
+def search_files(dir_path: str = ".", name_pattern: str = "", recursive: str = "true") -> Dict[str, Any]:
+    """Tìm kiếm files theo pattern tên (searchfiles.sh)"""
+    dir_path = _abs_path(dir_path or ".")
+
+    if not os.path.isdir(dir_path):
+        return _error(f"Thư mục không tồn tại: {dir_path}")
+
+    match = re.compile(fnmatch.translate(name_pattern)).match
+    files = []
+    indexed = file_index.lookup(dir_path)
+    if indexed is not None:
+        index, real_path = indexed
+        try:
+            listing = dict(index.listing(real_path, recursive == "true"))
+        except OSError:
+            listing = {}
+        for path, name, size in _find_indexed(listing, dir_path, "", match):
+            files.append({'path': path, 'name': name, 'size': size})
+    else:
+        for path in _find_files(dir_path, recursive == "true"):
+            name = os.path.basename(path)
+            if not match(name):
+                continue
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            files.append({
+                'path': path,
+                'name': name,
+                'size': size
+            })
+
+    return {
+        'files': files,
+        'count': len(files),
+        'pattern': name_pattern,
+        'search_path': dir_path
+    }
+
+
+def grep_files(dir_path: str = ".", pattern: str = "", name_pattern: str = "*", regex: str = "false",
+               case_sensitive: str = "true", max_results: str = "") -> Dict[str, Any]:
+    """Tìm nội dung trong các file (content_search.py), trả về path, số dòng và dòng khớp"""
+    if not pattern:
+        return _error("Pattern là bắt buộc")
+
+    dir_path = _abs_path(dir_path or ".")
+
+    if not os.path.isdir(dir_path):
+        return _error(f"Thư mục không tồn tại: {dir_path}")
+
+    try:
+        limit = _int_arg(max_results)
+    except ValueError:
+        return _error("max_results phải là số nguyên")
+    limit = min(limit, content_search.MAX_RESULTS) if limit and limit > 0 else content_search.MAX_RESULTS
+
+    try:
+        return content_search.grep(dir_path, pattern, name_pattern or "*", regex == "true",
+                                   case_sensitive != "false", limit)
+    except re.error as e:
+        return _error(f"Regex không hợp lệ: {e}")
+
+
+def list_symbols(path: str = ".", query: str = "") -> Dict[str, Any]:
+    """
+    Outline của file (function, class, method kèm dòng bắt đầu/kết thúc) từ
+    symbol_index.py; path là thư mục thì outline của các file hỗ trợ bên trong
+    (đệ quy, theo .gitignore). query lọc theo tên (không phân biệt hoa thường).
+    """
+    path = _abs_path(path or ".")
+    needle = (query or "").lower()
+
+    if os.path.isfile(path):
+        try:
+            lang, symbols = symbol_index.symbols(path)
+        except (OSError, ValueError) as e:
+            return _error(f"Không đọc được outline của {path}: {e}")
+        symbols = [s for s in symbols if needle in s['name'].lower()]
+        return {'path': path, 'language': lang, 'symbols': symbols, 'count': len(symbols),
+                'file_size': os.path.getsize(path)}
+
+    if not os.path.isdir(path):
+        return _error(f"File hoặc thư mục không tồn tại: {path}")
+
+    files = []
+    count = 0
+    truncated = False
+    for file_path, name, _, size, _ in content_search.list_tree(path)[0].files:
+        if symbol_index.language(name) is None or size > symbol_index.MAX_FILE_BYTES:
+            continue
+        if len(files) >= SYMBOL_MAX_FILES or count >= SYMBOL_MAX_RESULTS:
+            truncated = True
+            break
+        try:
+            lang, symbols = symbol_index.symbols(file_path)
+        except (OSError, ValueError):
+            continue
+        symbols = [s for s in symbols if needle in s['name'].lower()][:SYMBOL_MAX_RESULTS - count]
+        if symbols:
+            files.append({'path': file_path, 'language': lang, 'symbols': symbols})
+            count += len(symbols)
+    result = {'files': files, 'count': count, 'search_path': path, 'truncated': truncated}
+    if truncated:
+        result['note'] = "Kết quả bị giới hạn: thu hẹp bằng query hoặc thư mục con."
+    return result
+
+
+def read_symbol(file_path: str = "", name: str = "") -> Dict[str, Any]:
+    """Đọc đúng các dòng của một function/class/method (tên từ list_symbols, ví dụ Class.method)"""
+    if not file_path or not name:
+        return _error("file_path và name là bắt buộc")
+
+    file_path = _abs_path(file_path)
+
+    if not os.path.isfile(file_path):
+        return _error(f"File không tồn tại: {file_path}")
+
+    try:
+        _, symbols = symbol_index.symbols(file_path)
+    except (OSError, ValueError) as e:
+        return _error(f"Không đọc được outline của {file_path}: {e}")
+
+    found = symbol_index.find(symbols, name)
+    if not found:
+        close = difflib.get_close_matches(name, [s['name'] for s in symbols], n=5, cutoff=0.5)
+        hint = f" Tên gần giống: {', '.join(close)}" if close else " Dùng list_symbols để xem các tên có trong file."
+        return _error(f"Không tìm thấy symbol '{name}' trong {file_path}.{hint}")
+
+    symbol = found[0]
+    chunk = _read_range(file_path, None, None, symbol['line'], symbol['end_line'])
+    result = {
+        'content': chunk['content'],
+        'path': file_path,
+        'name': symbol['name'],
+        'kind': symbol['kind'],
+        'start_line': chunk['start_line'],
+        'end_line': chunk['end_line'],
+    }
+    if chunk['end_line'] < symbol['end_line']:
+        result['next_line'] = chunk['end_line'] + 1
+        result['note'] = (f"Symbol lớn (dòng {symbol['line']}-{symbol['end_line']}): đọc tiếp bằng "
+                          f"read_file(start_line={chunk['end_line'] + 1}, end_line={symbol['end_line']}).")
+    if len(found) > 1:
+        result['other_matches'] = [{'name': s['name'], 'line': s['line']} for s in found[1:]]
+    return result
+
+
+def _run(cmd: List[str], cwd: str) -> tuple:
+    """Chạy lệnh, gộp stdout+stderr như `$(... 2>&1)` (bỏ newline cuối)"""
+    proc = subprocess.run(
+        cmd,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        check=False
+    )
+    output = proc.stdout.decode('utf-8', errors='replace').rstrip('\n')
+    return output, proc.returncode
+
+
+def execute_shell(action: str = "", target: str = "", args: str = "", working_dir: str = "") -> Dict[str, Any]:
+    """Chạy lệnh shell hoặc script file (shell.sh)"""
+    if not working_dir or not os.path.isdir(working_dir):
+        working_dir = os.getcwd()
+
+    if action == "command":
+        if not target:
+            return _error("Lệnh không được để trống")
+
+        # bash -c tương đương `eval "$target"` trong shell.sh
+        output, exit_code = _run(["bash", "-c", target], working_dir)
+        return {
+            'success': exit_code == 0,
+            'output': output,
+            'exit_code': exit_code,
+            'command': target,
+            'working_dir': working_dir
+        }
+
+    elif action == "file":
+        file_path = target
+        if not file_path:
+            return _error("Đường dẫn file là bắt buộc")
+
+        # Relative path tính theo working_dir (shell.sh cd vào đó trước)
+        if not file_path.startswith('/'):
+            file_path = f"{working_dir}/{file_path}"
+
+        if not os.path.isfile(file_path):
+            return _error(f"File không tồn tại: {file_path}")
+
+        # Validate file path to prevent path traversal attacks
+        resolved_path = os.path.realpath(file_path)
+        if not os.path.isfile(resolved_path):
+            return _error("Invalid file path")
+
+        if resolved_path.startswith('/etc/') or resolved_path.startswith('/root/'):
+            return _error("Access to system directories is restricted")
+
+        interpreter = {
+            'py': 'python3',
+            'sh': 'bash',
+            'js': 'node',
+        }.get(file_path.rsplit('.', 1)[-1])
+
+        if interpreter is None and not os.access(file_path, os.X_OK):
+            return _error("File không có extension hỗ trợ (py/sh/js) và không có quyền thực thi. Chỉ hỗ trợ Python, Bash, Node.js scripts.")
+
+        # `$args` không quote trong shell.sh → tách theo khoảng trắng
+        cmd = ([interpreter] if interpreter else []) + [file_path] + args.split()
+        try:
+            output, exit_code = _run(cmd, working_dir)
+        except OSError as e:
+            output, exit_code = str(e), 127
+
+        return {
+            'success': exit_code == 0,
+            'output': output,
+            'exit_code': exit_code,
+            'path': file_path
+        }
+
+    return _error("Action không hợp lệ. Sử dụng 'command' hoặc 'file'")
+
+
+# Map tên script (không có .sh) → hàm native tương ứng
+NATIVE_TOOLS = {
+    "readfile": read_file,
+    "createfile": create_file,
+    "updatefile": update_file,
+    "patchfile": patch_file,
+    "deletefile": delete_file,
+    "renamefile": rename_file,
+    "listfiles": list_files,
+    "searchfiles": search_files,
+    "grepfiles": grep_files,
+    "listsymbols": list_symbols,
+    "readsymbol": read_symbol,
+    "shell": execute_shell,
+}
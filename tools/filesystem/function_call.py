@@ -10,11 +10,21 @@ import json
 import subprocess
 import unicodedata
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any
 import requests
 import time
 import re
 
+# Shared pooled HTTP session (tools/gemini_client.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from gemini_client import get_session, model_url, stream_generate_content
+from gemini_cache import ContextCache
+from conversation_budget import ConversationBudget, request_bytes
+from chat_history import ChatHistory
+from history_search import relevant_history
+from terminal_markdown import format_markdown, StreamPrinter
+
 # Import backup manager
 try:
     from backup_manager import BackupManager
@@ -22,6 +32,18 @@ except ImportError:
     # Fallback if import fails
     BackupManager = None
 
+# Import native filesystem tools (fallback: gọi các script .sh)
+try:
+    from fs_tools import NATIVE_TOOLS
+except ImportError:
+    NATIVE_TOOLS = {}
+
+# update_file mode patch: định vị patch để preview và backup đúng các đoạn bị sửa
+try:
+    import file_patch
+except ImportError:
+    file_patch = None
+
 # Constants
 SCRIPT_DIR = Path(__file__).parent
 ENV_FILE = SCRIPT_DIR / "../../.env"
@@ -37,8 +59,17 @@ else:
     else:
         HISTORY_FILE = None
 MAX_ITERATIONS = int(os.environ.get('FILESYSTEM_MAX_ITERATIONS', '50'))
-MAX_HISTORY_MESSAGES = 10  # Keep last 10 messages for context
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
+MAX_HISTORY_MESSAGES = 10  # Keep last 10 pairs when history retrieval is off
+# Chạy filesystem tools in-process (set MOIBASH_FS_NATIVE=0 để dùng các script .sh)
+USE_NATIVE_TOOLS = os.environ.get('MOIBASH_FS_NATIVE', '1').lower() not in ('0', 'false', 'no')
+# Function chỉ đọc: chạy song song khi model trả về nhiều functionCall trong một lượt
+READ_ONLY_FUNCTIONS = ("read_file", "list_files", "search_files", "grep_files", "list_symbols", "read_symbol")
+TOOL_WORKERS = int(os.environ.get('MOIBASH_TOOL_WORKERS', '4'))
+GEMINI_API_URL = model_url("gemini-2.5-flash")
+GEMINI_STREAM_URL = model_url("gemini-2.5-flash", "streamGenerateContent")
+CONTEXT_CACHE = ContextCache("gemini-2.5-flash")
+# Compact conversation trước mỗi request (cắt kết quả tool cũ, giới hạn kích thước request)
+BUDGET = ConversationBudget("filesystem", log=lambda message: debug_print(message))
 
 # Get user's current working directory (where moibash was called from)
 USER_WORKING_DIR = os.environ.get('MOIBASH_USER_PWD', os.getcwd())
@@ -145,6 +176,25 @@ When user says "read the file", "analyze code" without specifying:
 2. Pick best match: main.py > index.js > app.py > test files
 3. Execute and complete full request
 
+Looking for code (a function, a string, where something is used)?
+→ `grep_files("def handle_login")` first, then read only the matching files
+
+Working on one function/class of a big source file (.py, .sh, .js, .ts)?
+→ `list_symbols("app.py")` for the outline, then `read_symbol("app.py", "Class.method")`
+  instead of read_file on the whole file
+
+Changing a few lines of an existing file?
+→ `update_file(path, content, mode="patch")` with only the changed blocks, never the whole file:
+```
+<<<<<<< SEARCH
+exact lines currently in the file (enough to be unique)
+=======
+new lines
+>>>>>>> REPLACE
+```
+  (several blocks per call; unified-diff hunks `@@ -a,b +c,d @@` also work).
+  If it fails, the error shows the real lines: fix the SEARCH text and retry.
+
 ### 4. Verify Before Delete/Rename
 - ALWAYS search first: `search_files(".", "filename", recursive=true)`
 - If not found → Report error
@@ -153,7 +203,7 @@ When user says "read the file", "analyze code" without specifying:
 ### 5. Test After Modifications
 ```
 Fix workflow:
-1. read_file → 2. Analyze bugs → 3. update_file → 4. shell("python file.py")
+1. read_file → 2. Analyze bugs → 3. update_file (mode="patch") → 4. shell("python file.py")
 5. Check exit_code → 6. If fail, retry (max 3x) → 7. Report results
 ```
 
@@ -166,13 +216,16 @@ Fix workflow:
 
 | Function | Purpose |
 |----------|---------|
-| `read_file(path)` | Read file content |
+| `read_file(path, start_line?, end_line?, offset?, length?)` | Read file content (big files come in pages: continue with `next_offset`) |
 | `create_file(path, content)` | Create new file |
-| `update_file(path, content, mode)` | Update file (overwrite/append) |
+| `update_file(path, content, mode)` | Update file (overwrite/append, or patch: only the changed blocks) |
 | `delete_file(path)` | Delete file/folder |
 | `rename_file(old_path, new_name)` | Rename file/folder |
 | `list_files(path, recursive)` | List directory contents |
 | `search_files(path, pattern, recursive)` | Find files by pattern |
+| `grep_files(pattern, path, name_pattern, regex)` | Find text in file contents (path, line, snippet) |
+| `list_symbols(path, query?)` | Outline of a source file or directory: functions/classes/methods with line ranges |
+| `read_symbol(path, name)` | Read only the code of one function/class/method |
 | `shell(action, command/file_path)` | Execute shell command or script |
 
 ## Key Workflows
@@ -180,14 +233,14 @@ Fix workflow:
 ### Complete Read/Analyze
 ```
 1. Find file (search_files/list_files)
-2. Read file
+2. Read file (big source file: list_symbols → read_symbol for the parts needed)
 3. ANALYZE thoroughly
 4. Response: Content + Full analysis/summary
 ```
 
 ### Bug Fix
 ```
-1. read_file → 2. Analyze → 3. update_file
+1. read_file → 2. Analyze → 3. update_file (mode="patch")
 4. shell("python test.py") → 5. Verify → 6. Iterate if needed
 7. Report: "Fixed X bugs: [list]. Test passed."
 ```
@@ -274,7 +327,9 @@ Exit code: 0
 ## Efficiency Tips
 
 ### Smart Searching
-- `grep -rn "pattern" .` > multiple read_file calls
+- `grep_files("pattern")` > multiple read_file calls
+- `read_symbol(path, name)` > read_file on a big file for one function
+- `update_file(mode="patch")` > resending a whole file to change a few lines
 - `find . -name "*.py"` for file discovery
 - `git grep` in git repos (faster)
 
@@ -321,13 +376,29 @@ head -20 file / tail -20 file           # Sample large files
 FUNCTION_DECLARATIONS = [
     {
         "name": "read_file",
-        "description": "Đọc nội dung của một file",
+        "description": "Đọc nội dung của một file. File lớn được trả về từng trang: đọc tiếp bằng offset=next_offset (hoặc start_line=next_line). Chỉ cần một đoạn thì dùng start_line/end_line.",
         "parameters": {
             "type": "object",
             "properties": {
                 "file_path": {
                     "type": "string",
                     "description": "Đường dẫn đến file cần đọc (tuyệt đối hoặc tương đối)"
+                },
+                "start_line": {
+                    "type": "integer",
+                    "description": "Dòng bắt đầu (1-based, optional)"
+                },
+                "end_line": {
+                    "type": "integer",
+                    "description": "Dòng kết thúc, tính cả dòng này (optional)"
+                },
+                "offset": {
+                    "type": "integer",
+                    "description": "Byte offset bắt đầu (optional, dùng next_offset của lần đọc trước)"
+                },
+                "length": {
+                    "type": "integer",
+                    "description": "Số byte cần đọc từ offset (optional)"
                 }
             },
             "required": ["file_path"]
@@ -353,7 +424,7 @@ FUNCTION_DECLARATIONS = [
     },
     {
         "name": "update_file",
-        "description": "Cập nhật nội dung file. HỆ THỐNG SẼ TỰ ĐỘNG XÁC NHẬN - GỌI NGAY LẬP TỨC!",
+        "description": "Cập nhật nội dung file. Sửa vài chỗ trong file có sẵn thì dùng mode 'patch' (chỉ gửi các khối thay đổi, không gửi lại cả file). HỆ THỐNG SẼ TỰ ĐỘNG XÁC NHẬN - GỌI NGAY LẬP TỨC!",
         "parameters": {
             "type": "object",
             "properties": {
@@ -363,12 +434,12 @@ FUNCTION_DECLARATIONS = [
                 },
                 "content": {
                     "type": "string",
-                    "description": "Nội dung mới"
+                    "description": "Nội dung mới. Mode 'patch': một hoặc nhiều khối '<<<<<<< SEARCH\\n<các dòng y hệt trong file>\\n=======\\n<các dòng mới>\\n>>>>>>> REPLACE' (SEARCH phải khớp đúng một chỗ), hoặc các hunk unified diff '@@ -a,b +c,d @@'"
                 },
                 "mode": {
                     "type": "string",
-                    "description": "Mode: 'overwrite' (ghi đè) hoặc 'append' (thêm vào cuối)",
-                    "enum": ["overwrite", "append"]
+                    "description": "Mode: 'overwrite' (ghi đè), 'append' (thêm vào cuối) hoặc 'patch' (chỉ sửa các khối trong content)",
+                    "enum": ["overwrite", "append", "patch"]
                 }
             },
             "required": ["file_path", "content"]
@@ -451,6 +522,77 @@ FUNCTION_DECLARATIONS = [
             "required": ["name_pattern"]
         }
     },
+    {
+        "name": "grep_files",
+        "description": "Tìm nội dung (text/code) trong các file của thư mục, đệ quy, bỏ qua file binary và file trong .gitignore. Trả về path, số dòng và dòng khớp. Dùng thay cho việc read_file từng file để tìm code.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "pattern": {
+                    "type": "string",
+                    "description": "Chuỗi cần tìm (mặc định tìm nguyên văn; regex='true' để dùng regex)"
+                },
+                "dir_path": {
+                    "type": "string",
+                    "description": "Thư mục tìm kiếm (mặc định là thư mục hiện tại)"
+                },
+                "name_pattern": {
+                    "type": "string",
+                    "description": "Chỉ tìm trong file có tên khớp pattern (ví dụ: '*.py'). Mặc định '*'"
+                },
+                "regex": {
+                    "type": "string",
+                    "description": "'true' nếu pattern là regex (Python re), mặc định 'false'",
+                    "enum": ["true", "false"]
+                },
+                "case_sensitive": {
+                    "type": "string",
+                    "description": "'false' để không phân biệt hoa thường, mặc định 'true'",
+                    "enum": ["true", "false"]
+                },
+                "max_results": {
+                    "type": "integer",
+                    "description": "Số dòng khớp tối đa (mặc định 200)"
+                }
+            },
+            "required": ["pattern"]
+        }
+    },
+    {
+        "name": "list_symbols",
+        "description": "Outline của file code (.py, .sh, .js, .ts): các function, class, method kèm dòng bắt đầu/kết thúc và dòng khai báo. path là thư mục thì trả về outline của các file code bên trong (đệ quy). Dùng trước read_symbol thay cho read_file cả file lớn.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "path": {
+                    "type": "string",
+                    "description": "Đường dẫn file hoặc thư mục (mặc định là thư mục hiện tại)"
+                },
+                "query": {
+                    "type": "string",
+                    "description": "Chỉ lấy symbol có tên chứa chuỗi này (không phân biệt hoa thường)"
+                }
+            }
+        }
+    },
+    {
+        "name": "read_symbol",
+        "description": "Đọc đúng code của một function/class/method trong file (không đọc cả file). Tên lấy từ list_symbols, method viết dạng 'Class.method'.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "file_path": {
+                    "type": "string",
+                    "description": "Đường dẫn file"
+                },
+                "name": {
+                    "type": "string",
+                    "description": "Tên symbol, ví dụ 'load_env' hoặc 'FileIndex.listing'"
+                }
+            },
+            "required": ["file_path", "name"]
+        }
+    },
     {
         "name": "shell",
         "description": "Thực thi lệnh shell hoặc chạy script. CHÚ Ý: Dùng công cụ tương ứng để chạy script. File .py/.js/.rb PHẢI dùng action='command' với interpreter (python3/node/ruby), KHÔNG dùng action='file'!",
@@ -487,84 +629,17 @@ FUNCTION_DECLARATIONS = [
 # Debug mode
 DEBUG = os.environ.get('DEBUG', '').lower() in ('true', '1', 'yes')
 
+# Streaming mode: render câu trả lời ngay khi nhận từng chunk (MOIBASH_STREAM=1 trong .env)
+STREAM_MODE = os.environ.get('MOIBASH_STREAM', '').lower() in ('true', '1', 'yes')
+
+# Gemini context caching: upload system instruction + tool schema một lần (MOIBASH_GEMINI_CACHE=0 để tắt)
+CONTEXT_CACHE_ENABLED = os.environ.get('MOIBASH_GEMINI_CACHE', '1').lower() not in ('0', 'false', 'no')
+
 def debug_print(*args, **kwargs):
     """Print debug messages to stderr"""
     if DEBUG:
         print("[DEBUG]", *args, file=sys.stderr, **kwargs)
 
-def format_markdown(text: str) -> str:
-    """
-    Format markdown text for terminal display (simple inline formatting)
-    Handles: **bold**, *italic*, `code`, but NOT multi-line structures
-    """
-    if not text:
-        return text
-    import re
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    lines = text.split('\n')
-    formatted_lines = []
-    in_code_block = False
-    code_lang = ""
-    for line in lines:
-        # Code block start/end
-        code_block_match = re.match(r'^```(\w*)', line)
-        if code_block_match:
-            if not in_code_block:
-                in_code_block = True
-                code_lang = code_block_match.group(1)
-                if code_lang:
-                    formatted_lines.append(f"{CYAN}{BOLD}┌─ Code: {code_lang}{RESET}")
-                else:
-                    formatted_lines.append(f"{CYAN}{BOLD}┌─ Code{RESET}")
-            else:
-                in_code_block = False
-                formatted_lines.append(f"{CYAN}{BOLD}└─{RESET}")
-            continue
-        if in_code_block:
-            formatted_lines.append(f"{CYAN}│{RESET} {GRAY}{line}{RESET}")
-            continue
-        # Headings
-        m3 = re.match(r'^###\s+(.+)$', line)
-        m2 = re.match(r'^##\s+(.+)$', line)
-        m1 = re.match(r'^#\s+(.+)$', line)
-        if m3:
-            formatted_lines.append(f"{YELLOW}{BOLD}{m3.group(1)}{RESET}")
-            continue
-        elif m2:
-            formatted_lines.append(f"{CYAN}{BOLD}{m2.group(1)}{RESET}")
-            continue
-        elif m1:
-            formatted_lines.append(f"{BLUE}{BOLD}{m1.group(1)}{RESET}")
-            continue
-        # Bullet lists
-        bullet_match = re.match(r'^([ \t]*)[-\*][ \t](.+)$', line)
-        if bullet_match:
-            indent = bullet_match.group(1)
-            item = bullet_match.group(2)
-            item = re.sub(r'`([^`]*)`', f'{GRAY}\\1{RESET}', item)
-            item = re.sub(r'\*\*([^*]+)\*\*', f'{BOLD}\\1{RESET}', item)
-            item = re.sub(r'(?<!\*)\*([^*]+)\*(?!\*)', f'\033[3m\\1{RESET}', item)
-            formatted_lines.append(f"{indent}{GREEN}●{RESET} {item}")
-            continue
-        # Numbered lists
-        num_match = re.match(r'^([ \t]*)([0-9]+)\.\s+(.+)$', line)
-        if num_match:
-            indent = num_match.group(1)
-            number = num_match.group(2)
-            item = num_match.group(3)
-            item = re.sub(r'`([^`]*)`', f'{GRAY}\\1{RESET}', item)
-            item = re.sub(r'\*\*([^*]+)\*\*', f'{BOLD}\\1{RESET}', item)
-            item = re.sub(r'(?<!\*)\*([^*]+)\*(?!\*)', f'\033[3m\\1{RESET}', item)
-            formatted_lines.append(f"{indent}{CYAN}{number}.{RESET} {item}")
-            continue
-        # Inline formatting for regular lines
-        line = re.sub(r'\*\*([^*]+)\*\*', f'{BOLD}\\1{RESET}', line)
-        line = re.sub(r'(?<!\*)\*([^*]+)\*(?!\*)', f'\033[3m\\1{RESET}', line)
-        line = re.sub(r'`([^`]*)`', f'{GRAY}\\1{RESET}', line)
-        formatted_lines.append(line)
-    return '\n'.join(formatted_lines)
-
-
 # ===== UI/ANSI helpers =====
 # ANSI color/style codes
 RESET = "\033[0m"
@@ -599,6 +674,9 @@ def color_for_func(func_name: str) -> str:
         "rename_file": MAGENTA,
         "list_files": BLUE,
         "search_files": BLUE,
+        "grep_files": BLUE,
+        "list_symbols": BLUE,
+        "read_symbol": CYAN,
         "shell": GRAY,
         "execute_file": GRAY,
         "run_command": GRAY,
@@ -655,47 +733,34 @@ def sanitize_for_display(text: str, max_length: int = 100) -> str:
     
     return text
 
-def load_chat_history() -> List[Dict]:
-    """Load chat history from main chat history file (text format)"""
-    if not HISTORY_FILE or not HISTORY_FILE.exists():
-        debug_print(f"History file not found: {HISTORY_FILE}")
+# Lần parse gần nhất: (path, mtime_ns, size) → history (agent_server pre-warm dùng lại)
+_HISTORY_CACHE = {"key": None, "history": []}
+
+def load_chat_history(history_file: Optional[Path] = None, query: str = "") -> List[Dict]:
+    """
+    Load the main chat history to send with query: the last messages plus the
+    past turns relevant to query (history_search.py), or the last
+    MAX_HISTORY_MESSAGES pairs without a query
+    """
+    history_file = history_file or HISTORY_FILE
+    if not history_file or not history_file.exists():
+        debug_print(f"History file not found: {history_file}")
         return []
     
     try:
-        with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-            if not content:
-                debug_print("History file is empty")
-                return []
-            
-            # Parse text format: [HH:MM:SS] ROLE: message
-            history = []
-            for line in content.splitlines():
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Parse: [HH:MM:SS] USER: message
-                if ' USER: ' in line:
-                    msg = line.split(' USER: ', 1)[1]
-                    history.append({
-                        "role": "user",
-                        "parts": [{"text": msg}]
-                    })
-                # Parse: [HH:MM:SS] moiBash: message
-                elif ' moiBash: ' in line:
-                    msg = line.split(' moiBash: ', 1)[1]
-                    history.append({
-                        "role": "model",
-                        "parts": [{"text": msg}]
-                    })
-            
-            # Keep only last MAX_HISTORY_MESSAGES pairs
-            if len(history) > MAX_HISTORY_MESSAGES * 2:
-                history = history[-(MAX_HISTORY_MESSAGES * 2):]
-            
-            debug_print(f"Loaded {len(history)} messages from history")
-            return history
+        stat = history_file.stat()
+        cache_key = (str(history_file), stat.st_mtime_ns, stat.st_size, query)
+        if _HISTORY_CACHE["key"] == cache_key:
+            debug_print("History file unchanged, reusing parsed history")
+            return [dict(msg, parts=[dict(p) for p in msg["parts"]]) for msg in _HISTORY_CACHE["history"]]
+        
+        # Chỉ quét/index phần mới append từ lần đọc trước
+        history = relevant_history(history_file, query, MAX_HISTORY_MESSAGES * 2)
+        
+        debug_print(f"Loaded {len(history)} messages from history")
+        _HISTORY_CACHE["key"] = cache_key
+        _HISTORY_CACHE["history"] = [dict(msg, parts=[dict(p) for p in msg["parts"]]) for msg in history]
+        return history
                 
     except Exception as e:
         debug_print(f"Error loading history: {e}")
@@ -803,6 +868,10 @@ def print_read_file(file_path: str, result: Dict[str, Any]):
             content_lines = content.splitlines()
             num_lines = len(content_lines)
             display = f"{GREEN}✓{RESET} {CYAN}{BOLD}Read {num_lines} line(s){RESET}  {WHITE}{filename}{RESET}"
+            if "start_line" in result:
+                display += f" (lines {result['start_line']}-{result.get('end_line', '?')})"
+            elif "file_size" in result:
+                display += f" (bytes {result.get('offset', 0):,}-{result.get('end_offset', 0):,} / {result['file_size']:,})"
         else:
             display = f"{RED}✗{RESET} {CYAN}{BOLD}Read failed{RESET}  {WHITE}{filename}{RESET}"
     elif isinstance(result, dict) and "error" in result:
@@ -829,6 +898,9 @@ def print_tool_call(func_name: str, args: Dict[str, Any], result: Optional[Dict[
         "rename_file": "[RENAME]",
         "list_files": "[LIST]",
         "search_files": "[SEARCH]",
+        "grep_files": "[GREP]",
+        "list_symbols": "[OUTLINE]",
+        "read_symbol": "[READ]",
         "shell": "[SHELL]",
         "execute_file": "[EXEC]",
         "run_command": "[RUN]"
@@ -854,6 +926,16 @@ def print_tool_call(func_name: str, args: Dict[str, Any], result: Optional[Dict[
         pattern = args.get("name_pattern", "*")
         dir_path = args.get("dir_path", ".")
         display = f"{prefix} '{pattern}' in {dir_path}"
+    elif func_name == "grep_files":
+        display = f"{prefix} '{args.get('pattern', '')}' in {args.get('dir_path', '.')}"
+        if args.get("name_pattern", "*") not in ("", "*"):
+            display += f" ({args['name_pattern']})"
+    elif func_name == "list_symbols":
+        display = f"{prefix} {args.get('path', '.')}"
+        if args.get("query"):
+            display += f" (query: {args['query']})"
+    elif func_name == "read_symbol":
+        display = f"{prefix} {args.get('name', '')} in {os.path.basename(args.get('file_path', ''))}"
     elif func_name == "rename_file":
         display = f"{prefix} {args.get('old_path', '')} → {args.get('new_path', '')}"
     elif func_name == "read_file":
@@ -918,6 +1000,45 @@ def print_tool_result(func_name: str, result: Dict[str, Any]):
                 lines.append(f"  ... (+{len(files)-len(preview)} more)")
         else:
             lines.append(str(result))
+    # Grep results
+    elif func_name == "grep_files" and isinstance(result, dict):
+        matches = result.get("matches", [])
+        files = len({m.get("path") for m in matches})
+        lines.append(f"{CYAN}{BOLD}Found {len(matches)} match(es) in {files} file(s){RESET}"
+                     f" ({result.get('files_scanned', 0)} files scanned)")
+        lines.append("")
+        for match in matches[:5]:
+            display = f"{match.get('path', '')}:{match.get('line', '')}: {match.get('text', '')}"
+            if len(display) > BORDER_WIDTH - 6:
+                display = display[:BORDER_WIDTH - 9] + "..."
+            lines.append(f"  - {WHITE}{display}{RESET}")
+        if len(matches) > 5:
+            lines.append(f"  ... (+{len(matches) - 5} more)")
+        if result.get("truncated"):
+            lines.append(f"{YELLOW}Note:{RESET} kết quả bị giới hạn (số dòng khớp hoặc dung lượng quét)")
+    # Outline results
+    elif func_name == "list_symbols" and isinstance(result, dict):
+        if "files" in result:
+            entries = [(f.get("path", ""), s) for f in result["files"] for s in f.get("symbols", [])]
+            lines.append(f"{CYAN}{BOLD}Found {len(entries)} symbol(s) in {len(result['files'])} file(s){RESET}")
+        else:
+            entries = [("", s) for s in result.get("symbols", [])]
+            lines.append(f"{CYAN}{BOLD}Found {len(entries)} symbol(s){RESET}")
+        lines.append("")
+        for path, symbol in entries[:8]:
+            display = f"{symbol.get('kind', '')} {symbol.get('name', '')} ({symbol.get('line')}-{symbol.get('end_line')})"
+            if path:
+                display = f"{os.path.basename(path)}: {display}"
+            if len(display) > BORDER_WIDTH - 6:
+                display = display[:BORDER_WIDTH - 9] + "..."
+            lines.append(f"  - {WHITE}{display}{RESET}")
+        if len(entries) > 8:
+            lines.append(f"  ... (+{len(entries) - 8} more)")
+    elif func_name == "read_symbol" and isinstance(result, dict):
+        lines.append(f"{CYAN}{BOLD}Read {result.get('kind', 'symbol')} {result.get('name', '')}{RESET}"
+                     f" (lines {result.get('start_line')}-{result.get('end_line')})")
+        if result.get("note"):
+            lines.append(f"{YELLOW}Note:{RESET} {result['note']}")
     # Read file result
     elif func_name == "read_file" and isinstance(result, dict):
         content = result.get("content", "")
@@ -1003,7 +1124,10 @@ def show_diff_preview(old_content: str, new_content: str, file_path: str) -> Non
         tofile=f"b/{file_path}",
         lineterm=''
     )
-    
+    print_diff(diff, file_path)
+
+def print_diff(diff, file_path: str) -> None:
+    """In các dòng unified diff với màu (tối đa 50 dòng)"""
     print(f"\n{BOLD}{CYAN}╭─ Diff Preview: {file_path}{RESET}", file=sys.stderr)
     
     line_count = 0
@@ -1072,7 +1196,11 @@ def get_confirmation(action: str, details: Dict[str, Any], is_batch: bool = Fals
         # Show diff preview if file exists and we have new content
         try:
             file_obj = Path(file_path)
-            if file_obj.exists() and file_obj.is_file():
+            if mode == "patch" and details.get("patch") is not None:
+                # Patch: chỉ hiện các đoạn bị sửa, không diff cả file
+                print_diff(details["patch"].diff(safe_path), safe_path)
+                lines.append(f"  Edits: {len(details['patch'].edits)}")
+            elif file_obj.exists() and file_obj.is_file():
                 old_content = file_obj.read_text()
                 
                 if mode == "overwrite":
@@ -1233,52 +1361,112 @@ def call_filesystem_script(script_name: str, *args) -> Dict[str, Any]:
         debug_print(f"Exception: {str(e)}")
         return {"error": str(e)}
 
+def call_filesystem_tool(script_name: str, *args) -> Dict[str, Any]:
+    """Run a filesystem tool in-process, falling back to its .sh script"""
+    # Tool không có script (grepfiles, listsymbols, readsymbol) luôn chạy in-process
+    use_native = USE_NATIVE_TOOLS or not (SCRIPT_DIR / f"{script_name}.sh").exists()
+    native = NATIVE_TOOLS.get(script_name) if use_native else None
+    if native is None:
+        return call_filesystem_script(script_name, *args)
+    
+    try:
+        debug_print(f"Native: {script_name}{args}")
+        return native(*[str(arg) for arg in args])
+    except Exception as e:
+        debug_print(f"Exception: {str(e)}")
+        return {"error": str(e)}
+
+def run_read_only_function(func_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute a read-only function without printing (safe to run in a worker thread)"""
+    if func_name == "read_file":
+        ranges = [args.get(key, "") for key in ("offset", "length", "start_line", "end_line")]
+        if any(value not in ("", None) for value in ranges):
+            # Đọc theo range chỉ có ở fs_tools (readfile.sh luôn đọc cả file)
+            return call_filesystem_tool("readfile", args.get("file_path", ""), *["" if value is None else value for value in ranges])
+        return call_filesystem_tool("readfile", args.get("file_path", ""))
+    if func_name == "list_symbols":
+        return call_filesystem_tool("listsymbols", args.get("path", "") or ".", args.get("query", ""))
+    if func_name == "read_symbol":
+        return call_filesystem_tool("readsymbol", args.get("file_path", ""), args.get("name", ""))
+    
+    dir_path = args.get("dir_path", ".")
+    resolved_dir, note = resolve_dir_path(dir_path)
+    recursive = args.get("recursive", "false")  # Default to false - search only current folder
+    if func_name == "grep_files":
+        result = call_filesystem_tool("grepfiles", resolved_dir, args.get("pattern", ""), args.get("name_pattern", "*"),
+                                      args.get("regex", "false"), args.get("case_sensitive", "true"),
+                                      args.get("max_results", ""))
+    elif func_name == "list_files":
+        result = call_filesystem_tool("listfiles", resolved_dir, args.get("pattern", "*"), recursive)
+    else:
+        result = call_filesystem_tool("searchfiles", resolved_dir, args.get("name_pattern", "*"), recursive)
+    if isinstance(result, dict) and note:
+        result["note"] = note
+    return result
+
+def print_read_only_result(func_name: str, args: Dict[str, Any], result: Dict[str, Any]):
+    """Show a read-only call and its result"""
+    if func_name == "read_file":
+        # Gộp action + result vào 1 box cho read_file
+        print_read_file(args.get("file_path", ""), result)
+    else:
+        print_tool_call(func_name, args)
+        print_tool_result(func_name, result)
+
 def handle_function_call(func_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
     """Handle function call with confirmation for dangerous operations"""
     debug_print(f"Function: {func_name}")
     debug_print(f"Args: {json.dumps(args, ensure_ascii=False)}")
     
+    # Các function chỉ đọc - KHÔNG cần confirmation, thực thi ngay và hiển thị kết quả
+    if func_name in READ_ONLY_FUNCTIONS:
+        result = run_read_only_function(func_name, args)
+        print_read_only_result(func_name, args, result)
+        debug_print(f"Result: {json.dumps(result, ensure_ascii=False)[:500]}")
+        return result
+    
     # BẮT BUỘC: LUÔN HIỆN TOOL HEADER TRƯỚC KHI THỰC THI (trừ read_file và delete_file)
     # Điều này giúp kiểm soát và theo dõi mọi function call
-    if func_name not in ("read_file", "delete_file"):
+    if func_name != "delete_file":
         print_tool_call(func_name, args)
     
     # Execute function
     result = None
     
-    # Các function KHÔNG cần confirmation - thực thi ngay và hiển thị kết quả
-    if func_name == "read_file":
+    # Các tool này có thể ghi đè file tại chỗ: backup nền (hardlink chung inode) phải lưu xong trước
+    if func_name in ("create_file", "shell", "execute_file", "run_command") and SESSION_STATE["backup_manager"]:
+        SESSION_STATE["backup_manager"].wait(deltas=False)
+    
+    # Functions cần confirmation - confirm sau đó thực thi và hiển thị result
+    if func_name == "create_file":
+        # Không cần confirmation cho create_file - thực thi ngay
         file_path = args.get("file_path", "")
-        result = call_filesystem_script("readfile", file_path)
-        # Gộp action + result vào 1 box cho read_file
-        print_read_file(file_path, result)
-        
-    elif func_name == "list_files":
-        dir_path = args.get("dir_path", ".")
-        resolved_dir, note = resolve_dir_path(dir_path)
-        pattern = args.get("pattern", "*")
-        recursive = args.get("recursive", "false")
-        result = call_filesystem_script("listfiles", resolved_dir, pattern, recursive)
-        if isinstance(result, dict) and note:
-            result["note"] = note
-        print_tool_result(func_name, result)
-        
-    elif func_name == "search_files":
-        dir_path = args.get("dir_path", ".")
-        name_pattern = args.get("name_pattern", "*")
-        recursive = args.get("recursive", "false")  # Default to false - search only current folder
-        resolved_dir, note = resolve_dir_path(dir_path)
-        result = call_filesystem_script("searchfiles", resolved_dir, name_pattern, recursive)
-        if isinstance(result, dict) and note:
-            result["note"] = note
+        content = args.get("content", "")
+        result = call_filesystem_tool("createfile", file_path, content)
         print_tool_result(func_name, result)
         
-    # Functions cần confirmation - confirm sau đó thực thi và hiển thị result
-    elif func_name == "create_file":
-        # Không cần confirmation cho create_file - thực thi ngay
+    elif func_name == "update_file" and args.get("mode") == "patch":
+        # Định vị patch trước khi hỏi: context không khớp thì trả lỗi cho model ngay
         file_path = args.get("file_path", "")
         content = args.get("content", "")
-        result = call_filesystem_script("createfile", file_path, content)
+        patch = None
+        if file_patch is not None and os.path.isfile(file_path):
+            try:
+                patch = file_patch.prepare(file_path, content)
+            except (ValueError, OSError) as e:
+                result = {"error": str(e), "exit_code": 1}
+                print_tool_result(func_name, result)
+                return result
+        
+        if not get_confirmation(func_name, {**args, "patch": patch}):
+            return {"error": "User cancelled", "cancelled": True}
+        
+        # Backup chỉ các đoạn bị sửa
+        backup_mgr = get_backup_manager()
+        if backup_mgr and patch is not None:
+            backup_mgr.backup_patch(file_path, patch.undo)
+        
+        result = call_filesystem_tool("patchfile", file_path, content)
         print_tool_result(func_name, result)
         
     elif func_name == "update_file":
@@ -1293,7 +1481,7 @@ def handle_function_call(func_name: str, args: Dict[str, Any]) -> Dict[str, Any]
         
         content = args.get("content", "")
         mode = args.get("mode", "overwrite")
-        result = call_filesystem_script("updatefile", file_path, content, mode)
+        result = call_filesystem_tool("updatefile", file_path, content, mode)
         print_tool_result(func_name, result)
         
     elif func_name == "delete_file":
@@ -1306,7 +1494,7 @@ def handle_function_call(func_name: str, args: Dict[str, Any]) -> Dict[str, Any]
         if backup_mgr and Path(file_path).exists():
             backup_mgr.backup_file(file_path, "delete")
         
-        result = call_filesystem_script("deletefile", file_path)
+        result = call_filesystem_tool("deletefile", file_path)
         # Gộp action + result vào 1 box cho delete_file
         print_delete_file(file_path, result)
         
@@ -1321,7 +1509,7 @@ def handle_function_call(func_name: str, args: Dict[str, Any]) -> Dict[str, Any]
         if backup_mgr and Path(old_path).exists():
             backup_mgr.backup_file(old_path, "rename", new_path=new_path)
         
-        result = call_filesystem_script("renamefile", old_path, new_path)
+        result = call_filesystem_tool("renamefile", old_path, new_path)
         print_tool_result(func_name, result)
         
     elif func_name == "shell":
@@ -1332,11 +1520,11 @@ def handle_function_call(func_name: str, args: Dict[str, Any]) -> Dict[str, Any]
         
         if action == "command":
             command = args.get("command", "")
-            result = call_filesystem_script("shell", "command", command, "", working_dir)
+            result = call_filesystem_tool("shell", "command", command, "", working_dir)
         elif action == "file":
             file_path = args.get("file_path", "")
             exec_args = args.get("args", "")
-            result = call_filesystem_script("shell", "file", file_path, exec_args, working_dir)
+            result = call_filesystem_tool("shell", "file", file_path, exec_args, working_dir)
         else:
             result = {"error": "Invalid action for shell. Use 'command' or 'file'."}
         print_tool_result(func_name, result)
@@ -1348,7 +1536,7 @@ def handle_function_call(func_name: str, args: Dict[str, Any]) -> Dict[str, Any]
         file_path = args.get("file_path", "")
         exec_args = args.get("args", "")
         working_dir = args.get("working_dir", "")
-        result = call_filesystem_script("shell", "file", file_path, exec_args, working_dir)
+        result = call_filesystem_tool("shell", "file", file_path, exec_args, working_dir)
         print_tool_result(func_name, result)
     
     elif func_name == "run_command":
@@ -1356,7 +1544,7 @@ def handle_function_call(func_name: str, args: Dict[str, Any]) -> Dict[str, Any]
             return {"error": "User cancelled", "cancelled": True}
         command = args.get("command", "")
         working_dir = args.get("working_dir", "")
-        result = call_filesystem_script("shell", "command", command, "", working_dir)
+        result = call_filesystem_tool("shell", "command", command, "", working_dir)
         print_tool_result(func_name, result)
     
     else:
@@ -1366,28 +1554,171 @@ def handle_function_call(func_name: str, args: Dict[str, Any]) -> Dict[str, Any]
     debug_print(f"Result: {json.dumps(result, ensure_ascii=False)[:500]}")
     return result
 
+def get_cached_content(api_key: str) -> Optional[str]:
+    """Name of the cachedContent holding system instruction + tools, or None"""
+    if not CONTEXT_CACHE_ENABLED:
+        return None
+    name = CONTEXT_CACHE.get_name(
+        get_system_instruction(),
+        [{"functionDeclarations": FUNCTION_DECLARATIONS}],
+        api_key
+    )
+    debug_print(f"Context cache: {name or 'unavailable, sending full prompt'}")
+    return name
+
+def execute_function_calls(calls: List[Dict], first_result: Optional[Dict] = None) -> List[Dict]:
+    """
+    Execute every functionCall of one model turn, returning results in call order
+    Consecutive read-only calls run concurrently; mutating calls run one at a
+    time, in order, with their usual confirmation
+    
+    Args:
+        calls: [{"name", "args"}, ...]
+        first_result: result of calls[0] if it already ran (streaming mode)
+    """
+    results = []
+    i = 0
+    if first_result is not None:
+        results.append(first_result)
+        i = 1
+    
+    while i < len(calls):
+        j = i
+        while j < len(calls) and calls[j]["name"] in READ_ONLY_FUNCTIONS:
+            j += 1
+        if j - i < 2:
+            results.append(handle_function_call(calls[i]["name"], calls[i]["args"]))
+            i += 1
+            continue
+        
+        batch = calls[i:j]
+        debug_print(f"Running {len(batch)} read-only calls in parallel")
+        with ThreadPoolExecutor(max_workers=min(TOOL_WORKERS, len(batch))) as pool:
+            batch_results = list(pool.map(lambda call: run_read_only_function(call["name"], call["args"]), batch))
+        # In theo đúng thứ tự call sau khi tất cả đã xong
+        for call, result in zip(batch, batch_results):
+            print_read_only_result(call["name"], call["args"], result)
+            debug_print(f"Result: {json.dumps(result, ensure_ascii=False)[:500]}")
+        results.extend(batch_results)
+        i = j
+    return results
+
+def build_payload(conversation: List[Dict], cached_content: Optional[str] = None,
+                  record: bool = True) -> Dict[str, Any]:
+    """Build generateContent payload for the conversation (record: see ConversationBudget.fit)"""
+    if cached_content:
+        # System instruction và tools đã nằm trong cache, API không cho gửi lại
+        payload = {
+            "contents": [],
+            "cachedContent": cached_content
+        }
+    else:
+        payload = {
+            "contents": [],
+            "tools": [{"functionDeclarations": FUNCTION_DECLARATIONS}],
+            "systemInstruction": {
+                "parts": [{"text": get_system_instruction()}]
+            }
+        }
+    # Gửi bản đã compact; phần còn lại của payload tính vào giới hạn kích thước request
+    payload["contents"] = BUDGET.fit(conversation, overhead=request_bytes(payload), record=record)
+    return payload
+
+def is_cache_rejected(error: Exception) -> bool:
+    """True if the API refused the request because of the cachedContent reference"""
+    response = getattr(error, "response", None)
+    if response is None or response.status_code not in (400, 403, 404):
+        return False
+    try:
+        body = response.text.lower()
+    except Exception:
+        return False
+    # 400/403/404 khác (payload sai, key hết quyền, model không tồn tại) không liên quan tới cache
+    return any(name in body for name in ("cachedcontent", "cached_content", "cached content"))
+
 def call_gemini_api(conversation: List[Dict], api_key: str) -> Optional[Dict]:
     """Call Gemini API with conversation history"""
-    payload = {
-        "contents": conversation,
-        "tools": [{"functionDeclarations": FUNCTION_DECLARATIONS}],
-        "systemInstruction": {
-            "parts": [{"text": get_system_instruction()}]
+    cached_content = get_cached_content(api_key)
+    result = None
+    while True:
+        try:
+            debug_print("Calling Gemini API...")
+            # Dùng session chung để tái sử dụng TCP/TLS connection giữa các vòng lặp
+            response = get_session().post(
+                GEMINI_API_URL,
+                params={"key": api_key},
+                json=build_payload(conversation, cached_content, record=False),
+                timeout=30
+            )
+            response.raise_for_status()
+            result = response.json()
+        except Exception as e:
+            debug_print(f"API Error: {str(e)}")
+            if cached_content and is_cache_rejected(e):
+                # Cache bị xóa/hết hạn sớm: quên nó và gửi lại prompt đầy đủ (một lần)
+                CONTEXT_CACHE.invalidate(cached_content)
+                cached_content = None
+                continue
+        break
+    # Chỉ ghi log budget cho request cuối cùng thực sự được gửi
+    BUDGET.record_last()
+    return result
+
+def call_gemini_api_stream(conversation: List[Dict], api_key: str) -> tuple:
+    """
+    Streaming variant of call_gemini_api()
+    Text is rendered to the terminal while it arrives, and the first functionCall
+    is executed as soon as it shows up in the stream.
+    Returns: (aggregated_response, executed) - executed is None or
+             {"name", "args", "result"} of the call that already ran
+    """
+    printer = StreamPrinter(on_start=stop_spinner)
+    executed = None
+    
+    def on_function_call(part: Dict):
+        nonlocal executed
+        if executed is not None:
+            return
+        # Hoàn tất dòng comment đang dở trước khi in tool box
+        printer.flush()
+        func_call = part["functionCall"]
+        func_name = func_call.get("name", "")
+        func_args = func_call.get("args", {})
+        executed = {
+            "name": func_name,
+            "args": func_args,
+            "result": handle_function_call(func_name, func_args)
         }
-    }
     
-    try:
-        debug_print("Calling Gemini API...")
-        response = requests.post(
-            f"{GEMINI_API_URL}?key={api_key}",
-            json=payload,
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        debug_print(f"API Error: {str(e)}")
-        return None
+    cached_content = get_cached_content(api_key)
+    response = None
+    while True:
+        try:
+            debug_print("Calling Gemini API (stream)...")
+            response = stream_generate_content(
+                GEMINI_STREAM_URL,
+                build_payload(conversation, cached_content, record=False),
+                api_key,
+                on_text=printer.write,
+                on_function_call=on_function_call
+            )
+        except Exception as e:
+            debug_print(f"API Error: {str(e)}")
+            if cached_content and is_cache_rejected(e):
+                # Lỗi HTTP xảy ra trước khi stream bắt đầu, chưa có gì được in ra
+                CONTEXT_CACHE.invalidate(cached_content)
+                cached_content = None
+                continue
+        break
+    BUDGET.record_last()
+    printer.flush()
+    return response, executed
+
+def append_history_message(text: str):
+    """Append a moiBash message to the shared chat history file"""
+    if not HISTORY_FILE:
+        return
+    ChatHistory(HISTORY_FILE).append("model", text)
 
 def parse_response(response: Dict) -> tuple:
     """
@@ -1424,21 +1755,20 @@ def parse_response(response: Dict) -> tuple:
     parts = content.get("parts", [])
     
     # Collect both function calls and text
-    func_call = None
+    calls = []
     text_content = None
     
     for part in parts:
         if "functionCall" in part:
             func_call = part["functionCall"]
+            calls.append({"name": func_call.get("name", ""), "args": func_call.get("args", {})})
         if "text" in part:
             text_content = part["text"]
     
     # Priority: Function call (with optional text comment)
-    if func_call:
-        func_name = func_call.get("name", "")
-        func_args = func_call.get("args", {})
-        # Return function call, with text as extra info
-        return ("FUNCTION_CALL", func_name, {"args": func_args, "comment": text_content})
+    if calls:
+        # value/args là call đầu tiên; "calls" chứa tất cả theo thứ tự model trả về
+        return ("FUNCTION_CALL", calls[0]["name"], {"args": calls[0]["args"], "comment": text_content, "calls": calls})
     
     # Pure text response (final response)
     if text_content:
@@ -1469,7 +1799,7 @@ def main():
             sys.exit(1)
         
         # Load chat history for context
-        chat_history = load_chat_history()
+        chat_history = load_chat_history(query=user_message)
         debug_print(f"Loaded {len(chat_history)} messages from history")
         
         # Initialize conversation with history + new message
@@ -1480,15 +1810,31 @@ def main():
             }
         ]
         
+        BUDGET.reset(pinned=len(chat_history))
+        
         # Multi-turn conversation loop
         tool_calls_made = 0
         
         while tool_calls_made < MAX_ITERATIONS:
             # Call Gemini API
-            response = call_gemini_api(conversation, api_key)
+            executed = None
+            if STREAM_MODE:
+                response, executed = call_gemini_api_stream(conversation, api_key)
+            else:
+                response = call_gemini_api(conversation, api_key)
             
             # Parse response
             response_type, value, extra = parse_response(response)
+            if executed:
+                # Function call đầu tiên đã chạy ngay khi xuất hiện trong stream
+                comment = extra.get("comment") if isinstance(extra, dict) else None
+                calls = extra.get("calls") if response_type == "FUNCTION_CALL" else None
+                response_type, value = "FUNCTION_CALL", executed["name"]
+                extra = {
+                    "args": executed["args"],
+                    "comment": comment,
+                    "calls": calls or [{"name": executed["name"], "args": executed["args"]}]
+                }
             debug_print(f"Response type: {response_type}")
             
             # Special handling: if NO_RESPONSE after a function call, provide fallback message
@@ -1504,6 +1850,12 @@ def main():
                     if isinstance(func_result, dict):
                         if "error" in func_result:
                             fallback_msg = f"Đã xảy ra lỗi: {func_result['error']}"
+                        elif func_name == "grep_files":
+                            fallback_msg = f"Tìm thấy {func_result.get('count', 0)} dòng khớp."
+                        elif func_name == "list_symbols":
+                            fallback_msg = f"Tìm thấy {func_result.get('count', 0)} symbol."
+                        elif func_name == "read_symbol":
+                            fallback_msg = "Đã đọc code thành công."
                         elif func_name in ("list_files", "search_files"):
                             files = func_result.get("files", [])
                             fallback_msg = f"Tìm thấy {len(files)} file/thư mục."
@@ -1524,58 +1876,58 @@ def main():
                     sys.exit(0)
             
             if response_type == "FUNCTION_CALL":
-                tool_calls_made += 1
                 func_name = value
                 extra_data = extra
                 func_args = extra_data.get("args", {})
                 comment = extra_data.get("comment")
+                calls = extra_data.get("calls") or [{"name": func_name, "args": func_args}]
+                tool_calls_made += len(calls)
                 
                 # Print AI comment if exists (nhận xét giữa chừng)
                 # Format markdown và in ra stderr với flush để hiển thị ngay
-                if comment:
+                if comment and STREAM_MODE:
+                    # Comment đã được render trong lúc stream
+                    comment = comment.strip()
+                    append_history_message(comment)
+                elif comment:
                     stop_spinner()
                     comment = comment.strip()
                     formatted_comment = format_markdown(comment)
                     print(f"\n{CYAN}{formatted_comment}{RESET}\n", file=sys.stderr, flush=True)
                     # Save to chat history as moiBash message
-                    if HISTORY_FILE:
-                        from datetime import datetime
-                        timestamp = datetime.now().strftime('%H:%M:%S')
-                        import re
-                        clean_comment = re.sub(r'\x1b\[[0-9;]*m', '', formatted_comment)
-                        with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
-                            f.write(f'[{timestamp}] moiBash: {clean_comment}\n')
+                    append_history_message(strip_ansi(formatted_comment))
                 
-                # Execute function (với confirmation nếu cần)
-                func_result = handle_function_call(func_name, func_args)
+                # Execute functions (với confirmation nếu cần)
+                func_results = execute_function_calls(calls, executed["result"] if executed else None)
                 
-                # Add model response with function call to conversation
+                # Add model response with function calls to conversation
                 # Include comment (text) if present
                 model_parts = []
                 if comment:
                     model_parts.append({"text": comment})
-                model_parts.append({
-                    "functionCall": {
-                        "name": func_name,
-                        "args": func_args
-                    }
-                })
+                for call in calls:
+                    model_parts.append({
+                        "functionCall": {
+                            "name": call["name"],
+                            "args": call["args"]
+                        }
+                    })
                 conversation.append({
                     "role": "model",
                     "parts": model_parts
                 })
                 
-                # Add function response to conversation
+                # Add all function responses to conversation in one turn
                 conversation.append({
                     "role": "function",
                     "parts": [{
                         "functionResponse": {
-                            "name": func_name,
+                            "name": call["name"],
                             "response": {
                                 "content": func_result
                             }
                         }
-                    }]
+                    } for call, func_result in zip(calls, func_results)]
                 })
                 
                 # Continue loop for Gemini to process function response
@@ -1584,7 +1936,11 @@ def main():
             elif response_type == "TEXT":
                 # Final response from Gemini
                 stop_spinner()
-                print(value)
+                if STREAM_MODE:
+                    # Đã hiển thị trên terminal khi stream → chỉ lưu lịch sử, stdout để trống
+                    append_history_message(value)
+                else:
+                    print(value)
                 
                 # Save chat history (DISABLED - not needed without context memory)
                 # new_messages = conversation[len(chat_history):]
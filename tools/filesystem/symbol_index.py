@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+symbol_index.py - Outline (functions, classes, methods and their line ranges) of source files
+Reading a big file to look at one function sends thousands of unrelated lines
+to the model. list_symbols returns the outline of a file and read_symbol only
+the lines of one symbol (fs_tools.py). Outlines come from:
+- Python: ast (decorators included); an indentation scan if the file does not parse
+- shell (.sh/.bash/.zsh or a sh/bash shebang): `name() {` and `function name`
+- JavaScript/TypeScript: function and class declarations, `const name = (...) =>`
+  or `= function`, class methods and arrow-function fields
+For shell and JavaScript, strings, comments, template/regex literals and
+heredocs are blanked first; the end of a symbol is the brace matching its first
+`{`. Bodies of functions are not descended into (nested helpers are part of
+their function), class bodies are.
+Outlines are cached per file and parsed again when its mtime or size changes.
+"""
+
+import os
+import re
+import ast
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Số file giữ outline trong bộ nhớ
+MAX_FILES = 256
+# File lớn hơn mức này không được phân tích
+MAX_FILE_BYTES = 16 * 1024 * 1024
+SIGNATURE_CHARS = 160
+
+LANGUAGES = {
+    ".py": "python", ".pyw": "python",
+    ".sh": "shell", ".bash": "shell", ".zsh": "shell",
+    ".js": "javascript", ".mjs": "javascript", ".cjs": "javascript", ".jsx": "javascript",
+    ".ts": "javascript", ".tsx": "javascript", ".mts": "javascript", ".cts": "javascript",
+}
+
+JS_KEYWORDS = frozenset(("if", "for", "while", "switch", "catch", "with", "function", "return", "typeof",
+                         "new", "do", "else", "try", "finally", "super", "await", "yield", "delete", "void"))
+
+SHELL_FUNCTION = re.compile(r"^[ \t]*(?:function[ \t]+([\w:.+-]+)[ \t]*(?:\([ \t]*\))?|([\w:.+-]+)[ \t]*\([ \t]*\))[ \t]*(?:\{|\(|$)")
+JS_FUNCTION = re.compile(r"^[ \t]*(?:export[ \t]+(?:default[ \t]+)?)?(?:declare[ \t]+)?(?:async[ \t]+)?function\b[ \t]*\*?[ \t]*([\w$]+)")
+JS_CLASS = re.compile(r"^[ \t]*(?:export[ \t]+(?:default[ \t]+)?)?(?:declare[ \t]+)?(?:abstract[ \t]+)?class[ \t]+([\w$]+)")
+JS_VARIABLE = re.compile(r"^[ \t]*(?:export[ \t]+)?(?:const|let|var)[ \t]+([\w$]+)[^=\n]*=[ \t]*(?:async\b[ \t]*)?"
+                         r"(?:function\b|\([^()\n]*(?:\([^()\n]*\)[^()\n]*)*\)[^=\n]*=>|[\w$]+[ \t]*=>|class\b)")
+JS_METHOD = re.compile(r"^[ \t]*(?:(?:public|private|protected|static|readonly|override|abstract|async|get|set)[ \t]+)*"
+                       r"\*?[ \t]*(#?[\w$]+)[ \t]*(?:<[^>\n]*>)?[ \t]*\(")
+JS_FIELD = re.compile(r"^[ \t]*(?:(?:public|private|protected|static|readonly)[ \t]+)*(#?[\w$]+)[^=\n(]*=[ \t]*(?:async\b[ \t]*)?"
+                      r"(?:function\b|\([^()\n]*\)[^=\n]*=>|[\w$]+[ \t]*=>)")
+
+# Dòng kết thúc / dòng sau bắt đầu như thế này thì câu lệnh khai báo còn tiếp
+CONTINUED = ("=>", "=", ",", ":", "?", "||", "&&", "+", "-", "*", "/", ".")
+CONTINUING = ("{", "?", ":", ".", "||", "&&", "+", "-", "*", "/", "=>")
+
+# Sau các từ khóa này "/" mở một regex literal (return /}/.test(a)), không phải phép chia
+JS_REGEX_KEYWORDS = ("return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void",
+                     "throw", "instanceof", "yield", "await")
+# Chuỗi, comment, template literal, regex literal (sau toán tử/dấu mở/từ khóa) và escape
+JS_MASKED = re.compile(
+    r"//[^\n]*|/\*.*?\*/|\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`"
+    r"|(?:(?<=[(,=:\[!&|?{};])|(?<=^)" + "".join(rf"|(?<=(?<![\w$.]){word})" for word in JS_REGEX_KEYWORDS) + ")"
+    r"[ \t]*/(?![/*])(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/",
+    re.S | re.M)
+SHELL_MASKED = re.compile(
+    r"\$'(?:\\.|[^'\\])*'|'[^']*'|\"(?:\\.|[^\"\\])*\"|(?:(?<=[\s;|&(])|(?<=^))#[^\n]*|\\.",
+    re.S | re.M)
+HEREDOC = re.compile(r"(?<!<)<<(-?)[ \t]*(['\"]?)([A-Za-z_][\w]*)\2")
+
+_CACHE: "OrderedDict[str, Tuple[Tuple[int, int], str, List[Dict[str, Any]]]]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def language(path: str, head: bytes = b"") -> Optional[str]:
+    """Language of a file from its extension or shebang, None if unsupported"""
+    lang = LANGUAGES.get(os.path.splitext(path)[1].lower())
+    if lang is None and head.startswith(b"#!"):
+        shebang = head.split(b"\n", 1)[0]
+        if re.search(rb"\b(?:ba|z|k|da)?sh\b", shebang):
+            return "shell"
+        if b"python" in shebang:
+            return "python"
+        if b"node" in shebang:
+            return "javascript"
+    return lang
+
+
+def _symbol(lines: List[str], name: str, kind: str, line: int, end_line: int, decl_line: int) -> Dict[str, Any]:
+    signature = lines[decl_line - 1].strip() if decl_line <= len(lines) else ""
+    return {"name": name, "kind": kind, "line": line, "end_line": max(end_line, line),
+            "signature": signature[:SIGNATURE_CHARS]}
+
+
+def _python_symbols(text: str, lines: List[str]) -> List[Dict[str, Any]]:
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return _indent_symbols(lines)
+    symbols = []
+
+    def visit(body, prefix: str, in_class: bool):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+                if isinstance(node, ast.ClassDef):
+                    kind = "class"
+                else:
+                    kind = "method" if in_class else "function"
+                name = prefix + node.name
+                symbols.append(_symbol(lines, name, kind, start, node.end_lineno, node.lineno))
+                if isinstance(node, ast.ClassDef):
+                    visit(node.body, name + ".", True)
+            elif isinstance(node, (ast.If, ast.Try, ast.With)) or type(node).__name__ == "TryStar":
+                # def trong if TYPE_CHECKING / try-except import
+                for field in ("body", "orelse", "finalbody"):
+                    visit(getattr(node, field, []), prefix, in_class)
+                for handler in getattr(node, "handlers", []):
+                    visit(handler.body, prefix, in_class)
+
+    visit(tree.body, "", False)
+    return symbols
+
+
+def _indent_symbols(lines: List[str]) -> List[Dict[str, Any]]:
+    """Python that does not parse: def/class lines, a block ends at the next line indented as much or less"""
+    pattern = re.compile(r"^([ \t]*)(async[ \t]+def|def|class)[ \t]+(\w+)")
+    symbols = []
+    classes: List[Tuple[int, str]] = []
+    skip_below = None
+    for i, line in enumerate(lines):
+        match = pattern.match(line)
+        if match is None:
+            continue
+        indent = len(match.group(1).expandtabs())
+        if skip_below is not None and indent > skip_below[0] and i < skip_below[1]:
+            continue
+        end = i + 1
+        for j in range(i + 1, len(lines)):
+            stripped = lines[j].strip()
+            if stripped and not stripped.startswith("#"):
+                if len(lines[j]) - len(lines[j].lstrip()) <= indent:
+                    break
+                end = j + 1
+        while classes and classes[-1][0] >= indent:
+            classes.pop()
+        prefix = classes[-1][1] + "." if classes else ""
+        keyword = match.group(2)
+        if keyword == "class":
+            classes.append((indent, prefix + match.group(3)))
+            symbols.append(_symbol(lines, prefix + match.group(3), "class", i + 1, end, i + 1))
+        else:
+            symbols.append(_symbol(lines, prefix + match.group(3), "method" if classes else "function", i + 1, end, i + 1))
+            skip_below = (indent, end)
+    return symbols
+
+
+def _blank(match: re.Match) -> str:
+    """Same text with everything but newlines replaced by spaces (line/column positions kept)"""
+    return re.sub(r"[^\n]", " ", match.group())
+
+
+def _mask_heredocs(lines: List[str]) -> List[str]:
+    result = []
+    terminator = None
+    for line in lines:
+        if terminator is not None:
+            result.append("")
+            if (line.lstrip("\t") if terminator[0] else line) == terminator[1]:
+                terminator = None
+            continue
+        result.append(line)
+        if not line.lstrip().startswith("#"):
+            match = HEREDOC.search(line)
+            if match:
+                terminator = (bool(match.group(1)), match.group(3))
+    return result
+
+
+def _braces(masked: List[str]) -> Tuple[Dict[Tuple[int, int], int], List[int]]:
+    """({(line, col) of each "{": line of its "}"}, brace depth at the start of each line), 0-based"""
+    stack: List[Tuple[int, int]] = []
+    closes: Dict[Tuple[int, int], int] = {}
+    depth = []
+    for i, line in enumerate(masked):
+        depth.append(len(stack))
+        for match in re.finditer(r"[{}]", line):
+            if match.group() == "{":
+                stack.append((i, match.start()))
+            elif stack:
+                closes[stack.pop()] = i
+    # Không đóng (file lỗi cú pháp): kéo tới cuối file
+    for position in stack:
+        closes[position] = len(masked) - 1
+    return closes, depth
+
+
+def _block_end(masked: List[str], closes: Dict[Tuple[int, int], int], line: int, column: int) -> Tuple[int, Optional[int]]:
+    """
+    (last line, line of its "{") of the declaration whose name ends at
+    line/column, 0-based: the first brace outside parentheses, unless the
+    statement ends first (";" or a line that cannot continue)
+    """
+    parens = 0
+    for i in range(line, min(line + 20, len(masked))):
+        text = masked[i]
+        if i > line and parens <= 0 and not text.strip():
+            return i - 1, None
+        for j in range(column if i == line else 0, len(text)):
+            char = text[j]
+            if char in "([":
+                parens += 1
+            elif char in ")]":
+                parens -= 1
+            elif parens <= 0 and char == "{":
+                return closes.get((i, j), i), i
+            elif parens <= 0 and char == ";":
+                return i, None
+        if parens <= 0:
+            # Câu lệnh chỉ tiếp tục khi dòng kết thúc dở (=>, =, toán tử) hoặc dòng sau bắt đầu bằng "{"/toán tử
+            tail = text.rstrip()
+            following = masked[i + 1].lstrip() if i + 1 < len(masked) else ""
+            if not (tail.endswith(CONTINUED) or following.startswith(CONTINUING)):
+                return i, None
+    return line, None
+
+
+def _subshell_end(masked: List[str], line: int, column: int) -> int:
+    """Line of the ")" closing the "(" at line/column (body of `name() ( ... )`)"""
+    depth = 0
+    for i in range(line, len(masked)):
+        for char in masked[i][column if i == line else 0:]:
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+                if depth == 0:
+                    return i
+    return len(masked) - 1
+
+
+def _shell_symbols(text: str, lines: List[str]) -> List[Dict[str, Any]]:
+    masked = SHELL_MASKED.sub(_blank, "\n".join(_mask_heredocs(lines))).split("\n")
+    closes, _ = _braces(masked)
+    symbols = []
+    inside = -1
+    for i, line in enumerate(masked):
+        if i <= inside:
+            continue
+        match = SHELL_FUNCTION.match(line)
+        if match is None:
+            continue
+        name = match.group(1) or match.group(2)
+        if name in ("if", "then", "else", "elif", "fi", "do", "done", "case", "esac", "while", "until", "for"):
+            continue
+        if match.group(0).endswith("("):
+            end = _subshell_end(masked, i, match.end() - 1)
+        else:
+            end, _ = _block_end(masked, closes, i, match.end(1) if match.group(1) else match.end(2))
+        symbols.append(_symbol(lines, name, "function", i + 1, end + 1, i + 1))
+        inside = end
+    return symbols
+
+
+def _javascript_symbols(text: str, lines: List[str]) -> List[Dict[str, Any]]:
+    masked = JS_MASKED.sub(_blank, text).split("\n")
+    closes, depth = _braces(masked)
+    symbols = []
+    inside = -1
+    # Class đang mở: (tên, độ sâu của thân class, dòng cuối)
+    classes: List[Tuple[str, int, int]] = []
+    for i, line in enumerate(masked):
+        while classes and i > classes[-1][2]:
+            classes.pop()
+        if i <= inside:
+            continue
+        match = JS_CLASS.match(line)
+        if match:
+            end, opened = _block_end(masked, closes, i, match.end(1))
+            prefix = classes[-1][0] + "." if classes else ""
+            name = prefix + match.group(1)
+            symbols.append(_symbol(lines, name, "class", i + 1, end + 1, i + 1))
+            if opened is not None:
+                classes.append((name, depth[opened] + 1, end))
+            continue
+        if classes and depth[i] == classes[-1][1]:
+            match = JS_FIELD.match(line) or JS_METHOD.match(line)
+            if match and match.group(1) not in JS_KEYWORDS:
+                end, _ = _block_end(masked, closes, i, match.end(1))
+                symbols.append(_symbol(lines, f"{classes[-1][0]}.{match.group(1)}", "method", i + 1, end + 1, i + 1))
+                inside = end
+            continue
+        match = JS_FUNCTION.match(line) or JS_VARIABLE.match(line)
+        if match:
+            end, _ = _block_end(masked, closes, i, match.end(1))
+            kind = "class" if line[:match.end()].rstrip().endswith("class") else "function"
+            symbols.append(_symbol(lines, match.group(1), kind, i + 1, end + 1, i + 1))
+            if kind == "function":
+                inside = end
+    return symbols
+
+
+PARSERS = {
+    "python": _python_symbols,
+    "shell": _shell_symbols,
+    "javascript": _javascript_symbols,
+}
+
+
+def parse(text: str, lang: str) -> List[Dict[str, Any]]:
+    """Symbols of source text: name (Class.method), kind, line, end_line (1-based, inclusive), signature"""
+    return PARSERS[lang](text, text.split("\n"))
+
+
+def symbols(path: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    (language, symbols) of a file, from the cache while its mtime and size are
+    unchanged. Raises OSError, ValueError for unsupported or too large files.
+    """
+    st = os.stat(path)
+    key = os.path.realpath(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _CACHE_LOCK:
+        cached = _CACHE.get(key)
+        if cached is not None and cached[0] == stamp:
+            _CACHE.move_to_end(key)
+            return cached[1], cached[2]
+    if st.st_size > MAX_FILE_BYTES:
+        raise ValueError(f"File quá lớn để phân tích ({st.st_size:,} bytes)")
+    with open(path, "rb") as f:
+        data = f.read()
+    lang = language(path, data[:256])
+    if lang is None:
+        raise ValueError("Chỉ hỗ trợ file Python, shell và JavaScript/TypeScript")
+    result = parse(data.decode("utf-8", errors="replace"), lang)
+    with _CACHE_LOCK:
+        _CACHE[key] = (stamp, lang, result)
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > MAX_FILES:
+            _CACHE.popitem(last=False)
+    return lang, result
+
+
+def find(symbol_list: List[Dict[str, Any]], name: str) -> List[Dict[str, Any]]:
+    """Symbols named name: the qualified name (Class.method), else the last part"""
+    exact = [s for s in symbol_list if s["name"] == name]
+    if exact:
+        return exact
+    return [s for s in symbol_list if s["name"].rsplit(".", 1)[-1] == name.rsplit(".", 1)[-1]]
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+trigram_index.py - On-disk trigram index that narrows grep_files to candidate files
+grep_files (content_search.py) reads every file of the tree on each call. This
+index stores, for each file of USER_WORKING_DIR, the set of byte trigrams of
+its whitespace-separated tokens (ASCII-lowercased) in SQLite under
+~/.cache/moibash/trigram/ (MOIBASH_CACHE_DIR):
+- a search needs the trigrams of its literal (or of the literal runs a regex
+  requires, alternatives included); only the files having all of them are
+  scanned, the rest of the tree is never read
+- before a search the index is synced with the file list: files whose size or
+  mtime changed are read again, deleted files dropped. Postings are appended
+  as new segments and merged (dead ids dropped) once there are too many
+- the first build (or any sync with a lot to read) runs in a background
+  thread; searches scan every file until it is done
+- a regex without a required literal of 3+ bytes is not narrowed
+The database is shared by the agent server and one-shot agents (WAL); any
+SQLite/OS error makes the caller fall back to scanning every file.
+"""
+
+import os
+import re
+import sys
+import sqlite3
+import hashlib
+import threading
+from array import array
+from pathlib import Path
+from functools import partial
+from itertools import repeat
+from collections import OrderedDict, defaultdict, deque
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# 0 để tắt index, grep_files quét mọi file như cũ
+ENABLED = os.environ.get('MOIBASH_GREP_INDEX', '1').lower() not in ('0', 'false', 'no', 'off')
+# Cây thư mục nhỏ hơn mức này quét thẳng (nhanh hơn đồng bộ index)
+MIN_BYTES = int(os.environ.get('MOIBASH_GREP_INDEX_MIN_BYTES', str(16 * 1024 * 1024)))
+CACHE_DIR = Path(os.environ.get("MOIBASH_CACHE_DIR", Path.home() / ".cache" / "moibash")) / "trigram"
+# Đổi khi định dạng postings đổi (array('I') theo byte order của máy)
+FORMAT = f"1-{sys.byteorder}-{array('I').itemsize}"
+# Cần đọc nhiều hơn mức này (lần build đầu) thì build ở thread nền, lần tìm đó quét hết
+BACKGROUND_BYTES = 4 * 1024 * 1024
+# Số id giữ trong bộ nhớ trước khi ghi một segment
+SEGMENT_IDS = 4 * 1024 * 1024
+# Quá số segment này (hoặc id chết nhiều hơn id sống) thì gộp lại
+MAX_SEGMENTS = 32
+BINARY_PROBE = 8192  # như content_search.py
+MAX_OPEN = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    binary INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    trigram INTEGER NOT NULL,
+    segment INTEGER NOT NULL,
+    docs BLOB NOT NULL,
+    PRIMARY KEY (trigram, segment)
+) WITHOUT ROWID;
+"""
+
+# Query: (trigram bắt buộc, các nhóm lựa chọn - mỗi nhóm cần khớp ít nhất một query con)
+Query = Tuple[Set[int], List[list]]
+
+
+def trigrams(data: bytes) -> Set[int]:
+    """Trigrams of the whitespace-separated tokens of data, as a<<16|b<<8|c"""
+    text = b"\n".join(set(data.lower().split()))
+    # Bỏ trùng trên tuple (nhanh, trong C) trước khi tính số nguyên
+    unique = set(zip(text, text[1:], text[2:]))
+    return {(a << 16) | (b << 8) | c for a, b, c in unique if 10 not in (a, b, c)}
+
+
+def extract(paths: List[str]) -> List[Tuple[str, bool, bytes]]:
+    """(path, binary, trigrams as array('I') bytes) of each readable file - runs in a worker process"""
+    results = []
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        if b"\0" in data[:BINARY_PROBE]:
+            results.append((path, True, b""))
+        else:
+            results.append((path, False, array('I', trigrams(data)).tobytes()))
+    return results
+
+
+def _parse(items) -> Query:
+    required: Set[int] = set()
+    groups: List[list] = []
+    run = bytearray()
+    for op, arg in items:
+        if op is sre_parse.LITERAL:
+            run.append(arg)
+            continue
+        required |= trigrams(bytes(run))
+        run.clear()
+        if op is sre_parse.SUBPATTERN:
+            sub = _parse(arg[-1])
+        elif op is getattr(sre_parse, "ATOMIC_GROUP", None):
+            sub = _parse(arg)
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, "POSSESSIVE_REPEAT", None)) and arg[0] >= 1:
+            sub = _parse(arg[2])
+        elif op is sre_parse.BRANCH:
+            alternatives = [_parse(branch) for branch in arg[1]]
+            # Một nhánh không có trigram nào thì cả nhóm không thu hẹp được
+            if all(alt[0] or alt[1] for alt in alternatives):
+                groups.append(alternatives)
+            continue
+        else:
+            continue
+        required |= sub[0]
+        groups.extend(sub[1])
+    required |= trigrams(bytes(run))
+    return required, groups
+
+
+def _ascii_only(query: Query) -> Query:
+    """query without the trigrams that have a non-ASCII byte"""
+    required = {t for t in query[0] if not t & 0x808080}
+    groups = []
+    for alternatives in query[1]:
+        alternatives = [_ascii_only(alt) for alt in alternatives]
+        if all(alt[0] or alt[1] for alt in alternatives):
+            groups.append(alternatives)
+    return required, groups
+
+
+def query_for(pattern: bytes, regex: bool, flags: int = 0) -> Optional[Query]:
+    """What a file must contain to match pattern, None if nothing (3+ bytes) is required"""
+    if not regex:
+        query = (trigrams(pattern), [])
+    else:
+        try:
+            query = _parse(sre_parse.parse(pattern, flags))
+        except Exception:
+            # API nội bộ của re: không phân tích được thì quét hết
+            return None
+    if flags & re.IGNORECASE and not pattern.isascii():
+        # Index chỉ hạ chữ ASCII: hoa/thường của ký tự khác (Ị/ị) có byte khác nhau
+        query = _ascii_only(query)
+    return query if query[0] or query[1] else None
+
+
+class TrigramIndex:
+    """Trigram postings of the files under root, stored in one SQLite database"""
+
+    def __init__(self, root: str, db_path: Path):
+        self.root = root
+        self.lock = threading.Lock()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path), timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        if self._meta("format") != FORMAT:
+            self.conn.executescript("BEGIN IMMEDIATE; DELETE FROM postings; DELETE FROM files; DELETE FROM meta; COMMIT;")
+            self._set_meta("format", FORMAT)
+            self._set_meta("root", root)
+        # path → (id, size, mtime); id → path của file không binary
+        self.files: Dict[str, Tuple[int, int, float]] = {}
+        self.text_ids: Dict[int, str] = {}
+        self.data_version = None
+        # Danh sách file đã đồng bộ lần gần nhất theo thư mục (bỏ qua nếu vẫn là object đó)
+        self.synced: Dict[str, list] = {}
+        self.builder: Optional[threading.Thread] = None
+
+    def sync(self, scope: str, files: List[Tuple[str, int, float]],
+             mapper: Callable[[Callable, List[List[str]]], Iterable[list]]):
+        """
+        Bring the index in line with files (real path, size, mtime), the whole
+        tree under scope: new and changed files are read again through
+        mapper(extract, batches), files under scope not listed are dropped.
+        True when the index is current. More than BACKGROUND_BYTES to read (the
+        first build) is done by a background thread; False until it is done.
+        """
+        if self.builder is not None and self.builder.is_alive():
+            return False
+        with self.lock:
+            if not self._reload() and self.synced.get(scope) is files:
+                return True
+            seen = set()
+            todo = []
+            for path, size, mtime in files:
+                seen.add(path)
+                known = self.files.get(path)
+                if known is None or known[1] != size or known[2] != mtime:
+                    todo.append((path, size, mtime))
+            prefix = scope.rstrip("/") + "/"
+            gone = [path for path in self.files if path not in seen and (path == scope or path.startswith(prefix))]
+            if todo or gone:
+                if sum(size for _, size, _ in todo) >= BACKGROUND_BYTES:
+                    self.builder = threading.Thread(target=self._build, args=(scope, files, todo, gone, mapper),
+                                                    daemon=True)
+                    self.builder.start()
+                    return False
+                self._update(todo, gone, mapper)
+            self.synced[scope] = files
+            return True
+
+    def candidates(self, query: Query) -> Set[str]:
+        """Paths of the indexed text files that can match query"""
+        with self.lock:
+            self._reload()
+            ids = self._evaluate(query)
+            return {self.text_ids[i] for i in ids if i in self.text_ids}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _build(self, scope: str, files: List[Tuple[str, int, float]], todo: List[Tuple[str, int, float]],
+               gone: List[str], mapper: Callable[[Callable, List[List[str]]], Iterable[list]]):
+        with self.lock:
+            try:
+                self._update(todo, gone, mapper)
+            except Exception:
+                # Không in traceback ra terminal: lần tìm sau đồng bộ lại
+                return
+            self.synced[scope] = files
+
+    def _evaluate(self, query: Query) -> Set[int]:
+        required, groups = query
+        result: Optional[Set[int]] = None
+        postings = self._postings(required)
+        # Giao từ danh sách ngắn nhất
+        for docs in sorted(postings, key=len):
+            result = set(docs) if result is None else result.intersection(docs)
+            if not result:
+                return result
+        for alternatives in groups:
+            union: Set[int] = set()
+            for alternative in alternatives:
+                union |= self._evaluate(alternative)
+            result = union if result is None else result & union
+            if not result:
+                return result
+        return result if result is not None else set(self.text_ids)
+
+    def _postings(self, required: Set[int]) -> List[array]:
+        if not required:
+            return []
+        found: Dict[int, array] = {}
+        keys = list(required)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT trigram, docs FROM postings WHERE trigram IN ({','.join('?' * len(chunk))})", chunk)
+            for trigram, docs in rows:
+                found.setdefault(trigram, array('I')).frombytes(docs)
+        # Trigram không có trong index: không file nào khớp
+        return [found.get(trigram, array('I')) for trigram in required]
+
+    def _reload(self) -> bool:
+        """Reload the file table if another connection committed; True if it did"""
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self.data_version:
+            return False
+        self.data_version = version
+        self.files.clear()
+        self.text_ids.clear()
+        for file_id, path, size, mtime, binary in self.conn.execute("SELECT id, path, size, mtime, binary FROM files"):
+            self.files[path] = (file_id, size, mtime)
+            if not binary:
+                self.text_ids[file_id] = path
+        self.synced.clear()
+        return True
+
+    def _update(self, todo: List[Tuple[str, int, float]], gone: List[str],
+                mapper: Callable[[Callable, List[List[str]]], Iterable[list]]):
+        stats = {path: (size, mtime) for path, size, mtime in todo}
+        batches, batch, batch_bytes = [], [], 0
+        for path, size, _ in todo:
+            batch.append(path)
+            batch_bytes += size
+            if batch_bytes >= 4 * 1024 * 1024:
+                batches.append(batch)
+                batch, batch_bytes = [], 0
+        if batch:
+            batches.append(batch)
+
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Connection khác có thể vừa ghi: đọc lại trong transaction
+            self._reload()
+            dead = int(self._meta("dead") or 0)
+            segment = int(self._meta("segment") or 0)
+            for path in gone + list(stats):
+                known = self.files.pop(path, None)
+                if known is not None:
+                    conn.execute("DELETE FROM files WHERE id = ?", (known[0],))
+                    dead += self.text_ids.pop(known[0], None) is not None
+            pending: Dict[int, array] = defaultdict(partial(array, 'I'))
+            pending_ids = 0
+            for results in mapper(extract, batches):
+                for path, binary, data in results:
+                    size, mtime = stats[path]
+                    file_id = conn.execute("INSERT INTO files (path, size, mtime, binary) VALUES (?, ?, ?, ?)",
+                                           (path, size, mtime, int(binary))).lastrowid
+                    self.files[path] = (file_id, size, mtime)
+                    if binary:
+                        continue
+                    self.text_ids[file_id] = path
+                    file_trigrams = array('I')
+                    file_trigrams.frombytes(data)
+                    # pending[trigram].append(file_id) cho mọi trigram, vòng lặp trong C
+                    deque(map(array.append, map(pending.__getitem__, file_trigrams), repeat(file_id)), maxlen=0)
+                    pending_ids += len(file_trigrams)
+                    if pending_ids >= SEGMENT_IDS:
+                        segment = self._write_segment(pending, segment)
+                        pending, pending_ids = defaultdict(partial(array, 'I')), 0
+            if pending:
+                segment = self._write_segment(pending, segment)
+            if segment > MAX_SEGMENTS or dead > len(self.text_ids):
+                self._merge()
+                dead, segment = 0, 1
+            self._set_meta("dead", str(dead))
+            self._set_meta("segment", str(segment))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            self.data_version = None
+            self._reload()
+            raise
+        self.data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _write_segment(self, pending: Dict[int, array], segment: int) -> int:
+        self.conn.executemany("INSERT INTO postings (trigram, segment, docs) VALUES (?, ?, ?)",
+                              ((trigram, segment, docs.tobytes()) for trigram, docs in pending.items()))
+        return segment + 1
+
+    def _merge(self):
+        """Rewrite the postings as one segment without the ids of deleted files"""
+        alive = self.text_ids
+        merged = []
+        trigram, docs = None, array('I')
+        for row_trigram, blob in self.conn.execute("SELECT trigram, docs FROM postings ORDER BY trigram, segment"):
+            if row_trigram != trigram:
+                if docs:
+                    merged.append((trigram, 0, docs.tobytes()))
+                trigram, docs = row_trigram, array('I')
+            segment_docs = array('I')
+            segment_docs.frombytes(blob)
+            docs.extend(i for i in segment_docs if i in alive)
+        if docs:
+            merged.append((trigram, 0, docs.tobytes()))
+        self.conn.execute("DELETE FROM postings")
+        self.conn.executemany("INSERT INTO postings (trigram, segment, docs) VALUES (?, ?, ?)", merged)
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+_OPEN: "OrderedDict[str, TrigramIndex]" = OrderedDict()
+_OPEN_LOCK = threading.Lock()
+
+
+def for_root(root: str) -> Optional[TrigramIndex]:
+    """Open (once per process) the index of a working directory, None if disabled or unusable"""
+    if not ENABLED:
+        return None
+    with _OPEN_LOCK:
+        index = _OPEN.get(root)
+        if index is None:
+            db_path = CACHE_DIR / (hashlib.sha1(root.encode()).hexdigest()[:16] + ".sqlite")
+            try:
+                index = TrigramIndex(root, db_path)
+            except (sqlite3.Error, OSError):
+                return None
+            _OPEN[root] = index
+            while len(_OPEN) > MAX_OPEN:
+                _OPEN.popitem(last=False)[1].close()
+        _OPEN.move_to_end(root)
+    return index
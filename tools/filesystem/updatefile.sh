@@ -9,6 +9,12 @@ update_file() {
     local content="$2"
     local mode="${3:-overwrite}"  # overwrite hoặc append
     
+    # mode patch (search/replace, diff hunk) chỉ có trong fs_tools.py
+    if [ "$mode" == "patch" ]; then
+        echo "{\"error\": \"Mode patch chỉ chạy in-process (fs_tools.py)\"}"
+        return 1
+    fi
+    
     if [ -z "$file_path" ]; then
         echo "{\"error\": \"Đường dẫn file là bắt buộc\"}"
         return 1
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+gemini_cache.py - Gemini explicit context caching (cachedContents)
+Uploads a large, stable prompt prefix (system instruction + tool schema) once
+and lets generateContent calls reference it by name instead of re-sending it.
+Cache names are kept in a small registry file so one-shot agent processes and
+agent_server.py reuse the same cache until its TTL runs out.
+"""
+
+import os
+import json
+import time
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+from gemini_client import GEMINI_API_BASE, get_session, DEFAULT_TIMEOUT
+
+API_ROOT = GEMINI_API_BASE.rsplit("/models", 1)[0]
+CACHED_CONTENTS_URL = f"{API_ROOT}/cachedContents"
+CACHE_DIR = Path(os.environ.get("MOIBASH_CACHE_DIR", Path.home() / ".cache" / "moibash"))
+REGISTRY_FILE = CACHE_DIR / "gemini_cached_contents.json"
+
+DEFAULT_TTL = int(os.environ.get("MOIBASH_GEMINI_CACHE_TTL", "3600"))
+# Gia hạn khi còn ít hơn khoảng này, để cache không hết hạn giữa vòng lặp agent
+REFRESH_MARGIN = 300
+# Tạo cache lỗi (prompt dưới mức token tối thiểu, model không hỗ trợ, ...): không thử lại ngay
+FAILURE_BACKOFF = 1800
+
+
+class ContextCache:
+    """Create, reuse and refresh one cachedContent per (model, system instruction, tools)"""
+
+    def __init__(self, model: str, ttl: int = DEFAULT_TTL, registry_file: Path = REGISTRY_FILE):
+        self.model = model
+        self.ttl = ttl
+        self.registry_file = Path(registry_file)
+        # key → entry đã biết trong process này (tránh đọc file mỗi vòng lặp)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+    def cache_key(self, system_instruction: str, tools: List[Dict]) -> str:
+        data = json.dumps([self.model, system_instruction, tools], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def _load_registry(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.registry_file) as f:
+                registry = json.load(f)
+            return registry if isinstance(registry, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_entry(self, key: str, entry: Optional[Dict[str, Any]]):
+        """Write (or remove) one entry and drop expired ones"""
+        registry = self._load_registry()
+        now = time.time()
+        registry = {
+            k: v for k, v in registry.items()
+            if isinstance(v, dict) and max(v.get("expire_at", 0), v.get("failed_until", 0)) > now
+        }
+        if entry is None:
+            registry.pop(key, None)
+        else:
+            registry[key] = entry
+        try:
+            self.registry_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.registry_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_file, "w") as f:
+                json.dump(registry, f)
+            os.replace(tmp_file, self.registry_file)
+        except OSError:
+            pass
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        self.entries[key] = entry
+        self._save_entry(key, entry)
+
+    def get_name(self, system_instruction: str, tools: List[Dict], api_key: str) -> Optional[str]:
+        """
+        Name of a live cachedContent holding system_instruction + tools
+
+        Returns:
+            "cachedContents/..." or None when caching is unavailable (caller sends
+            the full payload as before)
+        """
+        key = self.cache_key(system_instruction, tools)
+        now = time.time()
+        entry = self.entries.get(key) or self._load_registry().get(key)
+
+        if entry and entry.get("failed_until", 0) > now:
+            return None
+        if entry and entry.get("name"):
+            remaining = entry.get("expire_at", 0) - now
+            if remaining > REFRESH_MARGIN:
+                self.entries[key] = entry
+                return entry["name"]
+            if remaining > 5 and self._extend(entry["name"], api_key):
+                self._remember(key, dict(entry, expire_at=time.time() + self.ttl))
+                return entry["name"]
+
+        try:
+            name = self._create(system_instruction, tools, api_key)
+        except Exception:
+            # Lỗi mạng tạm thời: lần gọi sau thử lại
+            return None
+        if name is None:
+            self._remember(key, {"failed_until": time.time() + FAILURE_BACKOFF})
+            return None
+        self._remember(key, {"name": name, "expire_at": time.time() + self.ttl})
+        return name
+
+    def invalidate(self, name: str):
+        """
+        Drop a cache the API refused (deleted, expired early, other API key, ...)
+        Its key backs off like a failed create, so the retry sends the full prompt
+        """
+        failed = {"failed_until": time.time() + FAILURE_BACKOFF}
+        keys = {k for k, v in self.entries.items() if v.get("name") == name}
+        keys.update(k for k, v in self._load_registry().items() if isinstance(v, dict) and v.get("name") == name)
+        for key in keys:
+            self._remember(key, failed)
+
+    def _create(self, system_instruction: str, tools: List[Dict], api_key: str) -> Optional[str]:
+        """POST a new cachedContent; None when the API refuses it"""
+        payload = {
+            "model": f"models/{self.model}",
+            "systemInstruction": {"parts": [{"text": system_instruction}]},
+            "tools": tools,
+            "ttl": f"{self.ttl}s",
+        }
+        response = get_session().post(
+            CACHED_CONTENTS_URL,
+            params={"key": api_key},
+            json=payload,
+            timeout=DEFAULT_TIMEOUT
+        )
+        if not response.ok:
+            return None
+        return response.json().get("name")
+
+    def _extend(self, name: str, api_key: str) -> bool:
+        try:
+            response = get_session().patch(
+                f"{API_ROOT}/{name}",
+                params={"key": api_key, "updateMask": "ttl"},
+                json={"ttl": f"{self.ttl}s"},
+                timeout=DEFAULT_TIMEOUT
+            )
+            return response.ok
+        except Exception:
+            return False
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+gemini_client.py - Shared HTTP client for Gemini API calls
+Keeps one pooled requests.Session per process so every iteration of an
+agent loop reuses the same TCP/TLS connection to generativelanguage.googleapis.com
+"""
+
+import os
+import json
+import socket
+from typing import Dict, Optional, Any, Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.exceptions import ReadTimeoutError
+
+# MOIBASH_GEMINI_API_BASE cho phép trỏ sang proxy hoặc stub server (benchmark)
+GEMINI_API_BASE = os.environ.get(
+    'MOIBASH_GEMINI_API_BASE',
+    "https://generativelanguage.googleapis.com/v1beta/models"
+)
+
+# Pool settings (override qua biến môi trường nếu cần)
+POOL_CONNECTIONS = int(os.environ.get('MOIBASH_HTTP_POOL_CONNECTIONS', '4'))
+POOL_MAXSIZE = int(os.environ.get('MOIBASH_HTTP_POOL_MAXSIZE', '8'))
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read)
+
+# TCP keep-alive để connection không bị NAT/firewall cắt giữa các lượt chat
+KEEPALIVE_OPTIONS = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+for _name, _value in (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3)):
+    if hasattr(socket, _name):
+        KEEPALIVE_OPTIONS.append((socket.IPPROTO_TCP, getattr(socket, _name), _value))
+
+_SESSION: Optional[requests.Session] = None
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter with TCP keep-alive and TCP_NODELAY on pooled sockets"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        from urllib3.connection import HTTPConnection
+        kwargs["socket_options"] = HTTPConnection.default_socket_options + KEEPALIVE_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+
+class IdleResetRetry(Retry):
+    """
+    Retry that re-raises read timeouts: urllib3 counts a pooled connection the
+    server closed while idle (reset / RemoteDisconnected on reuse) as a read
+    error, so read retries stay on for that, but a request that timed out may
+    already be running on the server
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if isinstance(error, ReadTimeoutError):
+            raise error.with_traceback(_stacktrace)
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+def get_session() -> requests.Session:
+    """Get or create the process-wide pooled session"""
+    global _SESSION
+    if _SESSION is None:
+        session = requests.Session()
+        adapter = KeepAliveAdapter(
+            pool_connections=POOL_CONNECTIONS,
+            pool_maxsize=POOL_MAXSIZE,
+            # Retry lỗi kết nối và một lần khi connection trong pool đã bị server đóng lúc idle
+            # (urllib3 báo là read error); không retry read timeout, không retry theo status
+            max_retries=IdleResetRetry(total=2, connect=2, read=1, status=0, allowed_methods=None, backoff_factor=0.2),
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "Content-Type": "application/json",
+            "Connection": "keep-alive",
+        })
+        _SESSION = session
+    return _SESSION
+
+
+def warm_connection(url: str) -> bool:
+    """
+    Make sure the pool holds a connected socket for url's host, so the next
+    request skips the TCP/TLS handshake (used by agent_server pre-warm)
+
+    Returns:
+        True if a connection is open and idle in the pool
+    """
+    session = get_session()
+    adapter = session.get_adapter(url)
+    try:
+        # Lấy đúng pool mà session.post() sẽ dùng (cùng verify/cert)
+        settings = session.merge_environment_settings(url, {}, None, None, None)
+        if hasattr(adapter, "get_connection_with_tls_context"):
+            request = requests.Request("POST", url).prepare()
+            pool = adapter.get_connection_with_tls_context(request, settings["verify"], settings["proxies"], settings["cert"])
+        else:
+            pool = adapter.get_connection(url, settings["proxies"])
+        # _get_conn() đóng sẵn các connection đã bị server cắt
+        conn = pool._get_conn()
+        try:
+            if conn.sock is None:
+                conn.connect()
+        finally:
+            pool._put_conn(conn)
+        return True
+    except Exception:
+        return False
+
+
+def model_url(model: str, method: str = "generateContent") -> str:
+    """Build the REST URL for a model method"""
+    return f"{GEMINI_API_BASE}/{model}:{method}"
+
+
+def post_json(url: str, payload: Dict[str, Any], api_key: str, timeout=DEFAULT_TIMEOUT) -> requests.Response:
+    """POST a JSON payload through the pooled session"""
+    return get_session().post(
+        url,
+        params={"key": api_key},
+        json=payload,
+        timeout=timeout,
+    )
+
+
+def stream_generate_content(url: str, payload: Dict[str, Any], api_key: str,
+                            on_text: Optional[Callable[[str], None]] = None,
+                            on_function_call: Optional[Callable[[Dict], None]] = None,
+                            timeout=DEFAULT_TIMEOUT) -> Dict[str, Any]:
+    """
+    Call :streamGenerateContent with SSE and fire callbacks as parts arrive
+
+    Args:
+        url: streamGenerateContent URL (see model_url)
+        on_text: called with each text delta as soon as it is received
+        on_function_call: called with each functionCall part as soon as it is received
+
+    Returns:
+        Response aggregated into the same shape generateContent returns,
+        so callers can keep using their parse_response()
+    """
+    parts = []
+    aggregated: Dict[str, Any] = {}
+    candidate: Dict[str, Any] = {}
+
+    with get_session().post(
+        url,
+        params={"key": api_key, "alt": "sse"},
+        json=payload,
+        stream=True,
+        timeout=timeout,
+    ) as response:
+        if not response.ok:
+            # Đọc body lỗi trước khi connection đóng để caller xem được lý do
+            response.content
+        response.raise_for_status()
+        for raw_line in response.iter_lines():
+            # SSE: mỗi event là một dòng "data: {json}"
+            if not raw_line.startswith(b"data:"):
+                continue
+            chunk = json.loads(raw_line[5:].decode("utf-8"))
+
+            if "promptFeedback" in chunk:
+                aggregated["promptFeedback"] = chunk["promptFeedback"]
+            if "usageMetadata" in chunk:
+                aggregated["usageMetadata"] = chunk["usageMetadata"]
+
+            for chunk_candidate in chunk.get("candidates", [])[:1]:
+                if chunk_candidate.get("finishReason"):
+                    candidate["finishReason"] = chunk_candidate["finishReason"]
+                for part in chunk_candidate.get("content", {}).get("parts", []):
+                    if "text" in part and "functionCall" not in part:
+                        if on_text:
+                            on_text(part["text"])
+                        # Nối các text delta liên tiếp thành một part
+                        if parts and "text" in parts[-1] and "functionCall" not in parts[-1]:
+                            parts[-1]["text"] += part["text"]
+                            continue
+                    elif "functionCall" in part and on_function_call:
+                        on_function_call(part)
+                    parts.append(dict(part))
+
+    if parts or candidate:
+        candidate["content"] = {"role": "model", "parts": parts}
+        aggregated["candidates"] = [candidate]
+    return aggregated
+
+
+def close_session():
+    """Close pooled connections (e.g. before the process exits)"""
+    global _SESSION
+    if _SESSION is not None:
+        _SESSION.close()
+        _SESSION = None
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+history_search.py - Relevant chat history instead of a fixed last-N window
+The agents used to send the last MAX_HISTORY_MESSAGES pairs whatever the
+question. HistorySearch keeps a BM25 index over the session history
+(chat_history.py), updated with only the messages appended since the previous
+call, and builds the history for a question from:
+- the last few messages (the conversation in progress), always sent
+- the past turns (user message + answer) that best match the question
+within a token budget. Fully local, no embedding model or API call.
+The index lives in memory: in the agent server it is built once per session
+and then only grows (the prewarmer and the agents may query it concurrently,
+so each index is updated and searched under its own lock); a one-shot agent process rebuilds it (see
+benchmarks/bench_history_search.py for both costs).
+
+Usage: history_search.py <history_file> <query>   → in các tin nhắn được chọn
+"""
+
+import os
+import re
+import sys
+import math
+import threading
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from chat_history import ChatHistory
+from conversation_budget import estimate_tokens
+
+# MOIBASH_HISTORY_RETRIEVAL=0: quay lại gửi N tin nhắn cuối như cũ
+RETRIEVAL_ENABLED = os.environ.get('MOIBASH_HISTORY_RETRIEVAL', '1').lower() not in ('0', 'false', 'no')
+# Tổng token (ước lượng) của phần lịch sử gửi kèm mỗi request
+HISTORY_TOKENS = int(os.environ.get('MOIBASH_HISTORY_TOKENS', '3000'))
+# Số tin nhắn cuối luôn được gửi
+RECENT_MESSAGES = int(os.environ.get('MOIBASH_HISTORY_RECENT', '4'))
+# Số lượt cũ liên quan nhất được thêm vào
+TOP_K = int(os.environ.get('MOIBASH_HISTORY_TOP_K', '4'))
+# BM25
+K1 = 1.2
+B = 0.75
+
+# Bỏ dấu tiếng Việt bằng str.translate (nhanh hơn duyệt từng ký tự khi index hàng nghìn tin nhắn)
+_COMBINING = {c: None for c in range(0x300, 0x370)}
+_COMBINING[ord("đ")] = "d"
+_TOKEN = re.compile(r'\w\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, diacritics-free word tokens (2+ characters)"""
+    return _TOKEN.findall(unicodedata.normalize("NFD", text.lower()).translate(_COMBINING))
+
+
+class BM25Index:
+    """Append-only BM25 index (documents are added in increasing id order)"""
+
+    def __init__(self):
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.lengths: Dict[int, int] = {}
+        self.total_length = 0
+
+    def add(self, doc_id: int, tokens: List[str]):
+        counts: Dict[str, int] = defaultdict(int)
+        for token in tokens:
+            counts[token] += 1
+        for token, tf in counts.items():
+            self.postings[token].append((doc_id, tf))
+        self.lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def search(self, tokens: List[str], below: int) -> List[Tuple[float, int]]:
+        """(score, doc_id) of documents with id < below, best first"""
+        n = len(self.lengths)
+        if not n:
+            return []
+        average = self.total_length / n
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(tokens):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                if doc_id >= below:
+                    break
+                norm = K1 * (1 - B + B * self.lengths[doc_id] / average)
+                scores[doc_id] += idf * tf * (K1 + 1) / (tf + norm)
+        return sorted(((score, doc_id) for doc_id, score in scores.items()), reverse=True)
+
+
+class HistorySearch:
+    """Incrementally indexed chat history of one session"""
+
+    def __init__(self, path):
+        self.history = ChatHistory(path)
+        # Hai agent cùng index một tin nhắn sẽ tạo posting trùng/sai thứ tự
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        self.index = BM25Index()
+        self.messages: Dict[int, Tuple[str, str]] = {}
+        self.indexed = 0
+
+    def refresh(self) -> int:
+        """Index the messages appended since the last call; returns the message count"""
+        with self.lock:
+            total, new = self.history.messages(self.indexed)
+            if total < self.indexed:
+                # /clear: lịch sử bị xóa, index lại từ đầu
+                self.reset()
+                total, new = self.history.messages(0)
+            # Tin nhắn cuối có thể còn đang được ghi: chỉ index tin nhắn đã hoàn chỉnh
+            for index, role, text in new:
+                if index < total - 1:
+                    self.messages[index] = (role, text)
+                    self.index.add(index, tokenize(text))
+            self.indexed = max(self.indexed, total - 1)
+            return total
+
+    def _turn(self, index: int, below: int) -> List[int]:
+        """Message ids of the turn (user message + answer) containing index"""
+        role = self.messages[index][0]
+        if role == "model" and self.messages.get(index - 1, ("",))[0] == "user":
+            return [index - 1, index]
+        if role == "user" and index + 1 < below and self.messages.get(index + 1, ("",))[0] == "model":
+            return [index, index + 1]
+        return [index]
+
+    def select(self, query: str, recent: int = RECENT_MESSAGES, top_k: int = TOP_K,
+               max_tokens: int = HISTORY_TOKENS) -> List[Dict]:
+        """History for query: relevant past turns + the last recent messages, oldest first"""
+        with self.lock:
+            total = self.refresh()
+            _, tail = self.history.messages(-recent) if recent > 0 else (total, [])
+            below = tail[0][0] if tail else total
+            used = sum(estimate_tokens(text) for _, _, text in tail)
+
+            chosen: Dict[int, Tuple[str, str]] = {}
+            turns = 0
+            for score, doc_id in self.index.search(tokenize(query), below):
+                if turns >= top_k:
+                    break
+                if doc_id in chosen:
+                    continue
+                ids = self._turn(doc_id, below)
+                cost = sum(estimate_tokens(self.messages[i][1]) for i in ids)
+                if used + cost > max_tokens:
+                    continue
+                used += cost
+                turns += 1
+                for i in ids:
+                    chosen[i] = self.messages[i]
+
+        selected = sorted(chosen.items()) + [(index, (role, text)) for index, role, text in tail]
+        return [{"role": role, "parts": [{"text": text}]} for _, (role, text) in selected]
+
+
+_SEARCHES: Dict[str, HistorySearch] = {}
+_SEARCHES_LOCK = threading.Lock()
+
+
+def relevant_history(path, query: str, fallback_messages: int) -> List[Dict]:
+    """
+    History to send with query (process-wide index per history file)
+    Falls back to the last fallback_messages messages when retrieval is disabled
+    or the query has no searchable word.
+    """
+    if not RETRIEVAL_ENABLED or not tokenize(query or ""):
+        return ChatHistory(path).last(fallback_messages)
+    key = str(Path(path).resolve())
+    with _SEARCHES_LOCK:
+        search = _SEARCHES.get(key)
+        if search is None:
+            search = _SEARCHES[key] = HistorySearch(path)
+    return search.select(query)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__.strip().splitlines()[-1], file=sys.stderr)
+        sys.exit(1)
+    for message in HistorySearch(sys.argv[1]).select(" ".join(sys.argv[2:])):
+        print(f"{message['role']}: {message['parts'][0]['text']}")
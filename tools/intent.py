@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+intent.py - Phân loại intent của user message
+Fast path: chấm điểm từ khóa/n-gram local, trả lời ngay khi đủ tự tin
+(hai tín hiệu độc lập, hoặc một từ khóa dẫn xa intent thứ hai)
+Cache: kết quả Gemini được lưu theo message đã chuẩn hóa (LRU/TTL)
+Sử dụng Gemini để phân loại: filesystem, calendar, weather, image_create, google_search, chat
+Fallback: phân loại theo từ khóa khi API lỗi
+
+Usage:
+    intent.py <message>           → in intent
+    intent.py --json <message>    → {"intent", "confidence", "source"}
+    intent.py --stats             → số lượt theo từng nguồn, hit rate của fast path và cache
+    intent.py --clear-cache       → xóa intent cache
+"""
+
+import os
+import re
+import sys
+import json
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Any
+
+from intent_cache import IntentCache
+
+# Constants
+SCRIPT_DIR = Path(__file__).resolve().parent
+ENV_FILE = SCRIPT_DIR / "../.env"
+GEMINI_MODEL = "gemini-2.5-flash-lite"
+
+INTENTS = ("filesystem", "calendar", "weather", "image_create", "google_search", "chat")
+
+# Thư mục lưu số liệu giữa các phiên chat
+CACHE_DIR = Path(os.environ.get("MOIBASH_CACHE_DIR", Path.home() / ".cache" / "moibash"))
+STATS_FILE = CACHE_DIR / "intent_stats.json"
+CACHE_FILE = CACHE_DIR / "intent_cache.json"
+
+# Load environment variables
+def load_env():
+    """Load environment variables from .env file"""
+    if ENV_FILE.exists():
+        with open(ENV_FILE) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    # Remove quotes if present
+                    value = value.strip().strip('"').strip("'")
+                    os.environ[key] = value
+
+load_env()
+
+# Fast path settings (đọc sau load_env để .env cũng cấu hình được)
+FAST_PATH_ENABLED = os.environ.get("MOIBASH_INTENT_FAST_PATH", "1").lower() not in ("0", "false", "no")
+FAST_PATH_THRESHOLD = float(os.environ.get("MOIBASH_INTENT_FAST_THRESHOLD", "0.75"))
+
+# Intent cache settings
+CACHE_ENABLED = os.environ.get("MOIBASH_INTENT_CACHE", "1").lower() not in ("0", "false", "no")
+INTENT_CACHE = IntentCache(
+    CACHE_FILE,
+    max_entries=int(os.environ.get("MOIBASH_INTENT_CACHE_SIZE", "512")),
+    ttl=float(os.environ.get("MOIBASH_INTENT_CACHE_TTL", str(7 * 24 * 3600))),
+)
+
+# System instruction để phân loại intent
+SYSTEM_INSTRUCTION = """Bạn là một intent classifier. Phân loại câu hỏi của user vào 1 trong 6 loại:
+
+1. filesystem: BẤT KỲ YÊU CẦU NÀO về thao tác với file/folder trên hệ thống, coding, sửa file...
+   - Tạo file: 'tạo file', 'create file', 'viết file'
+   - Đọc file: 'đọc file', 'xem file', 'hiển thị nội dung', 'file này có gì', 'nội dung file', 'file có chức năng gì'
+   - Sửa file: 'sửa file', 'đổi tên file', 'rename', 'chỉnh sửa'
+   - Xóa file: 'xóa file', 'delete file', 'remove'
+   - Chạy code: 'chạy file', 'thực thi', 'run code', 'execute'
+   - Liệt kê: 'list file', 'bao nhiêu file', 'đếm file', 'tìm file'
+   - Phân tích: 'phân tích file', 'analyze', 'file làm gì', 'chức năng của file'
+
+2. calendar: BẤT KỲ YÊU CẦU NÀO về lịch, lịch trình, sự kiện, cuộc họp, hẹn gặp
+   - Xem lịch: 'lịch trình hôm nay', 'lịch tuần này', 'có hẹn gì không'
+   - Thêm lịch: 'thêm lịch họp', 'tạo event', 'đặt hẹn'
+   - Sửa/xóa lịch: 'xóa lịch họp', 'hủy cuộc hẹn', 'dời lịch'
+
+3. weather: Hỏi về thời tiết, nhiệt độ, mưa nắng tại một địa điểm cụ thể
+   - 'thời tiết', 'nhiệt độ', 'trời có mưa không'
+
+4. image_create: Yêu cầu tạo ảnh, vẽ ảnh, generate image
+   - 'vẽ', 'tạo ảnh', 'generate image'
+
+5. google_search: Cần thông tin thời gian thực, tin tức, sự kiện mới nhất
+   - 'tin tức', 'tìm kiếm', 'thông tin về'
+
+6. chat: Các câu hỏi thông thường khác, trò chuyện, hỏi đáp kiến thức chung
+
+QUAN TRỌNG: 
+- Ưu tiên filesystem nếu có từ khóa: file, folder, tạo, xóa, sửa, đổi tên, chạy, execute, list, đếm, tìm kiếm file, chức năng, phân tích, nội dung
+- Ưu tiên calendar nếu có từ khóa: lịch, lịch trình, event, họp, hẹn, cuộc họp, appointment, meeting, schedule
+- Câu hỏi về 'file này', 'file đó', 'chức năng file' → filesystem
+
+CHỈ TRẢ VỀ MỘT TRONG SÁU TỪ SAU: filesystem, calendar, weather, image_create, google_search, chat
+KHÔNG GIẢI THÍCH GÌ CẢ, CHỈ TRẢ VỀ ĐÚNG MỘT TỪ KHÓA"""
+
+# Từ khóa fallback, kiểm tra theo thứ tự (filesystem trước)
+FALLBACK_KEYWORDS = [
+    ("filesystem", ['file', 'folder', 'tạo file', 'tao file', 'create file', 'xóa file', 'xoa file', 'delete file', 'đọc file', 'doc file', 'read file', 'sửa file', 'sua file', 'edit file', 'đổi tên', 'doi ten', 'rename', 'chạy', 'chay', 'run', 'execute', 'thực thi', 'thuc thi', 'bao nhiêu file', 'bao nhieu file', 'đếm file', 'dem file', 'list file', 'tìm file', 'tim file', 'search file']),
+    ("calendar", ['lịch', 'lich', 'schedule', 'event', 'họp', 'hop', 'hẹn', 'hen', 'meeting', 'appointment', 'cuộc họp', 'lịch trình']),
+    ("weather", ['thời tiết', 'thoi tiet', 'weather', 'nhiệt độ', 'nhiet do', 'temperature', 'mưa', 'mua', 'rain', 'nắng', 'nang', 'sunny']),
+    ("image_create", ['vẽ', 've', 'draw', 'tạo ảnh', 'tao anh', 'create image', 'generate image', 'ảnh', 'anh', 'image']),
+    ("google_search", ['tìm kiếm', 'tim kiem', 'search', 'tin tức', 'tin tuc', 'news', 'thông tin', 'thong tin', 'information']),
+]
+
+
+# Trọng số từ khóa cho fast path. Từ khóa viết không dấu khớp cả câu có dấu lẫn
+# không dấu ("thoi tiet" khớp "thời tiết"); từ khóa có dấu chỉ khớp đúng dấu, dùng
+# cho những từ mà bỏ dấu sẽ trùng nghĩa khác ("mưa"/"mua", "vẽ"/"về", "họp"/"hộp").
+INTENT_KEYWORDS: Dict[str, Dict[str, float]] = {
+    "filesystem": {
+        "file": 2.0, "files": 2.0, "folder": 2.0, "thu muc": 2.0, "tep": 2.0, "directory": 2.0,
+        "script": 2.0, "source code": 2.0, "rename": 2.0, "doi ten": 1.5, "execute": 2.0,
+        "thuc thi": 2.0, "code": 1.5, "chay": 1.0, "run": 1.0, "noi dung": 1.0,
+    },
+    "calendar": {
+        "lich": 2.0, "lich trinh": 2.5, "calendar": 2.0, "schedule": 2.0, "event": 2.0,
+        "cuoc hop": 2.5, "họp": 2.0, "hẹn": 2.0, "lich hen": 2.5, "meeting": 2.0,
+        "appointment": 2.0, "su kien": 1.0,
+    },
+    "weather": {
+        "thoi tiet": 2.5, "weather": 2.5, "nhiet do": 2.0, "temperature": 2.0, "do am": 1.5,
+        "forecast": 1.5, "du bao": 1.0, "mưa": 1.5, "nắng": 1.5, "rain": 1.5, "sunny": 1.5,
+    },
+    "image_create": {
+        "vẽ": 2.0, "draw": 2.0, "tao anh": 2.5, "tao hinh": 2.5, "hinh anh": 1.5,
+        "ảnh": 1.5, "image": 1.5, "picture": 1.5, "generate image": 2.5, "logo": 1.0,
+    },
+    "google_search": {
+        "tin tuc": 2.5, "news": 2.5, "google": 2.0, "tim kiem": 1.5, "search": 1.5,
+        "moi nhat": 1.5, "thong tin ve": 1.0,
+    },
+    "chat": {
+        "xin chao": 2.0, "chao": 1.0, "hello": 2.0, "hi": 1.5, "cam on": 2.0, "thanks": 2.0,
+        "ban la ai": 2.0, "giai thich": 1.0, "la gi": 1.0,
+    },
+}
+
+# Cụm từ thông dụng chứa từ khóa nhưng mang nghĩa khác ("lịch sử", "ảnh hưởng"):
+# có cụm trong message thì từ khóa đó không được tính
+NEGATIVE_COMPOUNDS: Dict[str, Tuple[str, ...]] = {
+    "lich": ("lich su", "du lich", "lich lam", "lich thiep", "lich dai", "lich la"),
+    "ảnh": ("ảnh hưởng",),
+    "hinh anh": ("hinh anh cua",),
+    "chay": ("chay bo", "chay tron", "chay xe", "chay nhay"),
+    "run": ("run ray",),
+    "su kien": ("su kien lich su",),
+}
+
+# Từ hỗ trợ: không cộng điểm và không tự chọn intent, nhưng là tín hiệu thứ hai khi
+# intent đã có từ khóa ("xóa folder tmp", "lịch hôm nay")
+SUPPORT_WORDS: Dict[str, Tuple[str, ...]] = {
+    "filesystem": ("doc", "tao", "xoa", "sua", "liet ke", "mo", "tim", "dem", "bao nhieu", "trong", "python", "project"),
+    "calendar": ("hom nay", "ngay mai", "tuan nay", "tuan sau", "thang nay", "sang mai", "chieu mai",
+                 "them", "tao", "huy", "doi", "xem"),
+    "weather": ("hom nay", "ngay mai", "chieu nay", "sang nay", "toi nay", "tuan nay", "co khong"),
+    "image_create": ("mot con", "buc", "tranh", "tao"),
+    "google_search": ("gia", "hom nay", "tim"),
+    "chat": ("ban", "nhieu", "toi"),
+}
+
+# Đường dẫn hoặc tên file có đuôi (main.py, ./src, ~/notes.txt) là tín hiệu filesystem mạnh
+PATH_PATTERN = re.compile(r'(?:^|\s)(?:~|\.{1,2})?/[\w.-]+|\b(?!v\.v\b)[\w-]+\.[A-Za-z][A-Za-z0-9]{0,4}\b')
+PATH_WEIGHT = 2.0
+URL_PATTERN = re.compile(r'\w+://\S+')
+# Tên miền (youtube.com, vnexpress.net/abc) không phải tên file
+DOMAIN_PATTERN = re.compile(r'\b(?:www\.)?(?:[\w-]+\.)+(?:com|net|org|vn|io|gov|edu|info|biz|me|app|dev|co|tv|xyz|uk|us)\b(?:/\S*)?',
+                            re.IGNORECASE)
+
+# Điểm của intent dẫn đầu đạt mức này thì coi là đủ mạnh
+STRONG_SCORE = 2.0
+# Chỉ có một tín hiệu (một từ khóa hoặc một đường dẫn) thì phải dẫn trước intent thứ hai
+# ít nhất chừng này điểm mới đi fast path: một từ đơn lẻ dễ trùng từ thông dụng
+SINGLE_SIGNAL_MARGIN = 2.5
+SINGLE_SIGNAL_CONFIDENCE = 0.5
+MAX_NGRAM = max(len(k.split()) for words in (*INTENT_KEYWORDS.values(), *NEGATIVE_COMPOUNDS.values(), *SUPPORT_WORDS.values())
+                for k in words)
+
+
+def fold_diacritics(text: str) -> str:
+    """Lowercase and strip Vietnamese diacritics ("Thời tiết" → "thoi tiet")"""
+    text = unicodedata.normalize("NFD", text.lower()).replace("đ", "d")
+    return "".join(c for c in text if unicodedata.category(c) != "Mn")
+
+
+def normalize_message(message: str) -> str:
+    """
+    Cache key for a message: lowercase, no diacritics, paths/numbers masked
+    "Đọc file src/Main.py" và "doc file lib/utils.py" → "doc file <path>"
+    """
+    tokens = []
+    for token in message.split():
+        if URL_PATTERN.match(token) or DOMAIN_PATTERN.match(token):
+            tokens.append("<url>")
+        elif re.search(r'[^\W\d]', token) and ("/" in token or PATH_PATTERN.search(token)):
+            tokens.append("<path>")
+        else:
+            tokens.append(re.sub(r'\d+(?:[.,:/h]\d+)*', '<num>', fold_diacritics(token)))
+    return " ".join(re.findall(r'<\w+>|\w+', " ".join(tokens)))
+
+
+def _ngrams(text: str) -> set:
+    tokens = re.findall(r'\w+', text)
+    return {
+        " ".join(tokens[i:i + n])
+        for n in range(1, MAX_NGRAM + 1)
+        for i in range(len(tokens) - n + 1)
+    }
+
+
+def _signals(matched: List[str]) -> int:
+    """Independent keywords: one contained in another matched keyword ("lich" in "lich hen") is not counted"""
+    folded = [f" {fold_diacritics(k)} " for k in matched]
+    return sum(1 for i, k in enumerate(folded)
+               if not any(i != j and k in other and k != other for j, other in enumerate(folded)))
+
+
+def match_intents(message: str) -> Dict[str, Tuple[float, int]]:
+    """(weighted keyword/n-gram score, independent signals) for each intent"""
+    accented = _ngrams(unicodedata.normalize("NFC", message.lower()))
+    folded = _ngrams(fold_diacritics(message))
+    has_path = bool(PATH_PATTERN.search(DOMAIN_PATTERN.sub(" ", URL_PATTERN.sub(" ", message))))
+    result = {}
+    for intent, words in INTENT_KEYWORDS.items():
+        matched = []
+        for keyword, weight in words.items():
+            ngrams = folded if keyword.isascii() else accented
+            if keyword in ngrams and not any(c in ngrams for c in NEGATIVE_COMPOUNDS.get(keyword, ())):
+                matched.append(keyword)
+        score, signals = sum(words[k] for k in matched), _signals(matched)
+        if intent == "filesystem" and has_path:
+            score, signals = score + PATH_WEIGHT, signals + 1
+        if signals:
+            signals += _signals(matched + [w for w in SUPPORT_WORDS.get(intent, ()) if w in folded]) - _signals(matched)
+        result[intent] = (score, signals)
+    return result
+
+
+def score_intents(message: str) -> Dict[str, float]:
+    """Weighted keyword/n-gram score for each intent"""
+    return {intent: score for intent, (score, _) in match_intents(message).items()}
+
+
+def local_classify(message: str) -> Tuple[str, float]:
+    """
+    Classify without the network
+
+    Returns:
+        (intent, confidence) - confidence là tỉ lệ điểm giữa intent dẫn đầu và
+        intent thứ hai, giảm dần khi điểm dẫn đầu còn yếu (0 khi không khớp gì);
+        tối đa SINGLE_SIGNAL_CONFIDENCE khi intent dẫn đầu chỉ dựa vào một tín
+        hiệu và không dẫn trước SINGLE_SIGNAL_MARGIN điểm
+    """
+    matches = match_intents(message)
+    ranked = sorted(matches, key=lambda intent: matches[intent][0], reverse=True)
+    (top, signals), (second, _) = matches[ranked[0]], matches[ranked[1]]
+    if top <= 0:
+        return "chat", 0.0
+    confidence = top / (top + second) * min(1.0, top / STRONG_SCORE)
+    if signals < 2 and top - second < SINGLE_SIGNAL_MARGIN:
+        confidence = min(confidence, SINGLE_SIGNAL_CONFIDENCE)
+    return ranked[0], round(confidence, 3)
+
+
+def keyword_intent(message: str) -> str:
+    """Phân loại dựa trên từ khóa trong message"""
+    message = message.lower()
+    for intent, words in FALLBACK_KEYWORDS:
+        if any(word in message for word in words):
+            return intent
+    return "chat"
+
+
+def parse_intent_text(text: str) -> str:
+    """Lấy intent từ text mà model trả về"""
+    text = text.strip().lower()
+    if 'filesystem' in text:
+        return 'filesystem'
+    elif 'calendar' in text:
+        return 'calendar'
+    elif 'weather' in text:
+        return 'weather'
+    elif 'image_create' in text or 'image' in text:
+        return 'image_create'
+    elif 'google_search' in text or 'search' in text:
+        return 'google_search'
+    return 'chat'
+
+
+def classify_with_gemini(message: str, api_key: str) -> Optional[str]:
+    """Gọi Gemini để classify; trả về None khi API lỗi"""
+    # Import khi cần: fast path và cache hit không phải load requests (~50ms)
+    from gemini_client import post_json, model_url
+    payload = {
+        "contents": [{
+            "parts": [{"text": message}]
+        }],
+        "systemInstruction": {
+            "parts": [{"text": SYSTEM_INSTRUCTION}]
+        },
+        "generationConfig": {
+            "temperature": 0.1,
+            "maxOutputTokens": 10
+        }
+    }
+    try:
+        data = post_json(model_url(GEMINI_MODEL), payload, api_key).json()
+        # Kiểm tra lỗi API (quota exceeded, etc.)
+        if 'error' in data:
+            return None
+        return parse_intent_text(data['candidates'][0]['content']['parts'][0]['text'])
+    except Exception:
+        # Lỗi request/parse
+        return None
+
+
+def load_stats() -> Dict[str, int]:
+    """Read the per-source classification counters"""
+    try:
+        with open(STATS_FILE) as f:
+            return {k: int(v) for k, v in json.load(f).items()}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def record_source(source: str):
+    """Count one classification answered by source (fast_path, gemini, fallback)"""
+    stats = load_stats()
+    stats[source] = stats.get(source, 0) + 1
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_file = STATS_FILE.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(stats, f)
+        os.replace(tmp_file, STATS_FILE)
+    except OSError:
+        pass
+
+
+def get_stats() -> Dict[str, Any]:
+    """Counters plus the fast-path hit rate"""
+    stats = load_stats()
+    total = sum(stats.values())
+    return {
+        **stats,
+        "total": total,
+        "fast_path_hit_rate": round(stats.get("fast_path", 0) / total, 3) if total else 0.0,
+        "intent_cache": INTENT_CACHE.stats(),
+    }
+
+
+def classify_detailed(message: str, api_key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Classify a user message into one of INTENTS
+
+    Returns:
+        {"intent", "confidence", "source"} - source là fast_path, cache, gemini hoặc fallback
+    """
+    if not message:
+        return {"intent": "chat", "confidence": 1.0, "source": "empty"}
+
+    intent, confidence = local_classify(message)
+    fast = FAST_PATH_ENABLED and confidence >= FAST_PATH_THRESHOLD
+    cache_key = normalize_message(message) if CACHE_ENABLED and not fast else ""
+    cached = INTENT_CACHE.get(cache_key) if cache_key else None
+    if fast:
+        source = "fast_path"
+    elif cached in INTENTS:
+        intent, source = cached, "cache"
+    else:
+        if api_key is None:
+            api_key = os.environ.get("GEMINI_API_KEY", "")
+        gemini_intent = classify_with_gemini(message, api_key)
+        if gemini_intent is not None:
+            intent, source = gemini_intent, "gemini"
+            if cache_key:
+                INTENT_CACHE.put(cache_key, gemini_intent)
+        else:
+            # Không cache kết quả fallback để lượt sau vẫn thử lại Gemini
+            intent, source = keyword_intent(message), "fallback"
+    # Hit/miss của lượt này (put() đã ghi nếu vừa gọi Gemini thành công)
+    INTENT_CACHE.flush()
+
+    record_source(source)
+    # Đảm bảo intent hợp lệ
+    return {
+        "intent": intent if intent in INTENTS else "chat",
+        "confidence": confidence,
+        "source": source,
+    }
+
+
+def classify(message: str, api_key: Optional[str] = None) -> str:
+    """Classify a user message into one of INTENTS"""
+    return classify_detailed(message, api_key)["intent"]
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["--stats"]:
+        print(json.dumps(get_stats(), indent=2))
+    elif args[:1] == ["--clear-cache"]:
+        INTENT_CACHE.clear()
+    elif args[:1] == ["--json"]:
+        print(json.dumps(classify_detailed(args[1] if len(args) > 1 else ""), ensure_ascii=False))
+    else:
+        print(classify(args[0] if args else ""))
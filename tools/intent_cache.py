@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+intent_cache.py - Persistent LRU/TTL cache for intent classifications
+Stored as one JSON file so it survives between chat sessions and is shared
+by intent.sh (one process per turn) and agent_server.py (long-lived).
+Lookups do not write the file: hit/miss counters and LRU order are kept in
+memory and saved with the next put() or by flush() at the end of the turn.
+"""
+
+import os
+import json
+import time
+from pathlib import Path
+from typing import Dict, Optional, Any
+
+
+class IntentCache:
+    """Map normalized messages to intents with LRU eviction and a TTL"""
+
+    def __init__(self, path: Path, max_entries: int = 512, ttl: float = 7 * 24 * 3600):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key → [intent, timestamp], thứ tự dict = thứ tự LRU (cũ nhất trước)
+        self.entries: Dict[str, list] = {}
+        self.hits = 0
+        self.misses = 0
+        self._mtime: Optional[int] = None
+        # Thay đổi của get() chưa ghi file (áp dụng lại sau khi load bản mới của process khác)
+        self._pending_hits = 0
+        self._pending_misses = 0
+        self._touched: Dict[str, None] = {}
+
+    def _load(self):
+        """Reload the file if another process changed it since the last read"""
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except OSError:
+            self.entries, self.hits, self.misses, self._mtime = {}, 0, 0, None
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self.entries = dict(data.get("entries", {}))
+            self.hits = int(data.get("hits", 0))
+            self.misses = int(data.get("misses", 0))
+        except (OSError, ValueError, AttributeError, TypeError):
+            self.entries, self.hits, self.misses = {}, 0, 0
+        self._mtime = mtime
+
+    def _apply_pending(self):
+        """Merge lookups made since the last save into the (freshly loaded) entries"""
+        self.hits += self._pending_hits
+        self.misses += self._pending_misses
+        for key in self._touched:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.entries[key] = entry
+        self._pending_hits, self._pending_misses, self._touched = 0, 0, {}
+
+    def _save(self):
+        data = {"hits": self.hits, "misses": self.misses, "entries": self.entries}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_file, "w") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_file, self.path)
+            self._mtime = self.path.stat().st_mtime_ns
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached intent for key, counting a hit or a miss (saved by put()/flush())"""
+        self._load()
+        entry = self.entries.get(key)
+        if entry is not None and time.time() - entry[1] > self.ttl:
+            entry = None
+        if entry is None:
+            self._pending_misses += 1
+        else:
+            self._pending_hits += 1
+            # Đưa lên cuối khi lưu (dùng gần nhất); TTL tính từ lúc classify, không gia hạn khi hit
+            self._touched[key] = None
+        return entry[0] if entry else None
+
+    def flush(self):
+        """Save counters and LRU order of the lookups since the last write, if any"""
+        if not (self._pending_hits or self._pending_misses):
+            return
+        self._load()
+        self._apply_pending()
+        self._save()
+
+    def put(self, key: str, intent: str):
+        self._load()
+        self._apply_pending()
+        self.entries.pop(key, None)
+        self.entries[key] = [intent, time.time()]
+        while len(self.entries) > self.max_entries:
+            del self.entries[next(iter(self.entries))]
+        self._save()
+
+    def clear(self):
+        self.entries, self.hits, self.misses = {}, 0, 0
+        self._pending_hits, self._pending_misses, self._touched = 0, 0, {}
+        self._save()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for tuning size and TTL"""
+        self._load()
+        hits, misses = self.hits + self._pending_hits, self.misses + self._pending_misses
+        lookups = hits + misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
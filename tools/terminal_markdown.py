@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+terminal_markdown.py - Markdown → ANSI rendering for the terminal
+format_markdown() renders a whole text at once; MarkdownRenderer does the
+same thing incrementally so streamed responses can be printed line by line.
+"""
+
+import re
+import sys
+from typing import List, Optional, Callable
+
+RESET = "\033[0m"
+BOLD = "\033[1m"
+ITALIC = "\033[3m"
+GREEN = "\033[0;32m"
+YELLOW = "\033[0;33m"
+BLUE = "\033[0;34m"
+MAGENTA = "\033[0;35m"
+CYAN = "\033[0;36m"
+GRAY = "\033[0;90m"
+
+BLANK_LINES = re.compile(r'\n{3,}')
+CODE_FENCE = re.compile(r'^```(\w*)')
+HEADING_3 = re.compile(r'^###\s+(.+)$')
+HEADING_2 = re.compile(r'^##\s+(.+)$')
+HEADING_1 = re.compile(r'^#\s+(.+)$')
+BULLET = re.compile(r'^([ \t]*)[-\*][ \t](.+)$')
+NUMBERED = re.compile(r'^([ \t]*)([0-9]+)\.\s+(.+)$')
+INLINE_CODE = re.compile(r'`([^`]*)`')
+INLINE_BOLD = re.compile(r'\*\*([^*]+)\*\*')
+INLINE_ITALIC = re.compile(r'(?<!\*)\*([^*]+)\*(?!\*)')
+
+
+def _format_list_item(item: str) -> str:
+    item = INLINE_CODE.sub(f'{GRAY}\\1{RESET}', item)
+    item = INLINE_BOLD.sub(f'{BOLD}\\1{RESET}', item)
+    return INLINE_ITALIC.sub(f'{ITALIC}\\1{RESET}', item)
+
+
+class MarkdownRenderer:
+    """Incremental markdown formatter: feed() text chunks, get back formatted complete lines"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.in_code_block = False
+        self.newline_run = 0
+
+    def format_line(self, line: str) -> str:
+        """Format one line, updating code-block state"""
+        # Code block start/end
+        code_block_match = CODE_FENCE.match(line)
+        if code_block_match:
+            if not self.in_code_block:
+                self.in_code_block = True
+                code_lang = code_block_match.group(1)
+                if code_lang:
+                    return f"{CYAN}{BOLD}┌─ Code: {code_lang}{RESET}"
+                return f"{CYAN}{BOLD}┌─ Code{RESET}"
+            self.in_code_block = False
+            return f"{CYAN}{BOLD}└─{RESET}"
+        if self.in_code_block:
+            return f"{CYAN}│{RESET} {GRAY}{line}{RESET}"
+        # Headings
+        m3 = HEADING_3.match(line)
+        if m3:
+            return f"{YELLOW}{BOLD}{m3.group(1)}{RESET}"
+        m2 = HEADING_2.match(line)
+        if m2:
+            return f"{CYAN}{BOLD}{m2.group(1)}{RESET}"
+        m1 = HEADING_1.match(line)
+        if m1:
+            return f"{BLUE}{BOLD}{m1.group(1)}{RESET}"
+        # Bullet lists
+        bullet_match = BULLET.match(line)
+        if bullet_match:
+            indent, item = bullet_match.groups()
+            return f"{indent}{GREEN}●{RESET} {_format_list_item(item)}"
+        # Numbered lists
+        num_match = NUMBERED.match(line)
+        if num_match:
+            indent, number, item = num_match.groups()
+            return f"{indent}{CYAN}{number}.{RESET} {_format_list_item(item)}"
+        # Inline formatting for regular lines
+        line = INLINE_BOLD.sub(f'{BOLD}\\1{RESET}', line)
+        line = INLINE_ITALIC.sub(f'{ITALIC}\\1{RESET}', line)
+        return INLINE_CODE.sub(f'{GRAY}\\1{RESET}', line)
+
+    def feed(self, chunk: str) -> List[str]:
+        """Add a chunk of text; return formatted lines that are now complete"""
+        # Gộp 3+ newline liên tiếp thành 2, kể cả khi chuỗi newline bị cắt giữa các chunk
+        run = self.newline_run
+        text = BLANK_LINES.sub('\n\n', '\n' * run + chunk)
+        self.newline_run = len(text) - len(text.rstrip('\n'))
+        self.buffer += text[run:]
+        *complete, self.buffer = self.buffer.split('\n')
+        return [self.format_line(line) for line in complete]
+
+    def flush(self) -> str:
+        """Format and return whatever partial line is left in the buffer"""
+        line, self.buffer = self.buffer, ""
+        return self.format_line(line)
+
+
+def format_markdown(text: str) -> str:
+    """
+    Format markdown text for terminal display (simple inline formatting)
+    Handles: **bold**, *italic*, `code`, but NOT multi-line structures
+    """
+    if not text:
+        return text
+    renderer = MarkdownRenderer()
+    lines = renderer.feed(text)
+    lines.append(renderer.flush())
+    return '\n'.join(lines)
+
+
+class StreamPrinter:
+    """Print streamed text to stderr as formatted lines, with a label before the first chunk"""
+
+    def __init__(self, label: str = f"{MAGENTA}{BOLD}moiBash:{RESET}", on_start: Optional[Callable] = None):
+        self.label = label
+        self.on_start = on_start
+        self.renderer = MarkdownRenderer()
+        self.started = False
+        self.text = ""
+
+    def write(self, chunk: str):
+        if not chunk:
+            return
+        if not self.started:
+            self.started = True
+            if self.on_start:
+                self.on_start()
+            print(f"{self.label} ", end='', file=sys.stderr, flush=True)
+        self.text += chunk
+        for line in self.renderer.feed(chunk):
+            print(line, file=sys.stderr, flush=True)
+
+    def flush(self):
+        """Print the pending partial line (call before anything else writes to the terminal)"""
+        if self.renderer.buffer:
+            print(self.renderer.flush(), file=sys.stderr, flush=True)